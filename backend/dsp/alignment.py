@@ -0,0 +1,261 @@
+"""
+Align a practice take to a finished job's song and score it per chord segment and note.
+
+Both recordings become chroma + onset-strength frames (ALIGN_SR / ALIGN_HOP, ~23 ms) over
+their full length; the reference's are computed once per job and saved with its artifacts.
+The alignment is a two-level DTW:
+
+  coarse  frames pooled COARSE_FACTOR at a time, full matrix
+  fine    only a band of BAND_RADIUS frames around the coarse path
+
+Each level is filled one anti-diagonal at a time (every cell on an anti-diagonal depends only
+on the previous two), so the inner loop is a handful of numpy ops per diagonal, not per cell.
+The take may cover any part of the song (subsequence DTW: free start and end in the song).
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from .practice_scoring import HIT_WINDOW_S, HighwayIndex
+
+ALIGN_SR = 22050
+ALIGN_HOP = 512
+COARSE_FACTOR = 8
+BAND_RADIUS = 2 * COARSE_FACTOR
+ONSET_WEIGHT = 0.5    # onset-strength difference vs chroma cosine distance in the frame cost
+PITCH_WINDOW_S = 0.1  # take chroma after a note's onset that its pitch is judged on
+PITCH_OK = 0.5        # pitch-class energy (relative to the frame's strongest) that counts as right
+MIN_TAKE_S = 1.0      # shorter takes have too few frames to align
+
+# backtrack codes
+_DIAG, _UP, _LEFT, _START = 0, 1, 2, 3
+
+
+def extract_align_features(wav_path, sr: int = ALIGN_SR, hop_length: int = ALIGN_HOP) -> dict:
+    """Chroma, onset strength and onset times of a whole recording. Persisted per job."""
+    import librosa
+
+    y, sr = librosa.load(wav_path, sr=sr, mono=True)
+    chroma = librosa.feature.chroma_stft(y=y, sr=sr, n_fft=4 * hop_length, hop_length=hop_length)
+    onset_env = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop_length)
+    onset_frames = librosa.onset.onset_detect(onset_envelope=onset_env, sr=sr, hop_length=hop_length, backtrack=True)
+    n = min(chroma.shape[1], len(onset_env))
+    return {
+        "chroma": chroma[:, :n].astype(np.float32),
+        "onset_env": onset_env[:n].astype(np.float32),
+        "onset_times": librosa.frames_to_time(onset_frames, sr=sr, hop_length=hop_length),
+        "sr": int(sr),
+        "hop_length": int(hop_length),
+    }
+
+
+def _frames(features: dict) -> np.ndarray:
+    """(n, 13) per-frame vectors: unit chroma, then onset strength scaled to ~[0, 1]."""
+    chroma = features["chroma"].T.astype(np.float64)
+    chroma /= np.linalg.norm(chroma, axis=1, keepdims=True) + 1e-9
+    env = features["onset_env"].astype(np.float64)
+    env = np.clip(env / (np.percentile(env, 95) + 1e-9), 0.0, 1.0) if len(env) else env
+    return np.column_stack([chroma, env])
+
+
+def _pool(x: np.ndarray, factor: int) -> np.ndarray:
+    n = -(-len(x) // factor)
+    padded = np.zeros((n * factor, x.shape[1]))
+    padded[: len(x)] = x
+    pooled = padded.reshape(n, factor, -1).mean(axis=1)
+    pooled[:, :12] /= np.linalg.norm(pooled[:, :12], axis=1, keepdims=True) + 1e-9
+    return pooled
+
+
+def _band_cost(x: np.ndarray, y: np.ndarray, lo: np.ndarray, width: int) -> np.ndarray:
+    """(n, width) cost of take frame i against song frame lo[i] + w."""
+    cols = np.minimum(lo[:, None] + np.arange(width)[None, :], len(y) - 1)
+    yb = y[cols]                                              # (n, width, 13)
+    chroma = 1.0 - np.einsum("nd,nwd->nw", x[:, :12], yb[..., :12])
+    onset = np.abs(x[:, None, 12] - yb[..., 12])
+    return chroma + ONSET_WEIGHT * onset
+
+
+def dtw_band(x: np.ndarray, y: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> tuple[np.ndarray, float]:
+    """
+    Subsequence DTW of take frames x against song frames y, restricted to song frames
+    [lo[i], hi[i]) for take frame i (lo, hi non-decreasing). Returns the (take, song) frame
+    path and its mean cost per step.
+    """
+    n = len(x)
+    width = int((hi - lo).max())
+    cost = _band_cost(x, y, lo, width)
+    valid = np.arange(width)[None, :] < (hi - lo)[:, None]
+    acc = np.full(n * width, np.inf)
+    back = np.full(n * width, _START, dtype=np.uint8)
+    rows = np.arange(n)
+
+    # cells on anti-diagonal k = i + j: rows with i + lo[i] <= k < i + hi[i], both increasing in i
+    first = np.searchsorted(rows + hi, np.arange(int((rows + hi).max())), side="right")
+    last = np.searchsorted(rows + lo, np.arange(int((rows + hi).max())), side="right")
+    flat_cost = np.where(valid, cost, np.inf).ravel()
+    for k in range(int(lo[0]), len(first)):
+        i = rows[first[k]: last[k]]
+        if not len(i):
+            continue
+        j = k - i
+        w = j - lo[i]
+        here = i * width + w
+        c = flat_cost[here]
+        start = i == 0  # free start: the first take frame never pays for earlier song frames
+        ip = np.maximum(i - 1, 0)
+        wu = j - lo[ip]
+        up_ok = (i >= 1) & (j < hi[ip])
+        diag_ok = (i >= 1) & (j - 1 >= lo[ip]) & (j - 1 < hi[ip])
+        left_ok = (w >= 1) & ~start
+        up = np.where(up_ok, acc[np.where(up_ok, ip * width + wu, 0)], np.inf)
+        diag = np.where(diag_ok, acc[np.where(diag_ok, ip * width + wu - 1, 0)], np.inf)
+        left = np.where(left_ok, acc[np.where(left_ok, here - 1, 0)], np.inf)
+        best = np.stack([diag, up, left])
+        step = np.argmin(best, axis=0)
+        prev = best[step, np.arange(len(i))]
+        acc[here] = np.where(start, c, c + prev)
+        back[here] = np.where(start, _START, step)
+
+    # free end: the cheapest song frame for the last take frame
+    last_row = acc[(n - 1) * width: n * width]
+    i, w = n - 1, int(np.argmin(last_row))
+    total = float(last_row[w])
+    path = []
+    while True:
+        j = int(lo[i]) + w
+        path.append((i, j))
+        step = back[i * width + w]
+        if step == _START:
+            break
+        if step == _LEFT:
+            w -= 1
+        else:
+            ip = i - 1
+            w = j - (1 if step == _DIAG else 0) - int(lo[ip])
+            i = ip
+    path = np.array(path[::-1])
+    return path, total / len(path)
+
+
+def align(take: dict, ref: dict) -> dict:
+    """Coarse full DTW, then a fine band around its path. Returns the frame path and timeline map."""
+    x, y = _frames(take), _frames(ref)
+    xc, yc = _pool(x, COARSE_FACTOR), _pool(y, COARSE_FACTOR)
+    coarse, _ = dtw_band(xc, yc, np.zeros(len(xc), dtype=np.int64), np.full(len(xc), len(yc), dtype=np.int64))
+
+    # fine band: the song frames each coarse row covers, widened by BAND_RADIUS
+    row_lo = np.full(len(xc), len(yc))
+    row_hi = np.zeros(len(xc), dtype=np.int64)
+    np.minimum.at(row_lo, coarse[:, 0], coarse[:, 1])
+    np.maximum.at(row_hi, coarse[:, 0], coarse[:, 1])
+    fine_rows = np.arange(len(x)) // COARSE_FACTOR
+    lo = np.clip(row_lo[fine_rows] * COARSE_FACTOR - BAND_RADIUS, 0, len(y) - 1)
+    hi = np.clip((row_hi[fine_rows] + 1) * COARSE_FACTOR + BAND_RADIUS, 1, len(y))
+    lo = np.minimum.accumulate(lo[::-1])[::-1]
+    hi = np.maximum.accumulate(hi)
+    path, cost = dtw_band(x, y, lo, hi)
+
+    hop_s = ref["hop_length"] / ref["sr"]
+    # song time -> take time, averaging where the path holds one song frame for several take frames
+    song_frames, inv = np.unique(path[:, 1], return_inverse=True)
+    take_frames = np.bincount(inv, weights=path[:, 0]) / np.bincount(inv)
+    song_t, take_t = song_frames * hop_s, take_frames * hop_s
+    # steady-tempo fit: timing is judged against this, so a uniformly slow or late take isn't "wrong"
+    a, b = np.polyfit(song_t, take_t, 1) if len(song_t) > 1 else (1.0, take_t[0] - song_t[0])
+    return {"path": path, "cost": cost, "song_t": song_t, "take_t": take_t, "rate": float(a), "offset": float(b)}
+
+
+def _mean_chroma(chroma: np.ndarray, hop_s: float, t0: float, t1: float) -> np.ndarray:
+    f0 = int(np.clip(round(t0 / hop_s), 0, chroma.shape[1] - 1))
+    f1 = int(np.clip(round(t1 / hop_s), f0 + 1, chroma.shape[1]))
+    return chroma[:, f0:f1].mean(axis=1)
+
+
+def _nearest(times: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Nearest value of sorted `times` to each of t (inf when times is empty)."""
+    if not len(times):
+        return np.full(len(t), np.inf)
+    hi = np.clip(np.searchsorted(times, t), 1, len(times) - 1) if len(times) > 1 else np.zeros(len(t), dtype=int)
+    lo = np.maximum(hi - 1, 0)
+    return np.where(np.abs(times[lo] - t) <= np.abs(times[hi] - t), times[lo], times[hi])
+
+
+def score_take(take: dict, ref: dict, note_highway: dict | None, chords: list[dict] | None) -> dict:
+    """Per chord segment and per note timing (ms, against the take's steady-tempo fit) and pitch scores."""
+    al = align(take, ref)
+    hop_s = take["hop_length"] / take["sr"]
+    song_t0, song_t1 = float(al["song_t"][0]), float(al["song_t"][-1] + hop_s)
+
+    def warp(t):
+        return np.interp(t, al["song_t"], al["take_t"])
+
+    def steady(t):
+        return al["rate"] * np.asarray(t) + al["offset"]
+
+    onsets = np.sort(np.asarray(take["onset_times"], dtype=np.float64))
+    chroma = take["chroma"]
+
+    idx = HighwayIndex(note_highway)
+    lo, hi = idx.window(song_t0, song_t1)
+    t = idx.times[lo:hi]
+    expected = warp(t)
+    onset = _nearest(onsets, expected)
+    found = np.abs(onset - expected) <= HIT_WINDOW_S
+    at = np.where(found, onset, expected)
+    frames = np.clip(np.round(at / hop_s).astype(int), 0, chroma.shape[1] - 1)
+    span = max(1, int(round(PITCH_WINDOW_S / hop_s)))
+    win = np.clip(frames[:, None] + np.arange(span)[None, :], 0, chroma.shape[1] - 1)
+    energy = chroma[:, win].mean(axis=2)                     # (12, notes)
+    pc = idx.midi[lo:hi] % 12
+    pitch = energy[pc, np.arange(len(pc))] / (energy.max(axis=0) + 1e-9)
+    timing = (onset - steady(t)) * 1000.0
+    notes = [
+        {
+            "time": float(t[k]),
+            "string": int(idx.strings[lo + k]),
+            "fret": int(idx.frets[lo + k]),
+            "take_time": float(at[k]),
+            "timing_ms": float(timing[k]) if found[k] else None,
+            "pitch": float(pitch[k]),
+            "hit": bool(found[k] and pitch[k] >= PITCH_OK),
+        }
+        for k in range(len(t))
+    ]
+
+    out_chords = []
+    ref_hop_s = ref["hop_length"] / ref["sr"]
+    for c in chords or []:
+        if c["t1"] <= song_t0 or c["t0"] >= song_t1:
+            continue
+        a0, a1 = max(c["t0"], song_t0), min(c["t1"], song_t1)
+        w0, w1 = float(warp(a0)), float(warp(a1))
+        mine = _mean_chroma(chroma, hop_s, w0, w1)
+        theirs = _mean_chroma(ref["chroma"], ref_hop_s, a0, a1)
+        sim = float(mine @ theirs / (np.linalg.norm(mine) * np.linalg.norm(theirs) + 1e-9))
+        o = float(_nearest(onsets, np.array([w0]))[0])
+        on_time = c["t0"] >= song_t0 and abs(o - w0) <= HIT_WINDOW_S
+        out_chords.append({
+            "t0": c["t0"], "t1": c["t1"], "label": c["label"],
+            "take_t0": w0, "take_t1": w1,
+            "timing_ms": float((o - steady(c["t0"])) * 1000.0) if on_time else None,
+            "pitch": sim,
+        })
+
+    timed = np.abs(timing[found])
+    return {
+        "song_t0": song_t0,
+        "song_t1": song_t1,
+        "tempo_ratio": 1.0 / al["rate"] if al["rate"] > 0 else None,  # take tempo / song tempo
+        "offset_s": al["offset"],
+        "alignment_cost": al["cost"],
+        "summary": {
+            "notes": len(notes),
+            "notes_hit": int(sum(n["hit"] for n in notes)),
+            "mean_abs_timing_ms": float(timed.mean()) if len(timed) else None,
+            "pitch_accuracy": float((pitch >= PITCH_OK).mean()) if len(pitch) else None,
+            "chord_match": float(np.mean([c["pitch"] for c in out_chords])) if out_chords else None,
+        },
+        "chords": out_chords,
+        "notes": notes,
+    }
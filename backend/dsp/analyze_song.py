@@ -1,24 +1,89 @@
 import librosa
 import numpy as np
-from .chords import best_chord_for_chroma, smooth_labels, segment_labels
+from .chords import _TEMPLATES, best_chord_for_chroma, smooth_labels, segment_labels
+from .trace import span
 
-def analyze_wav_for_chords(wav_path, hop_length=2048):
-    y, sr = librosa.load(wav_path, sr=None, mono=True, duration=30)
 
-    tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
+def extract_chord_features(wav_path, hop_length=2048, duration=30):
+    """Expensive part of chord analysis (load, beat tracking, CQT chroma). Persisted per job."""
+    with span("librosa.load", cat="librosa"):
+        y, sr = librosa.load(wav_path, sr=None, mono=True, duration=duration)
+
+    with span("librosa.beat.beat_track", cat="librosa"):
+        tempo, beat_frames = librosa.beat.beat_track(y=y, sr=sr)
 
-    chroma = librosa.feature.chroma_cqt(y=y, sr=sr, hop_length=hop_length)
+    with span("librosa.feature.chroma_cqt", cat="librosa"):
+        chroma = librosa.feature.chroma_cqt(y=y, sr=sr, hop_length=hop_length)
     chroma = chroma / (np.linalg.norm(chroma, axis=0, keepdims=True) + 1e-9)
 
+    return {
+        "chroma": chroma.astype(np.float32),
+        "tempo": float(np.atleast_1d(tempo)[0]),
+        "beat_times": librosa.frames_to_time(beat_frames, sr=sr),
+        "sr": int(sr),
+        "hop_length": int(hop_length),
+    }
+
+
+def chords_from_features(features, smooth_win=11, min_dur=0.6):
+    """Cheap part: label, smooth and segment chroma frames. Re-run on reprocess."""
+    chroma = features["chroma"]
     labels = [best_chord_for_chroma(chroma[:, t]) for t in range(chroma.shape[1])]
-    labels = smooth_labels(labels, win=11)
+    labels = smooth_labels(labels, win=smooth_win)
 
-    hop_s = hop_length / sr
+    hop_s = features["hop_length"] / features["sr"]
     segs = segment_labels(labels, hop_s)
 
     from .chords import merge_short_segments
 
-    segs = merge_short_segments(segs, min_dur=0.6)  # tweak 0.4–1.0s
+    segs = merge_short_segments(segs, min_dur=min_dur)  # tweak 0.4–1.0s
 
     chords = [{"t0": float(a), "t1": float(b), "label": lab} for (a, b, lab) in segs]
-    return {"bpm": float(tempo), "chords": chords}
\ No newline at end of file
+    return {"bpm": float(features["tempo"]), "chords": chords}
+
+
+def preview_chords(wav_path, sr=11025, hop_length=1024, duration=30, vocab_size=8):
+    """
+    Rough chords in well under a second, for the Processing screen while the full analysis runs:
+    11 kHz audio, STFT chroma on a coarse hop, one label per beat, and only the vocab_size
+    chords that fit the whole excerpt best (a short vocabulary keeps coarse frames from
+    flickering between unrelated chords).
+    """
+    y, sr = librosa.load(wav_path, sr=sr, mono=True, duration=duration, res_type="soxr_qq")
+    if len(y) == 0:
+        return {"bpm": None, "chords": []}
+
+    onset_env = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop_length // 2)
+    tempo, beat_frames = librosa.beat.beat_track(onset_envelope=onset_env, sr=sr, hop_length=hop_length // 2)
+    beat_times = librosa.frames_to_time(beat_frames, sr=sr, hop_length=hop_length // 2)
+
+    chroma = librosa.feature.chroma_stft(y=y, sr=sr, n_fft=2 * hop_length, hop_length=hop_length)
+    duration_s = len(y) / sr
+    # beat-synchronous chroma; no beats -> fixed 1 s cells
+    bounds = beat_times if len(beat_times) >= 2 else np.arange(0.0, duration_s, 1.0)
+    # cells between distinct chroma frames (close beats can round to the same one); the
+    # segment times come from those same frames, so labels stay on their cells
+    n = chroma.shape[1]
+    frames = np.clip(librosa.time_to_frames(bounds, sr=sr, hop_length=hop_length), 0, n)
+    frames = np.union1d(frames, [0, n])
+    cells = librosa.util.sync(chroma, frames, aggregate=np.median, pad=False)
+    bounds = np.minimum(librosa.frames_to_time(frames, sr=sr, hop_length=hop_length), duration_s)
+    bounds[-1] = duration_s
+    cells = cells / (np.linalg.norm(cells, axis=0, keepdims=True) + 1e-9)
+
+    names = list(_TEMPLATES)
+    tmpl = np.stack([_TEMPLATES[n] / np.linalg.norm(_TEMPLATES[n]) for n in names])
+    scores = tmpl @ cells                                    # (chords, cells)
+    vocab = np.argsort(-scores.sum(axis=1))[:vocab_size]
+    labels = [names[i] for i in vocab[np.argmax(scores[vocab], axis=0)]]
+
+    segs = [(float(bounds[i]), float(bounds[i + 1]), lab) for i, lab in enumerate(labels)]
+    from .chords import merge_short_segments
+
+    segs = merge_short_segments(segs, min_dur=0.6)
+    chords = [{"t0": a, "t1": b, "label": lab} for (a, b, lab) in segs]
+    return {"bpm": float(np.atleast_1d(tempo)[0]), "chords": chords}
+
+
+def analyze_wav_for_chords(wav_path, hop_length=2048):
+    return chords_from_features(extract_chord_features(wav_path, hop_length=hop_length))
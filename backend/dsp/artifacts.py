@@ -0,0 +1,21 @@
+"""
+Per-job intermediate artifacts (chroma, onsets, beats, ...) saved next to the processed WAV,
+so downstream stages can be re-run with new parameters without redoing the heavy analysis.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+
+def save_features(path: Path, features: dict) -> None:
+    """Save a dict of arrays/scalars as a compressed .npz."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(path, **{k: np.asarray(v) for k, v in features.items()})
+
+
+def load_features(path: Path) -> dict:
+    """Inverse of save_features: 0-d arrays come back as Python scalars."""
+    with np.load(path) as z:
+        return {k: (z[k].item() if z[k].ndim == 0 else z[k]) for k in z.files}
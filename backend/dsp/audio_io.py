@@ -1,7 +1,10 @@
 from pathlib import Path
 from fastapi import UploadFile
+import asyncio
 import shutil
-import subprocess
+
+from .cancel import run_cancellable
+from .trace import span
 
 async def save_upload_and_convert_to_wav(
     file: UploadFile,
@@ -11,8 +14,9 @@ async def save_upload_and_convert_to_wav(
     target_sr: int = 44100,
 ):
     raw_path = uploads_dir / f"{song_id}_{file.filename}"
-    with raw_path.open("wb") as f:
+    with span("upload write", cat="io") as info, raw_path.open("wb") as f:
         shutil.copyfileobj(file.file, f)
+        info["bytes"] = f.tell()
 
     wav_path = processed_dir / f"{song_id}.wav"
 
@@ -23,8 +27,8 @@ async def save_upload_and_convert_to_wav(
         "-ar", str(target_sr),
         str(wav_path)
     ]
-    # If this errors, ffmpeg isn't on PATH
-    proc = subprocess.run(cmd, capture_output=True, text=True)
+    # If this errors, ffmpeg isn't on PATH. Off the event loop; killed if the job is cancelled.
+    proc = await asyncio.to_thread(run_cancellable, cmd)
     if proc.returncode != 0:
         raise RuntimeError(f"ffmpeg failed ({proc.returncode}): {proc.stderr}")
     return wav_path
\ No newline at end of file
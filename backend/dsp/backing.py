@@ -0,0 +1,213 @@
+"""
+Practice backing tracks: a click on the job's beat grid and a bass + strum accompaniment
+played from its chord segments (voicings from dsp.voicings, so CHORD_SHAPES where they apply).
+
+Everything is synthesized from a sample bank built once per sample rate (a plucked tone per
+MIDI pitch for strings and bass, two click sounds). A track is a table of events (time, bank
+row, gain, length); each string, the bass and the click are monophonic, so an event rings
+until the next one on its channel and a chunk costs about one bank lookup per output sample
+per channel, summed with one np.bincount.
+
+Like dsp.renditions, rate and semitones give the practice tempo and key, the output is
+written in RENDITION_CHUNK_S chunks as they are ready, and each chunk has three stems:
+click, backing (bass + strums) and mix (both).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from .cancel import check
+from .renditions import RENDITION_CHUNK_S, _transpose_label, rendition_key
+from .voicings import OPEN_MIDI, parse_label, voicing_for_label
+
+BACKING_SR = 22050
+STEMS = ("click", "backing", "mix")
+BEATS_PER_BAR = 4
+LOW_MIDI, HIGH_MIDI = 28, 88    # E1 (bass) .. E6 (high e, 24th fret)
+RING_S = 1.5                    # longest a note rings before the next one on its string
+RELEASE_S = 0.02                # fade where a ringing note is cut off
+STRUM_SPREAD_S = 0.012          # between strings of one strum
+UP_STRUM_STRINGS = 4            # off-beat up-strums take the top strings only
+GAIN = {"strum": 0.12, "up": 0.07, "bass": 0.35, "accent": 0.6, "click": 0.35}
+
+
+def backing_key(rate: float, semitones: int, signature: str) -> str:
+    return f"{rendition_key(rate, semitones)}_{signature}"
+
+
+def backing_signature(chords: list, beats, bpm: float | None) -> str:
+    """Short hash of what a backing track is played from, so reprocessed results render anew."""
+    payload = json.dumps(
+        [[[c.get("t0"), c.get("t1"), c.get("label")] for c in chords or []],
+         [round(float(b), 4) for b in (beats if beats is not None else [])], bpm],
+        separators=(",", ":"),
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+@lru_cache(maxsize=2)
+def sample_bank(sr: int = BACKING_SR) -> dict[str, np.ndarray]:
+    """
+    {"pluck": (pitches, n), "bass": (pitches, n), "click": (2, m)}: row midi - LOW_MIDI of the
+    tonal banks is that pitch; click row 0 is the downbeat.
+    """
+    t = np.arange(int(RING_S * sr)) / sr
+    f0 = 440.0 * 2.0 ** ((np.arange(LOW_MIDI, HIGH_MIDI + 1) - 69) / 12.0)
+    attack = np.minimum(1.0, t / 0.003)
+
+    def tone(partials: int, decay: float, tilt: float) -> np.ndarray:
+        out = np.zeros((len(f0), len(t)), dtype=np.float32)
+        for k in range(1, partials + 1):
+            fk = f0 * k
+            amp = np.where(fk < 0.45 * sr, k ** -tilt, 0.0)  # nothing above Nyquist
+            env = np.exp(-t * decay * (1.0 + 0.6 * (k - 1)))  # upper partials die first
+            out += (amp[:, None] * np.sin(2 * np.pi * fk[:, None] * t[None, :]) * env[None, :]).astype(np.float32)
+        return out * attack / np.abs(out).max(axis=1, keepdims=True)
+
+    tc = np.arange(int(0.03 * sr)) / sr
+    click = np.stack([np.sin(2 * np.pi * f * tc) * np.exp(-tc / 0.006) for f in (1600.0, 1000.0)]).astype(np.float32)
+    return {"pluck": tone(6, 2.5, 1.2), "bass": tone(3, 1.2, 1.5), "click": click}
+
+
+def _gate(t: np.ndarray, channel: np.ndarray, ring: float) -> np.ndarray:
+    """How long each event rings: until the next event on its channel, at most `ring`."""
+    if not len(t):
+        return np.zeros(0)
+    order = np.lexsort((t, channel))
+    ts, cs = t[order], channel[order]
+    nxt = np.append(ts[1:], np.inf)
+    nxt[np.append(cs[1:] != cs[:-1], True)] = np.inf
+    out = np.empty(len(t))
+    out[order] = np.minimum(nxt - ts, ring)
+    return out
+
+
+def backing_events(chords: list, beats, bpm: float | None, duration: float, rate: float, semitones: int) -> dict:
+    """
+    {"click": events, "bass": events, "pluck": events}, each {"t", "row", "gain", "length"}
+    arrays on the output timeline (seconds / rate), in the key moved by `semitones`.
+    """
+    from .lesson_bundle import beat_grid
+
+    beats = beat_grid(beats, bpm, duration)
+    segs = [c for c in chords or [] if float(c["t1"]) > float(c["t0"])]
+    t0s = np.array([float(c["t0"]) for c in segs])
+    t1s = np.array([float(c["t1"]) for c in segs])
+    shapes, roots = [], []
+    for c in segs:
+        label = _transpose_label(c.get("label", ""), semitones) if semitones else c.get("label", "")
+        parsed = parse_label(label)
+        shapes.append(voicing_for_label(label) if parsed else None)
+        roots.append(parsed[0] if parsed else None)
+
+    def chord_at(times: np.ndarray) -> np.ndarray:
+        """Index of the chord segment sounding at each time, -1 for none / no chord."""
+        if not len(segs):
+            return np.full(len(times), -1)
+        i = np.clip(np.searchsorted(t0s, times + 1e-3, side="right") - 1, 0, len(segs) - 1)
+        ok = (times + 1e-3 >= t0s[i]) & (times < t1s[i])
+        return np.where(ok, i, -1)
+
+    # strums on the beats, up-strums between them; with no beat grid, one strum per chord
+    if len(beats) >= 2:
+        downs = beats
+        ups = (beats[:-1] + beats[1:]) / 2
+    else:
+        downs, ups = t0s, np.zeros(0)
+
+    t, row, gain, channel = [], [], [], []
+    for times, up in ((downs, False), (ups, True)):
+        for when, ci in zip(times, chord_at(times)):
+            if ci < 0 or shapes[ci] is None:
+                continue
+            strings = [s for s, f in enumerate(shapes[ci]) if f >= 0]
+            if up:
+                strings = strings[::-1][:UP_STRUM_STRINGS]
+            for k, s in enumerate(strings):
+                t.append(when + k * STRUM_SPREAD_S)
+                row.append(OPEN_MIDI[s] + shapes[ci][s] - LOW_MIDI)
+                gain.append(GAIN["up" if up else "strum"])
+                channel.append(s)
+    pluck = (np.array(t, dtype=np.float64), np.array(row, dtype=np.int64), np.array(gain), np.array(channel))
+
+    # bass: the root on the beats, its fifth on the off-beats of the bar
+    bass_ci = chord_at(downs)
+    keep = np.array([ci >= 0 and roots[ci] is not None for ci in bass_ci], dtype=bool)
+    bass_t = downs[keep]
+    bass_root = np.array([roots[ci] for ci in bass_ci[keep]], dtype=np.int64)
+    fifth = (np.flatnonzero(keep) % 2 == 1) if len(beats) >= 2 else np.zeros(len(bass_t), dtype=bool)
+    bass_row = (bass_root - LOW_MIDI) % 12 + np.where(fifth, 7, 0)
+
+    click_t = beats if len(beats) >= 2 else np.zeros(0)
+    click_row = (np.arange(len(click_t)) % BEATS_PER_BAR != 0).astype(np.int64)
+
+    def events(times, rows, gains, channels, ring):
+        times = np.asarray(times, dtype=np.float64) / rate
+        return {"t": times, "row": rows, "gain": np.asarray(gains, dtype=np.float64),
+                "length": _gate(times, np.asarray(channels), ring)}
+
+    return {
+        "pluck": events(*pluck, RING_S),
+        "bass": events(bass_t, bass_row, np.full(len(bass_t), GAIN["bass"]), np.zeros(len(bass_t)), RING_S),
+        "click": events(click_t, click_row, np.where(click_row == 0, GAIN["accent"], GAIN["click"]),
+                        np.zeros(len(click_t)), RING_S),
+    }
+
+
+def _mix(events: dict, bank: np.ndarray, start: int, n: int, sr: int) -> np.ndarray:
+    """Events' bank rows, gated and scaled, summed into the n samples from sample `start`."""
+    pos0 = np.round(events["t"] * sr).astype(np.int64) - start
+    length = np.minimum(np.round(events["length"] * sr).astype(np.int64), bank.shape[1])
+    sel = (pos0 < n) & (pos0 + length > 0)
+    if not sel.any():
+        return np.zeros(n)
+    pos0, length, rows, gains = pos0[sel], length[sel], events["row"][sel], events["gain"][sel]
+    # one flat index per sounding sample: event e covers offsets 0 .. length[e] - 1
+    first = np.cumsum(length) - length
+    offs = np.arange(int(length.sum())) - np.repeat(first, length)
+    which = np.repeat(np.arange(len(pos0)), length)
+    pos = pos0[which] + offs
+    ok = (pos >= 0) & (pos < n)
+    which, offs, pos = which[ok], offs[ok], pos[ok]
+    release = np.clip((length[which] - offs) / (RELEASE_S * sr), 0.0, 1.0)
+    w = bank[rows[which], offs] * gains[which] * release
+    return np.bincount(pos, weights=w, minlength=n)
+
+
+def render_backing(wav_path: Path, out_dir: Path, chords: list, beats, bpm: float | None,
+                   rate: float, semitones: int, on_chunk=None) -> list[dict]:
+    """
+    Render click_000.wav, backing_000.wav, mix_000.wav, ... into out_dir, as long as the job's
+    audio at `rate`. on_chunk(info) fires per chunk with {"index", "files": {stem: name}, "t0", "t1"}
+    (times in output seconds). Returns all chunk infos.
+    """
+    import soundfile as sf
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    sr = BACKING_SR
+    bank = sample_bank(sr)
+    duration = sf.info(str(wav_path)).duration
+    events = backing_events(chords, beats, bpm, duration, rate, semitones)
+    total = int(round(duration / rate * sr))
+
+    chunk = int(RENDITION_CHUNK_S * sr)
+    chunks: list[dict] = []
+    for i, start in enumerate(range(0, total, chunk)):
+        check()
+        n = min(chunk, total - start)
+        click = _mix(events["click"], bank["click"], start, n, sr)
+        backing = _mix(events["pluck"], bank["pluck"], start, n, sr) + _mix(events["bass"], bank["bass"], start, n, sr)
+        files = {}
+        for stem, y in (("click", click), ("backing", backing), ("mix", click + backing)):
+            files[stem] = f"{stem}_{i:03d}.wav"
+            sf.write(str(out_dir / files[stem]), np.clip(y, -1.0, 1.0), sr, subtype="PCM_16")
+        info = {"index": i, "files": files, "t0": start / sr, "t1": (start + n) / sr}
+        chunks.append(info)
+        if on_chunk is not None:
+            on_chunk(info)
+    return chunks
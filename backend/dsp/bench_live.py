@@ -0,0 +1,99 @@
+"""
+Replay benchmark for the live pipeline (no audio interface needed).
+
+  cd backend
+  python -m dsp.bench_live --wav processed/<job_id>.wav --streams 4
+  python -m dsp.bench_live --wav take.wav --realtime --out events.jsonl
+
+Runs N concurrent stream_live_guitar_events over FileReplaySource and reports hops/s,
+real-time factor and (with --inloop) roughly how many real-time streams one core can carry.
+--out writes every event (minus timing fields) as JSON lines for accuracy regression diffs.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from .live_listen import stream_live_guitar_events
+from .live_sources import FileReplaySource
+
+# wall/latency fields that differ run to run; dropped from --out so diffs are deterministic
+_VOLATILE = {"ts", "adc_time", "latency", "ring_overruns"}
+
+
+async def _run_stream(pcm, sr, args, events: list | None) -> dict:
+    source = FileReplaySource(pcm, sr, realtime=args.realtime, channels=args.channels)
+    n_events = n_onsets = 0
+    dsp_ms = []
+    async for ev in stream_live_guitar_events(
+        source=source, hop_size=args.hop, win_size=args.win, min_interval_s=0.0, offload=not args.inloop,
+        channel_mode=args.channel_mode,
+    ):
+        n_events += 1
+        n_onsets += bool(ev.get("onset"))
+        dsp_ms.append(ev["latency"]["dsp_ms"])
+        if events is not None:
+            events.append({k: v for k, v in ev.items() if k not in _VOLATILE})
+    return {"events": n_events, "onsets": n_onsets, "dsp_ms": dsp_ms}
+
+
+async def main_async(args):
+    import soundfile as sf
+
+    pcm, sr = sf.read(args.wav, dtype="float32", always_2d=True)
+    events: list | None = [] if args.out else None
+
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    results = await asyncio.gather(*[
+        _run_stream(pcm, sr, args, events if i == 0 else None) for i in range(args.streams)
+    ])
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+
+    hops_per_stream = int(np.ceil(pcm.shape[0] / args.hop))
+    total_hops = hops_per_stream * args.streams
+    hops_per_s_realtime = sr / args.hop
+    dsp = np.concatenate([np.asarray(r["dsp_ms"]) for r in results]) if results else np.zeros(0)
+
+    report = {
+        "file_s": pcm.shape[0] / sr,
+        "streams": args.streams,
+        "realtime": args.realtime,
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "hops": total_hops,
+        "hops_per_s": total_hops / wall if wall > 0 else None,
+        "realtime_factor": (total_hops / hops_per_s_realtime) / wall if wall > 0 else None,
+        # in-loop: one event loop = one core, so CPU-bound hops/s over the real-time hop rate
+        "streams_per_core": (total_hops / cpu) / hops_per_s_realtime if (cpu > 0 and args.inloop) else None,
+        "dsp_ms_p50": float(np.percentile(dsp, 50)) if dsp.size else None,
+        "dsp_ms_p99": float(np.percentile(dsp, 99)) if dsp.size else None,
+        "events": results[0]["events"] if results else 0,
+        "onsets": results[0]["onsets"] if results else 0,
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            for ev in events:
+                f.write(json.dumps(ev) + "\n")
+        print("Saved:", args.out)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--wav", required=True)
+    ap.add_argument("--streams", type=int, default=1)
+    ap.add_argument("--realtime", action="store_true", help="pace blocks like a device instead of flat out")
+    ap.add_argument("--inloop", action="store_true", help="analyze on the event loop instead of live workers")
+    ap.add_argument("--channels", type=int, default=None)
+    ap.add_argument("--channel-mode", default="loudest", choices=["loudest", "all"])
+    ap.add_argument("--hop", type=int, default=1024)
+    ap.add_argument("--win", type=int, default=4096)
+    ap.add_argument("--out", default=None)
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
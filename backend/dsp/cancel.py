@@ -0,0 +1,115 @@
+"""
+Cancellation for job work running off the event loop.
+
+A CancelToken is cancelled explicitly (DELETE /jobs/{id}, TTL reaping) or by its deadline,
+and a child token (one per stage) is cancelled with its parent. The token for the current
+job/stage travels in a contextvar, which asyncio.to_thread copies into the worker thread,
+so deep code (ffmpeg, basic-pitch) finds it without threading it through every call:
+
+- run_cancellable: subprocess.run that kills the process group as soon as the token is
+  cancelled or past its deadline, freeing the CPU at once
+- check(): a cheap checkpoint for pure-Python stages between their expensive steps
+"""
+from __future__ import annotations
+
+import contextvars
+import os
+import signal
+import subprocess
+import threading
+import time
+
+
+class Cancelled(Exception):
+    """Raised inside cancelled work. Not asyncio.CancelledError: it crosses thread boundaries."""
+
+
+class CancelToken:
+    def __init__(self, parent: "CancelToken | None" = None, timeout: float | None = None):
+        self.parent = parent
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self._event = threading.Event()
+        self._reason: str | None = None
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._event.is_set():
+            self._reason = reason
+            self._event.set()
+
+    def child(self, timeout: float | None = None) -> "CancelToken":
+        return CancelToken(parent=self, timeout=timeout)
+
+    @property
+    def reason(self) -> str | None:
+        """Why this token is cancelled, or None while it is live."""
+        if self._event.is_set():
+            return self._reason
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "deadline exceeded"
+        return self.parent.reason if self.parent is not None else None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def check(self) -> None:
+        reason = self.reason
+        if reason is not None:
+            raise Cancelled(reason)
+
+
+CURRENT: contextvars.ContextVar[CancelToken | None] = contextvars.ContextVar("cancel_token", default=None)
+
+
+def check() -> None:
+    """Raise Cancelled if the current job/stage has been cancelled; no-op outside a job."""
+    token = CURRENT.get()
+    if token is not None:
+        token.check()
+
+
+def _kill(proc: subprocess.Popen) -> None:
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)  # the whole group: tools that fork helpers too
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def run_cancellable(cmd: list[str], token: CancelToken | None = None, poll_s: float = 0.05):
+    """
+    subprocess.run(cmd, capture_output=True, text=True) that is killed when `token`
+    (default: the current one) is cancelled. Raises Cancelled in that case.
+    """
+    from .trace import rss_mb, span
+
+    token = token if token is not None else CURRENT.get()
+    if token is not None:
+        token.check()
+    with span(os.path.basename(cmd[0]), cat="subprocess") as info:
+        proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+            start_new_session=(os.name == "posix"),
+        )
+        info["child_pid"] = proc.pid
+        try:
+            while True:
+                try:
+                    out, err = proc.communicate(timeout=poll_s)
+                    break
+                except subprocess.TimeoutExpired:
+                    # sampled while it runs; the last sample is the child's peak so far
+                    info["child_peak_rss_mb"] = rss_mb(proc.pid)[1] or info.get("child_peak_rss_mb")
+                    if token is not None and token.cancelled:
+                        _kill(proc)
+                        proc.communicate()
+                        token.check()
+        except BaseException:
+            if proc.poll() is None:
+                _kill(proc)
+                proc.communicate()
+            raise
+        info["returncode"] = proc.returncode
+    return subprocess.CompletedProcess(cmd, proc.returncode, out, err)
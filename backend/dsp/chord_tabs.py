@@ -1,38 +1,11 @@
 """
 Generate note_highway and chord tabs from chord analysis (no basic-pitch).
-Chord shapes match frontend GuitarHeroFretboard CHORD_SHAPES.
+Voicings come from dsp/voicings.py (every root and quality; CHORD_SHAPES match the frontend).
 [lowE, A, D, G, B, highE]; -1 = muted, 0 = open, >0 = fretted
 """
 from __future__ import annotations
 
-# Chord shapes: [string0, 1, 2, 3, 4, 5] = [lowE, A, D, G, B, highE]
-CHORD_SHAPES = {
-    "C": [0, 3, 2, 0, 1, 0],
-    "D": [-1, -1, 0, 2, 3, 2],
-    "E": [0, 2, 2, 1, 0, 0],
-    "F": [1, 3, 3, 2, 1, 1],
-    "G": [3, 2, 0, 0, 3, 3],
-    "A": [0, 0, 2, 2, 2, 0],
-    "Am": [0, 0, 2, 2, 1, 0],
-    "B": [2, 2, 4, 4, 4, 2],
-    "Bm": [2, 3, 4, 4, 3, 2],
-}
-
-# Map analysis output to supported shapes (fallback for C#m, F#m, etc.)
-CHORD_ALIASES = {
-    "C#": "C", "C#m": "Am", "Db": "C", "Dbm": "Am",
-    "D#": "D", "D#m": "Bm", "Eb": "D", "Ebm": "Bm",
-    "F#": "F", "F#m": "Am", "Gb": "F", "Gbm": "Am",
-    "G#": "G", "G#m": "Am", "Ab": "G", "Abm": "Am",
-    "A#": "A", "A#m": "Bm", "Bb": "A", "Bbm": "Bm",
-}
-
-
-def _normalize_chord(label: str) -> str | None:
-    if not label or not isinstance(label, str):
-        return None
-    lab = label.strip()
-    return CHORD_ALIASES.get(lab, lab) if lab in CHORD_SHAPES else CHORD_ALIASES.get(lab)
+from .voicings import CHORD_SHAPES, voicing_for_label  # noqa: F401
 
 
 def chords_to_note_highway(
@@ -59,12 +32,10 @@ def chords_to_note_highway(
     for c in chords or []:
         t0 = float(c.get("t0", 0))
         t1 = float(c.get("t1", t0))
-        label = c.get("label", "")
-        chord = _normalize_chord(label)
-        if not chord or chord not in CHORD_SHAPES:
+        shape = voicing_for_label(c.get("label", ""))
+        if not shape:
             continue
 
-        shape = CHORD_SHAPES[chord]
         t = t0
         while t < t1 - 0.02:
             for string_idx, fret in enumerate(shape):
@@ -0,0 +1,139 @@
+"""
+Difficulty tiers of a note_highway, derived once per job so clients never thin notes per frame.
+
+  hard    the full highway
+  medium  chords cut to their lowest three notes; onsets on the eighth-note grid; <= 4 per second
+  easy    chords reduced to root + fifth; onsets on every other beat; <= 2 per second
+
+Every rule is an array operation over the notes (chord groups, pitch ranks, nearest grid
+point, per-slot and per-second winners), so a full song costs a few milliseconds.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from .voicings import MAX_FRET, OPEN_MIDI
+
+TIERS = {
+    "easy": {"max_chord_notes": 2, "grid_per_beat": 0.5, "max_rate": 2.0},
+    "medium": {"max_chord_notes": 3, "grid_per_beat": 2, "max_rate": 4.0},
+    "hard": None,
+}
+CHORD_WINDOW_S = 0.04   # onsets this close are one chord (notes_to_highway's frame_window_s)
+_OPEN = np.array(OPEN_MIDI)
+
+
+def _chord_groups(t: np.ndarray) -> np.ndarray:
+    """Group id per note (notes sorted by time): a new group whenever the gap exceeds the window."""
+    return np.concatenate([[0], np.cumsum(np.diff(t) > CHORD_WINDOW_S)]) if len(t) else np.zeros(0, dtype=int)
+
+
+def _pitch_rank(g: np.ndarray, midi: np.ndarray) -> np.ndarray:
+    """0 for the lowest note of each chord group, 1 for the next, ..."""
+    order = np.lexsort((midi, g))
+    gs = g[order]
+    first = np.r_[True, gs[1:] != gs[:-1]]
+    idx = np.arange(len(order))
+    rank = np.empty(len(order), dtype=int)
+    rank[order] = idx - np.maximum.accumulate(np.where(first, idx, 0))
+    return rank
+
+
+def _grid(beat_times, bpm: float | None, duration: float, per_beat: float) -> np.ndarray:
+    from .lesson_bundle import beat_grid
+
+    beats = beat_grid(beat_times, bpm, duration)
+    if len(beats) < 2:
+        return beats
+    if per_beat < 1:
+        return beats[:: int(round(1 / per_beat))]
+    k = int(per_beat)
+    steps = np.diff(beats)[:, None] * (np.arange(k) / k)[None, :]
+    return np.concatenate([(beats[:-1, None] + steps).ravel(), beats[-1:]])
+
+
+def _tier(t, s, f, d, beat_times, bpm, duration, max_chord_notes, grid_per_beat, max_rate) -> dict:
+    midi = _OPEN[s] + f
+    g = _chord_groups(t)
+    rank = _pitch_rank(g, midi)
+    size = np.bincount(g)[g]
+
+    # chords: the lowest max_chord_notes notes; for root + fifth, the fifth above the root
+    keep = rank < max_chord_notes
+    extra = None
+    if max_chord_notes == 2:
+        root_midi = np.full(g.max() + 1, 0)
+        root_midi[g[rank == 0]] = midi[rank == 0]
+        is_fifth = (size > 1) & (rank > 0) & ((midi - root_midi[g]) % 12 == 7)
+        # first fifth (lowest) of each group
+        fifth_rank = np.full(g.max() + 1, np.iinfo(np.int64).max)
+        np.minimum.at(fifth_rank, g[is_fifth], rank[is_fifth])
+        keep = (rank == 0) | (is_fifth & (rank == fifth_rank[g]))
+        # chords without a fifth get a power-chord fifth on the next string up
+        roots = np.flatnonzero((rank == 0) & (size > 1) & (fifth_rank[g] == np.iinfo(np.int64).max))
+        rs = s[roots] + 1
+        ok = rs <= 5
+        roots, rs = roots[ok], rs[ok]
+        rf = midi[roots] + 7 - _OPEN[rs]
+        ok = (rf >= 0) & (rf <= MAX_FRET)
+        roots, rs, rf = roots[ok], rs[ok], rf[ok]
+        extra = (t[roots], rs, rf, d[roots], g[roots])
+
+    t, s, f, d, g = t[keep], s[keep], f[keep], d[keep], g[keep]
+    if extra is not None:
+        t, s, f, d, g = (np.concatenate([a, b]) for a, b in zip((t, s, f, d, g), extra))
+
+    # one chord per grid slot, the one whose onset is closest, snapped onto the grid
+    n_groups = int(g.max()) + 1 if len(g) else 0
+    onset = np.full(n_groups, np.inf)
+    np.minimum.at(onset, g, t)
+    live = np.isfinite(onset)
+    grid = _grid(beat_times, bpm, duration, grid_per_beat)
+    if len(grid) >= 2 and live.any():
+        tol = min(0.1, 0.25 * float(np.median(np.diff(grid))))
+        hi = np.clip(np.searchsorted(grid, onset), 1, len(grid) - 1)
+        slot = np.where(np.abs(onset - grid[hi - 1]) <= np.abs(onset - grid[hi]), hi - 1, hi)
+        dist = np.abs(onset - grid[slot])
+        live &= dist <= tol
+        cand = np.flatnonzero(live)
+        order = cand[np.lexsort((dist[cand], slot[cand]))]
+        _, first = np.unique(slot[order], return_index=True)
+        live[:] = False
+        live[order[first]] = True
+        onset = np.where(live, grid[slot], onset)
+
+    # note-rate cap: the first chord in each 1 / max_rate window
+    cand = np.flatnonzero(live)
+    cand = cand[np.argsort(onset[cand], kind="stable")]
+    _, first = np.unique(np.floor(onset[cand] * max_rate), return_index=True)
+    live[:] = False
+    live[cand[first]] = True
+
+    sel = live[g]
+    t, s, f, d = onset[g[sel]], s[sel], f[sel], d[sel]
+    order = np.lexsort((s, t))
+    notes = [
+        {"time": float(t[i]), "string": int(s[i]), "fret": int(f[i]), "duration": float(d[i])}
+        for i in order
+    ]
+    return {"duration": duration, "notes": notes}
+
+
+def highway_tiers(note_highway: dict | None, beat_times=None, bpm: float | None = None) -> dict:
+    """{"easy": highway, "medium": highway, "hard": highway} from a full note_highway."""
+    nh = note_highway or {}
+    notes = nh.get("notes") or []
+    duration = float(nh.get("duration") or 0.0)
+    tiers = {"hard": {"duration": duration, "notes": notes}}
+    t = np.array([n["time"] for n in notes], dtype=np.float64)
+    order = np.argsort(t, kind="stable")
+    t = t[order]
+    s = np.array([n["string"] for n in notes], dtype=np.int64)[order]
+    f = np.array([n["fret"] for n in notes], dtype=np.int64)[order]
+    d = np.array([n.get("duration", 0.0) for n in notes], dtype=np.float64)[order]
+    for name, params in TIERS.items():
+        if params is not None:
+            tiers[name] = _tier(t, s, f, d, beat_times, bpm, duration, **params) if len(t) else {
+                "duration": duration, "notes": []
+            }
+    return tiers
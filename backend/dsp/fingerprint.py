@@ -0,0 +1,193 @@
+"""
+Landmark audio fingerprints, so a re-encoded / re-ripped / trimmed copy of a song that was
+already analyzed can reuse that analysis.
+
+- fingerprint_pcm: spectral peaks of the audio at 11 kHz, paired into (f1, f2, dt) landmark
+  hashes, each stamped with its anchor frame. Peaks survive lossy encoding and resampling,
+  and pairs carry no absolute time, so trimmed copies still share most hashes.
+- FingerprintIndex: sqlite table of (hash, job_id, frame). match() votes on the frame
+  difference of every shared hash; a real match piles up at one offset.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+FP_SR = 11025
+FP_N_FFT = 1024
+FP_HOP = 256
+FRAME_S = FP_HOP / FP_SR
+
+PEAK_NEIGHBORHOOD = (15, 11)   # (bins, frames) a peak must dominate
+PEAKS_PER_S = 30
+FAN_OUT = 5                    # targets paired with each anchor
+MAX_DT = 63                    # frames (6 bits)
+MAX_DF = 64                    # bins
+
+MIN_MATCHES = 20               # aligned hashes needed to call it the same song
+MIN_MATCH_RATIO = 0.05         # ... and at least this share of the query's hashes
+
+
+def fingerprint_pcm(y: np.ndarray, sr: int) -> np.ndarray:
+    """(n, 2) int64 array of (hash, anchor frame) landmarks for mono float PCM."""
+    import librosa
+    from scipy.ndimage import maximum_filter
+
+    y = np.asarray(y, dtype=np.float32)
+    if y.ndim > 1:
+        y = y.mean(axis=1)
+    if sr != FP_SR:
+        y = librosa.resample(y, orig_sr=sr, target_sr=FP_SR, res_type="polyphase")
+    S = np.abs(librosa.stft(y, n_fft=FP_N_FFT, hop_length=FP_HOP))[: FP_N_FFT // 2]
+    if S.size == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    S = np.log(S + 1e-6)
+
+    is_peak = (S == maximum_filter(S, size=PEAK_NEIGHBORHOOD)) & (S > np.median(S) + 2.0)
+    f, t = np.nonzero(is_peak)
+    # keep the strongest peaks, at most PEAKS_PER_S on average
+    keep = max(1, int(PEAKS_PER_S * S.shape[1] * FRAME_S))
+    if len(f) > keep:
+        top = np.argpartition(-S[f, t], keep)[:keep]
+        f, t = f[top], t[top]
+    order = np.lexsort((f, t))
+    f, t = f[order].astype(np.int64), t[order].astype(np.int64)
+
+    hashes, anchors = [], []
+    taken = np.zeros(len(t), dtype=np.int64)
+    for k in range(1, FAN_OUT * 4 + 1):
+        i = np.arange(len(t) - k)
+        j = i + k
+        dt = t[j] - t[i]
+        ok = (dt >= 1) & (dt <= MAX_DT) & (np.abs(f[j] - f[i]) <= MAX_DF) & (taken[i] < FAN_OUT)
+        i, j = i[ok], j[ok]
+        taken[i] += 1
+        hashes.append((f[i] << 15) | (f[j] << 6) | (t[j] - t[i]))
+        anchors.append(t[i])
+    if not hashes:
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.stack([np.concatenate(hashes), np.concatenate(anchors)], axis=1)
+
+
+def fingerprint_file(path: Path) -> tuple[np.ndarray, float]:
+    """Landmarks and duration (s) of an audio file."""
+    import soundfile as sf
+
+    y, sr = sf.read(str(path), dtype="float32", always_2d=False)
+    return fingerprint_pcm(y, sr), len(y) / sr
+
+
+class FingerprintIndex:
+    """Local landmark index. Thread-safe; each call opens its own short-lived connection."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS tracks (
+                    job_id TEXT PRIMARY KEY, duration REAL, n_hashes INTEGER, created REAL
+                );
+                CREATE TABLE IF NOT EXISTS hashes (hash INTEGER, job_id TEXT, frame INTEGER);
+                CREATE INDEX IF NOT EXISTS hashes_by_hash ON hashes (hash);
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        return sqlite3.connect(str(self.path), timeout=30.0)
+
+    def add(self, job_id: str, landmarks: np.ndarray, duration: float) -> None:
+        with self._lock, self._connect() as db:
+            db.execute("DELETE FROM hashes WHERE job_id = ?", (job_id,))
+            db.execute(
+                "INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?)",
+                (job_id, float(duration), len(landmarks), time.time()),
+            )
+            db.executemany(
+                "INSERT INTO hashes VALUES (?, ?, ?)",
+                ((int(h), job_id, int(t)) for h, t in landmarks),
+            )
+
+    def remove(self, job_id: str) -> None:
+        with self._lock, self._connect() as db:
+            db.execute("DELETE FROM hashes WHERE job_id = ?", (job_id,))
+            db.execute("DELETE FROM tracks WHERE job_id = ?", (job_id,))
+
+    def match(self, landmarks: np.ndarray, exclude: str | None = None) -> dict | None:
+        """
+        Best indexed track for the query, or None:
+        {"job_id", "offset_s", "matches", "ratio"}; offset_s = source time - query time.
+        """
+        if len(landmarks) == 0:
+            return None
+        with self._lock, self._connect() as db:
+            db.execute("CREATE TEMP TABLE q (hash INTEGER, frame INTEGER)")
+            db.executemany("INSERT INTO q VALUES (?, ?)", ((int(h), int(t)) for h, t in landmarks))
+            rows = db.execute(
+                """
+                SELECT h.job_id, h.frame - q.frame AS d, COUNT(*) FROM q
+                JOIN hashes h ON h.hash = q.hash
+                GROUP BY h.job_id, d
+                """
+            ).fetchall()
+            db.execute("DROP TABLE q")
+
+        votes: dict[str, dict[int, int]] = {}
+        for job_id, d, n in rows:
+            if job_id != exclude:
+                votes.setdefault(job_id, {})[d] = n
+        best = None
+        for job_id, by_d in votes.items():
+            for d in by_d:
+                # re-encoding jitters peaks by a frame; count the neighbours too
+                n = by_d[d] + by_d.get(d - 1, 0) + by_d.get(d + 1, 0)
+                if best is None or n > best[0]:
+                    best = (n, job_id, d)
+        if best is None:
+            return None
+        n, job_id, d = best
+        ratio = n / len(landmarks)
+        if n < MIN_MATCHES or ratio < MIN_MATCH_RATIO:
+            return None
+        return {"job_id": job_id, "offset_s": d * FRAME_S, "matches": n, "ratio": ratio}
+
+
+def _shift(t: float, offset_s: float) -> float:
+    return max(0.0, float(t) - offset_s)
+
+
+def shift_result(result: dict, offset_s: float) -> dict:
+    """
+    A job result moved onto a copy of the song whose time 0 is the source's offset_s.
+    Anything that ends up before the copy starts is dropped.
+    """
+    chords = [
+        {**c, "t0": _shift(c["t0"], offset_s), "t1": _shift(c["t1"], offset_s)}
+        for c in result.get("chords") or []
+        if float(c["t1"]) - offset_s > 0
+    ]
+    nh = result.get("note_highway")
+    if nh is not None:
+        nh = {
+            **nh,
+            "duration": _shift(nh.get("duration", 0.0), offset_s),
+            "notes": [
+                {**n, "time": float(n["time"]) - offset_s}
+                for n in nh.get("notes") or []
+                if float(n["time"]) - offset_s >= 0
+            ],
+        }
+    out = {**result, "chords": chords, "note_highway": nh}
+    if result.get("sections") is not None:
+        out["sections"] = [
+            {**s, "t0": _shift(s["t0"], offset_s), "t1": _shift(s["t1"], offset_s)}
+            for s in result["sections"]
+            if float(s["t1"]) - offset_s > 0
+        ]
+    return out
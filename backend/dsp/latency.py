@@ -0,0 +1,90 @@
+"""
+Fixed-bucket latency histograms for the live pipeline (capture -> queue -> DSP -> send)
+and for job turnaround (upload -> preview / final result).
+Buckets are log-spaced, so recording is one searchsorted + increment and percentiles
+are read straight off the cumulative counts; no samples are kept.
+"""
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+
+# 0.05 ms .. 20 s, 20 buckets per decade (~12% resolution)
+_EDGES_MS = np.logspace(np.log10(0.05), np.log10(20000.0), 113)
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self._counts = np.zeros(len(_EDGES_MS) + 1, dtype=np.int64)
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, ms: float) -> None:
+        if ms is None or not np.isfinite(ms):
+            return
+        ms = max(0.0, float(ms))
+        b = int(np.searchsorted(_EDGES_MS, ms, side="right"))
+        with self._lock:
+            self._counts[b] += 1
+            self._sum_ms += ms
+            self._max_ms = max(self._max_ms, ms)
+
+    @property
+    def count(self) -> int:
+        return int(self._counts.sum())
+
+    def percentile(self, p: float) -> float | None:
+        """Upper edge of the bucket holding the p-th percentile (0-100)."""
+        with self._lock:
+            counts = self._counts.copy()
+            max_ms = self._max_ms
+        total = int(counts.sum())
+        if total == 0:
+            return None
+        b = int(np.searchsorted(np.cumsum(counts), np.ceil(total * p / 100.0), side="left"))
+        if b >= len(_EDGES_MS):
+            return max_ms
+        return min(float(_EDGES_MS[b]), max_ms)
+
+    def snapshot(self) -> dict:
+        n = self.count
+        return {
+            "count": n,
+            "mean_ms": (self._sum_ms / n) if n else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self._max_ms if n else None,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts[:] = 0
+            self._sum_ms = 0.0
+            self._max_ms = 0.0
+
+
+# Aggregate over all live sessions. "total" is ADC timestamp -> websocket send complete.
+# "post" is live worker -> event loop (only for offloaded DSP, see dsp.live_worker).
+_STAGES = ("capture", "queue", "dsp", "post")
+LIVE_LATENCY: dict[str, LatencyHistogram] = {
+    stage: LatencyHistogram() for stage in (*_STAGES, "send", "total")
+}
+
+
+def record_live_latency(latency: dict, send_ms: float) -> None:
+    """Record one event's stage breakdown (from stream_live_guitar_events) plus the send time."""
+    total = send_ms
+    for stage in _STAGES:
+        ms = latency.get(f"{stage}_ms")
+        if ms is not None:
+            LIVE_LATENCY[stage].record(ms)
+            total += ms
+    LIVE_LATENCY["send"].record(send_ms)
+    LIVE_LATENCY["total"].record(total)
+
+
+# Upload -> first provisional result (preview tier) and upload -> final result, per job.
+JOB_LATENCY: dict[str, LatencyHistogram] = {stage: LatencyHistogram() for stage in ("preview", "final")}
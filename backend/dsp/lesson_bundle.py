@@ -0,0 +1,149 @@
+"""
+Lesson bundle: everything Practice needs for one finished job in a single immutable file,
+named by its content hash so browsers and CDNs can cache it forever.
+
+Layout (little-endian):
+  b"GBLESSON" | u32 header length | header JSON (utf-8, space-padded so data is 8-aligned) | data
+
+The header holds the metadata and an offset table, {name: {"offset", "length", "dtype",
+"shape"}}, with offsets from the start of the data area. Each section starts 8-aligned, so a
+client can view columns in place (new Float32Array(buf, base + offset, n)) or range-request
+just one.
+
+Sections:
+  audio                      the job's audio, MP3 (FLAC where libsndfile can't write MP3)
+  notes.time, notes.duration float32 seconds   note_highway, one column per field
+  notes.string, notes.fret   uint8
+  chords.t0, chords.t1       float32 seconds
+  chords.label               uint16 index into header["chord_labels"]
+  beats                      float32 seconds, tracked beats then extended at the song's bpm
+  peaks                      int8 (n, 2) min/max waveform peaks, PEAKS_PER_S per second
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import struct
+from pathlib import Path
+
+import numpy as np
+
+LESSON_VERSION = 1
+MAGIC = b"GBLESSON"
+PEAKS_PER_S = 100
+
+
+def _encode_audio(y: np.ndarray, sr: int) -> tuple[bytes, str]:
+    """MP3 plays everywhere; libsndfile writes it gapless, so note times stay exact."""
+    import soundfile as sf
+
+    buf = io.BytesIO()
+    if "MP3" in sf.available_formats():
+        sf.write(buf, y, sr, format="MP3", subtype="MPEG_LAYER_III")
+        return buf.getvalue(), "audio/mpeg"
+    sf.write(buf, y, sr, format="FLAC", subtype="PCM_16")
+    return buf.getvalue(), "audio/flac"
+
+
+def waveform_peaks(y: np.ndarray, sr: int, per_s: int = PEAKS_PER_S) -> np.ndarray:
+    """(n, 2) int8 min/max of each 1/per_s second bucket."""
+    hop = max(1, sr // per_s)
+    n = -(-len(y) // hop)
+    padded = np.zeros(n * hop, dtype=np.float32)
+    padded[: len(y)] = y
+    frames = padded.reshape(n, hop)
+    peaks = np.stack([frames.min(axis=1), frames.max(axis=1)], axis=1)
+    return np.clip(np.round(peaks * 127.0), -127, 127).astype(np.int8)
+
+
+def beat_grid(beat_times, bpm: float | None, duration: float) -> np.ndarray:
+    """Tracked beats (chord analysis only looks at the first 30 s), extended to the end at bpm."""
+    beats = np.asarray(beat_times if beat_times is not None else [], dtype=np.float64)
+    beats = beats[beats < duration]
+    if bpm and bpm > 0:
+        period = 60.0 / bpm
+        start = beats[-1] + period if len(beats) else 0.0
+        beats = np.concatenate([beats, np.arange(start, duration, period)])
+    return beats
+
+
+def build_lesson(wav_path: Path, result: dict, beat_times, out_dir: Path, prefix: str) -> dict:
+    """
+    Write <prefix>_<hash>.lesson into out_dir (skipped if that exact bundle exists).
+    Returns {"file", "hash", "bytes"}.
+    """
+    import soundfile as sf
+
+    y, sr = sf.read(str(wav_path), dtype="float32", always_2d=False)
+    if y.ndim > 1:
+        y = y.mean(axis=1)
+    duration = len(y) / sr
+
+    nh = result.get("note_highway") or {}
+    notes = nh.get("notes") or []
+    chords = result.get("chords") or []
+    labels = sorted({c["label"] for c in chords})
+    label_ix = {lab: i for i, lab in enumerate(labels)}
+    audio, mime = _encode_audio(y, sr)
+
+    sections = {
+        "audio": np.frombuffer(audio, dtype=np.uint8),
+        "notes.time": np.array([n["time"] for n in notes], dtype=np.float32),
+        "notes.duration": np.array([n.get("duration", 0.0) for n in notes], dtype=np.float32),
+        "notes.string": np.array([n["string"] for n in notes], dtype=np.uint8),
+        "notes.fret": np.array([n["fret"] for n in notes], dtype=np.uint8),
+        "chords.t0": np.array([c["t0"] for c in chords], dtype=np.float32),
+        "chords.t1": np.array([c["t1"] for c in chords], dtype=np.float32),
+        "chords.label": np.array([label_ix[c["label"]] for c in chords], dtype=np.uint16),
+        "beats": beat_grid(beat_times, result.get("bpm"), duration).astype(np.float32),
+        "peaks": waveform_peaks(y, sr),
+    }
+
+    table, chunks, offset = {}, [], 0
+    for name, arr in sections.items():
+        raw = np.ascontiguousarray(arr).astype(arr.dtype.newbyteorder("<"), copy=False).tobytes()
+        table[name] = {"offset": offset, "length": len(raw), "dtype": arr.dtype.name, "shape": list(arr.shape)}
+        pad = -len(raw) % 8
+        chunks.append(raw + b"\0" * pad)
+        offset += len(raw) + pad
+    table["audio"]["mime"] = mime
+
+    header = json.dumps({
+        "version": LESSON_VERSION,
+        "duration": duration,
+        "sr": sr,
+        "bpm": result.get("bpm"),
+        "note_source": result.get("note_source"),
+        "note_duration": nh.get("duration"),
+        "chord_labels": labels,
+        "tabs": result.get("tabs"),
+        "song_sections": result.get("sections"),
+        "peaks_per_s": PEAKS_PER_S,
+        "sections": table,
+    }, separators=(",", ":")).encode("utf-8")
+    header += b" " * (-(len(MAGIC) + 4 + len(header)) % 8)
+    body = MAGIC + struct.pack("<I", len(header)) + header + b"".join(chunks)
+
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{prefix}_{digest}.lesson"
+    if not path.exists():
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(body)
+        tmp.replace(path)
+    return {"file": path.name, "hash": digest, "bytes": len(body)}
+
+
+def read_lesson(data: bytes) -> tuple[dict, dict]:
+    """(header, {section: ndarray}) of a bundle; the inverse of build_lesson."""
+    if data[: len(MAGIC)] != MAGIC:
+        raise ValueError("not a lesson bundle")
+    (n,) = struct.unpack_from("<I", data, len(MAGIC))
+    base = len(MAGIC) + 4 + n
+    header = json.loads(data[len(MAGIC) + 4 : base])
+    sections = {}
+    for name, s in header["sections"].items():
+        raw = data[base + s["offset"] : base + s["offset"] + s["length"]]
+        sections[name] = np.frombuffer(raw, dtype=np.dtype(s["dtype"]).newbyteorder("<")).reshape(s["shape"])
+    return header, sections
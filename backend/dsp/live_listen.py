@@ -1,27 +1,11 @@
 # backend/dsp/live_listen.py
 import asyncio
-import os
 import numpy as np
-import sounddevice as sd
 import time
 import librosa
 
-
-def _get_input_device():
-    """Use Scarlett if available, else default. Set SCARLETT_DEVICE=index to force."""
-    idx = os.environ.get("SCARLETT_DEVICE")
-    if idx is not None:
-        try:
-            return int(idx)
-        except ValueError:
-            pass
-    # Prefer Scarlett by name
-    devices = sd.query_devices(kind="input")
-    for i, d in enumerate(devices):
-        name = str(d.get("name", "")).lower()
-        if "scarlett" in name or "focusrite" in name:
-            return i
-    return None  # system default
+from .live_sources import FileReplaySource, SoundDeviceSource, _get_input_device  # noqa: F401
+from .live_spectrum import SpectralFluxOnset, window_spectrum, yin_from_spectrum
 
 
 def hz_to_note_name(hz: float):
@@ -30,100 +14,179 @@ def hz_to_note_name(hz: float):
     midi = librosa.hz_to_midi(hz)
     return librosa.midi_to_note(int(round(midi)))
 
+class LiveAnalyzer:
+    """
+    Per-stream live DSP state: channel pick, rolling window, RMS gate, onset and YIN pitch.
+    Pure numpy/librosa and picklable, so it runs the same in-loop or in a live worker process.
+
+    The window is transformed once per hop (dsp.live_spectrum); the spectral-flux onset
+    detector and YIN both work from that spectrum. Onset events carry onset_strength
+    (flux / adaptive threshold) and onset_sample, the onset's position inside the hop.
+
+    channel_mode="loudest": analyze only the loudest input channel of each block (one stream).
+    channel_mode="all":     analyze every channel in one vectorized pass (RMS, one batched
+                            FFT for onset and pitch), e.g. guitar DI + vocal mic, or two players.
+    Every event is tagged with the input channel it came from.
+    """
+
+    def __init__(self, sr: int, win_size: int = 4096, min_interval_s: float = 0.05, channel_mode: str = "loudest"):
+        if channel_mode not in ("loudest", "all"):
+            raise ValueError(f"unknown channel_mode: {channel_mode}")
+        self.sr = sr
+        self.win_size = win_size
+        self.channel_mode = channel_mode
+        self.min_interval = int(min_interval_s * sr)
+        self.buf = None  # (n_streams, win_size), allocated on the first block
+        self.last_send_sample = None
+        self.onsets = None
+
+    def _alloc(self, n_streams: int, hop_size: int) -> None:
+        self.buf = np.zeros((n_streams, self.win_size), dtype=np.float32)
+        self.last_send_sample = np.full(n_streams, -self.sr, dtype=np.int64)  # first event goes out immediately
+        self.onsets = SpectralFluxOnset(self.sr, hop_size, n_streams, self.win_size + 1)
+
+    def process(self, block: np.ndarray, sample_index: int) -> list[dict]:
+        """Analyze one (hop_size, channels) block; returns events (none when throttled)."""
+        if block.ndim == 1:
+            block = block[:, None]
+        if self.channel_mode == "all":
+            x = block.T
+            chans = np.arange(block.shape[1])
+        else:
+            # pick loudest channel (guitar might be plugged into input 2)
+            rms_per_ch = np.sqrt(np.mean(block**2, axis=0))
+            ch = int(np.argmax(rms_per_ch))
+            x = block[:, ch][None, :]
+            chans = np.array([ch])
+        if self.buf is None or self.buf.shape[0] != x.shape[0]:
+            self._alloc(x.shape[0], x.shape[1])
+
+        # rolling window for pitch estimation
+        buf, n = self.buf, x.shape[1]
+        if n >= self.win_size:
+            buf[:] = x[:, -self.win_size:]
+        else:
+            buf[:, :-n] = buf[:, n:]
+            buf[:, -n:] = x
+
+        energy = np.sqrt(np.mean(buf**2, axis=1)) + 1e-12
+        due = (sample_index - self.last_send_sample) >= self.min_interval
+
+        # gate silence: prevents fake “B5 @ 1000Hz” when input is basically silent
+        silent = energy < 1e-6
+        X = window_spectrum(buf)
+        onset, strength, onset_sample = self.onsets.process(X, x, sample_index)
+        onset &= ~silent
+        pitched = ~silent & (onset | due)
+        emit = (silent & due) | pitched
+        if not emit.any():
+            return []
+
+        hz = np.full(len(chans), np.nan)
+        conf = np.zeros(len(chans))
+        if pitched.any():
+            # YIN from the same spectrum, all channels that need it at once
+            f0, aperiodicity = yin_from_spectrum(X[pitched], buf[pitched], self.sr, fmin=80, fmax=1000)
+            hz[pitched] = f0
+            # confidence proxy: energy + periodicity
+            conf[pitched] = np.clip((energy[pitched] / 0.05) * (1.0 - aperiodicity), 0.0, 1.0)
+
+        self.last_send_sample[emit] = sample_index
+        now = time.time()
+        events = []
+        for i in np.flatnonzero(emit):
+            ev = {
+                "ts": now,
+                "channel": int(chans[i]),
+                "pitch_hz": float(hz[i]) if pitched[i] else None,
+                "note": hz_to_note_name(float(hz[i])) if pitched[i] else None,
+                "confidence": float(conf[i]),
+                "onset": bool(onset[i]),
+                "onset_strength": float(strength[i]),
+                "energy": float(energy[i]),
+            }
+            if onset[i]:
+                ev["onset_sample"] = int(onset_sample[i])
+                ev["onset_t"] = int(onset_sample[i]) / self.sr
+            events.append(ev)
+        return events
+
+
 async def stream_live_guitar_events(
     device=None,          # None = auto-detect Scarlett or default
     channels: int = 2,    # Scarlett 2i2 typically has 2 input channels
     sr: int | None = None,
     hop_size: int = 1024,
     win_size: int = 4096,
+    min_interval_s: float = 0.05,
+    source=None,          # None = SoundDeviceSource(device, channels, sr); see dsp.live_sources
+    offload: bool = True,
+    channel_mode: str = "loudest",  # "all" = analyze every input channel (events tagged by channel)
+    record_dir=None,      # record the raw input + events to FLAC segments here (dsp.live_recorder)
 ):
-    loop = asyncio.get_event_loop()
-    q: asyncio.Queue[np.ndarray] = asyncio.Queue()
-
-    if device is None:
-        device = _get_input_device()
-    if sr is None:
-        try:
-            sr = int(sd.query_devices(device)["default_samplerate"])
-        except Exception:
-            sr = 44100
-
-    buf = np.zeros(win_size, dtype=np.float32)
-    last_send = 0.0
-    last_energy = 0.0
-
-    def callback(indata, frames, time_info, status):
-        # push full multichannel block
-        loop.call_soon_threadsafe(q.put_nowait, indata.copy().astype(np.float32))
-
-    stream = sd.InputStream(
-        samplerate=sr,
-        blocksize=hop_size,
-        channels=channels,
-        callback=callback,
-        device=device,
-    )
-
-    stream.start()
+    """
+    Yield pitch/onset events for the live input, one per hop (throttled to min_interval_s
+    of audio; onsets are never dropped). Ends when a finite source (file replay) runs out.
+
+    offload=True runs the DSP in a live worker process fed through a shared-memory ring
+    (see dsp.live_worker), so it never competes with HTTP handlers on the event loop.
+    offload=False analyzes in-loop (handy for profiling the DSP itself).
+
+    Every event carries where it sits in the input and how long it took to get here:
+      sample_index: running sample counter at the end of the hop (sample-accurate)
+      stream_t:     sample_index / sr, seconds of audio since the stream started
+      adc_time:     capture time of the hop's first sample on the source clock
+                    (PortAudio inputBufferAdcTime for a device)
+      latency:      {"capture_ms", "queue_ms", "dsp_ms"[, "post_ms"]}; the websocket
+                    layer adds the send stage (see dsp.latency.record_live_latency)
+    """
+    if source is None:
+        source = SoundDeviceSource(device=device, channels=channels, sr=sr)
+    recorder = None
+    if record_dir is not None:
+        from .live_recorder import SessionRecorder
+
+        # a device never waits for the disk; a file replay can
+        recorder = SessionRecorder(
+            record_dir, source.sr, source.channels, hop_size, backpressure=not isinstance(source, SoundDeviceSource)
+        )
     try:
-        while True:
-            block = await q.get()  # shape: (hop_size, channels)
-
-            # pick loudest channel (guitar might be plugged into input 2)
-            if block.ndim == 2 and block.shape[1] > 1:
-                rms_per_ch = np.sqrt(np.mean(block**2, axis=0))
-                ch = int(np.argmax(rms_per_ch))
-                x = block[:, ch]
-            else:
-                x = block[:, 0] if block.ndim == 2 else block
-
-            # rolling window for pitch estimation
-            if len(x) >= win_size:
-                buf[:] = x[-win_size:]
-            else:
-                buf = np.roll(buf, -len(x))
-                buf[-len(x):] = x
-
-            energy = float(np.sqrt(np.mean(buf**2)) + 1e-12)
-
-            # gate silence: prevents fake “B5 @ 1000Hz” when input is basically silent
-            if energy < 1e-6:
-                now = time.time()
-                if now - last_send > 0.05:
-                    yield {
-                        "ts": now,
-                        "pitch_hz": None,
-                        "note": None,
-                        "confidence": 0.0,
-                        "onset": False,
-                        "energy": energy,
-                    }
-                    last_send = now
-                continue
-
-            onset = (energy - last_energy) > 0.01
-            last_energy = 0.9 * last_energy + 0.1 * energy
-
-            # pitch with librosa.yin
-            f0 = librosa.yin(buf, fmin=80, fmax=1000, sr=sr)
-            hz = float(np.nanmedian(f0))
-            note = hz_to_note_name(hz)
-
-            # confidence proxy: energy + stability
-            stability = float(np.nanstd(f0))
-            conf = float(max(0.0, min(1.0, (energy / 0.05) * (1.0 - stability / 80.0))))
-
-            now = time.time()
-            if now - last_send > 0.05:
-                yield {
-                    "ts": now,
-                    "pitch_hz": hz,
-                    "note": note,
-                    "confidence": conf,
-                    "onset": bool(onset),
-                    "energy": energy,
-                }
-                last_send = now
+        if offload:
+            from .live_worker import stream_offloaded
+
+            async for ev in stream_offloaded(source, hop_size, win_size, min_interval_s, channel_mode, recorder):
+                yield ev
+        else:
+            async for ev in _stream_in_loop(source, hop_size, win_size, min_interval_s, channel_mode, recorder):
+                yield ev
     finally:
-        stream.stop()
-        stream.close()
\ No newline at end of file
+        if recorder is not None:
+            recorder.close()
+
+
+async def _stream_in_loop(source, hop_size, win_size, min_interval_s, channel_mode, recorder=None):
+    """stream_live_guitar_events body for offload=False."""
+    sr = source.sr
+    analyzer = LiveAnalyzer(sr, win_size=win_size, min_interval_s=min_interval_s, channel_mode=channel_mode)
+    async for block, sample_index, adc_time, cb_time in source.blocks(hop_size):
+        # block shape: (hop_size, channels)
+        if recorder is not None:
+            while not recorder.write(block, sample_index, adc_time, cb_time):
+                await asyncio.sleep(0.001)
+        t_dequeue = source.clock()
+        events = analyzer.process(block, sample_index)
+        t_done = source.clock()
+        for ev in events:
+            ev.update({
+                "sample_index": sample_index,
+                "stream_t": sample_index / sr,
+                "adc_time": adc_time,
+                "latency": {
+                    "capture_ms": (cb_time - adc_time) * 1000.0,
+                    "queue_ms": (t_dequeue - cb_time) * 1000.0,
+                    "dsp_ms": (t_done - t_dequeue) * 1000.0,
+                },
+            })
+            if recorder is not None:
+                recorder.add_event(ev)
+            yield ev
@@ -0,0 +1,195 @@
+"""
+Session recorder for live input: the raw blocks the live pipeline sees, written to FLAC
+segments by a background thread, with each segment's onset/pitch events alongside.
+
+The audio side only calls write(), which copies the block into a preallocated ring
+(dsp.live_worker.ShmRing) and returns; it never blocks, never waits for the disk and never
+allocates a buffer. For a device a full ring drops the block and counts it; the writer fills
+the gap with silence so segment time always equals stream time. With backpressure=True
+(file replay, which can wait) a full ring makes write() return False so the source retries.
+
+Layout (one directory per session):
+  session.json                 manifest: sr, channels, segments, dropped blocks
+  segment_000.flac             stream samples [0, segment_s * sr)
+  segment_000.events.jsonl     events whose sample_index falls in that segment
+  ...
+"""
+from __future__ import annotations
+
+import collections
+import json
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .live_worker import ShmRing
+
+# event fields that only describe this run's timing; not useful for review/replay
+_VOLATILE = {"latency", "ring_overruns", "ts"}
+
+
+class SessionRecorder:
+    def __init__(
+        self,
+        out_dir: Path,
+        sr: int,
+        channels: int,
+        hop_size: int,
+        *,
+        segment_s: float = 60.0,
+        ring_seconds: float = 10.0,
+        backpressure: bool = False,
+    ):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.sr, self.channels, self.hop_size = int(sr), int(channels), int(hop_size)
+        self.segment_frames = max(hop_size, int(segment_s * sr))
+        self.backpressure = backpressure
+        self.ring = ShmRing(max(8, int(ring_seconds * sr / hop_size)), hop_size, channels)
+        self.started = time.time()
+        self.segments: list[dict] = []
+        self._last_index = 0              # producer side: newest sample_index accepted
+        self._end_index = 0               # ... and newest offered (dropped blocks included)
+        self.dropped_blocks = 0
+        self._events: collections.deque = collections.deque()
+        self._event_counts: collections.Counter = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="live-recorder", daemon=True)
+        self._thread.start()
+
+    # --- producer side (audio callback / event loop) ---
+
+    def write(self, block: np.ndarray, sample_index: int, adc_time: float, cb_time: float) -> bool:
+        """Same signature as ShmRing.write. Blocks already taken (a replay retrying) are skipped."""
+        if sample_index <= self._last_index:
+            return True
+        self._end_index = sample_index
+        if not self.ring.write(block, sample_index, adc_time, cb_time):
+            if self.backpressure:
+                return False
+            self.dropped_blocks += 1
+        self._last_index = sample_index
+        return True
+
+    def add_event(self, event: dict) -> None:
+        """Queue a live event for its segment's index (deque.append is thread-safe)."""
+        self._events.append(event)
+
+    def tee(self, write):
+        """write() for a live source that feeds both the analysis ring and this recorder."""
+        def _write(block, sample_index, adc_time, cb_time):
+            if not self.write(block, sample_index, adc_time, cb_time):
+                return False  # backpressure: nothing written yet, the source retries
+            return write(block, sample_index, adc_time, cb_time)
+
+        return _write
+
+    # --- writer thread ---
+
+    def _segment_path(self, k: int, suffix: str) -> Path:
+        return self.out_dir / f"segment_{k:03d}{suffix}"
+
+    def _open_segment(self, k: int):
+        import soundfile as sf
+
+        info = {
+            "index": k,
+            "file": self._segment_path(k, ".flac").name,
+            "events": self._segment_path(k, ".events.jsonl").name,
+            "t0": k * self.segment_frames / self.sr,
+            "frames": 0,
+        }
+        self.segments.append(info)
+        self._segment_path(k, ".events.jsonl").touch()  # a quiet segment still has its index
+        f = sf.SoundFile(
+            str(self._segment_path(k, ".flac")), mode="w", samplerate=self.sr,
+            channels=self.channels, format="FLAC", subtype="PCM_24",
+        )
+        return f, info
+
+    def _run(self) -> None:
+        f, seg = None, None
+        written = 0  # stream samples on disk so far (including filled gaps)
+        ev_files: dict[int, object] = {}
+        try:
+            while True:
+                item = self.ring.peek()
+                if item is None:
+                    self._drain_events(ev_files)
+                    if self._stop.is_set():
+                        break
+                    time.sleep(0.005)
+                    continue
+                block, sample_index, _, _, _ = item
+                start = sample_index - block.shape[0]
+                if start > written:
+                    gap = np.zeros((start - written, self.channels), dtype=np.float32)
+                    f, seg, written = self._write_frames(f, seg, written, gap)
+                if sample_index > written:
+                    f, seg, written = self._write_frames(f, seg, written, block[written - start :])
+                self.ring.advance()
+            if self._end_index > written:
+                # blocks dropped at the very end still count as (silent) stream time
+                gap = np.zeros((self._end_index - written, self.channels), dtype=np.float32)
+                f, seg, written = self._write_frames(f, seg, written, gap)
+        finally:
+            if f is not None:
+                f.close()
+            self._drain_events(ev_files)
+            for fh in ev_files.values():
+                fh.close()
+            self._write_manifest()
+            self.ring.close()
+
+    def _write_frames(self, f, seg, written: int, frames: np.ndarray):
+        pos = 0
+        while pos < len(frames):
+            k = written // self.segment_frames
+            if seg is None or seg["index"] != k:
+                if f is not None:
+                    f.close()
+                    self._write_manifest()
+                f, seg = self._open_segment(k)
+            n = min(len(frames) - pos, (k + 1) * self.segment_frames - written)
+            f.write(frames[pos : pos + n])
+            seg["frames"] += n
+            written += n
+            pos += n
+        return f, seg, written
+
+    def _drain_events(self, ev_files: dict) -> None:
+        while self._events:
+            ev = self._events.popleft()
+            k = max(0, int(ev.get("sample_index", 0)) - 1) // self.segment_frames
+            fh = ev_files.get(k)
+            if fh is None:
+                fh = ev_files[k] = open(self._segment_path(k, ".events.jsonl"), "a")
+            fh.write(json.dumps({key: v for key, v in ev.items() if key not in _VOLATILE}) + "\n")
+            self._event_counts[k] += 1
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "sr": self.sr,
+            "channels": self.channels,
+            "segment_s": self.segment_frames / self.sr,
+            "started": self.started,
+            "dropped_blocks": self.dropped_blocks,
+            "segments": [
+                {**s, "t1": s["t0"] + s["frames"] / self.sr, "n_events": self._event_counts[s["index"]]}
+                for s in self.segments
+            ],
+        }
+        tmp = self.out_dir / "session.json.tmp"
+        tmp.write_text(json.dumps(manifest, indent=2))
+        tmp.replace(self.out_dir / "session.json")
+
+    def close(self, timeout: float | None = None) -> None:
+        """
+        Stop recording: the writer flushes what is left in the ring, finishes the files and
+        the manifest on its own. timeout=None returns at once (safe on the event loop).
+        """
+        self._stop.set()
+        if timeout is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,197 @@
+"""
+Input sources for the live pipeline (stream_live_guitar_events).
+
+A source yields hop-sized float32 blocks of shape (hop_size, channels) together with
+(sample_index, adc_time, callback_time), and exposes clock() on the same time base as
+those stamps, so the latency breakdown works the same for hardware and replay.
+
+blocks() delivers through an asyncio queue for in-loop analysis; feed() instead hands each
+block to write(block, sample_index, adc_time, callback_time) as soon as it exists (from
+the audio thread for a device), which is how the shared-memory ring in dsp.live_worker is filled.
+
+- SoundDeviceSource: PortAudio input (Scarlett/Focusrite if present, else default device)
+- FileReplaySource:  a WAV file or in-memory PCM, paced at real time or as fast as possible
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+def _get_input_device():
+    """Use Scarlett if available, else default. Set SCARLETT_DEVICE=index to force."""
+    import sounddevice as sd
+
+    idx = os.environ.get("SCARLETT_DEVICE")
+    if idx is not None:
+        try:
+            return int(idx)
+        except ValueError:
+            pass
+    # Prefer Scarlett by name
+    devices = sd.query_devices(kind="input")
+    for i, d in enumerate(devices):
+        name = str(d.get("name", "")).lower()
+        if "scarlett" in name or "focusrite" in name:
+            return i
+    return None  # system default
+
+
+class SoundDeviceSource:
+    """Live audio interface input via sounddevice (imported lazily, so replay works without PortAudio)."""
+
+    def __init__(self, device=None, channels: int = 2, sr: int | None = None):
+        import sounddevice as sd
+
+        self._sd = sd
+        self.device = _get_input_device() if device is None else device
+        self.channels = channels
+        if sr is None:
+            try:
+                sr = int(sd.query_devices(self.device)["default_samplerate"])
+            except Exception:
+                sr = 44100
+        self.sr = sr
+        self._stream = None
+
+    def clock(self) -> float:
+        return float(self._stream.time) if self._stream is not None else time.perf_counter()
+
+    async def blocks(self, hop_size: int):
+        loop = asyncio.get_running_loop()
+        q: asyncio.Queue[tuple[np.ndarray, int, float, float]] = asyncio.Queue()
+        samples_in = 0
+
+        def callback(indata, frames, time_info, status):
+            nonlocal samples_in
+            samples_in += frames
+            # Some host APIs report 0 for the ADC time; fall back to the callback time
+            adc = float(time_info.inputBufferAdcTime) or float(time_info.currentTime)
+            # push full multichannel block with its sample position and stream-clock stamps
+            loop.call_soon_threadsafe(
+                q.put_nowait,
+                (indata.copy().astype(np.float32), samples_in, adc, float(time_info.currentTime)),
+            )
+
+        self._stream = self._sd.InputStream(
+            samplerate=self.sr,
+            blocksize=hop_size,
+            channels=self.channels,
+            callback=callback,
+            device=self.device,
+        )
+        self._stream.start()
+        try:
+            while True:
+                yield await q.get()
+        finally:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    async def feed(self, hop_size: int, write) -> None:
+        """Call write() straight from the audio callback until cancelled. write must not block."""
+        samples_in = 0
+
+        def callback(indata, frames, time_info, status):
+            nonlocal samples_in
+            samples_in += frames
+            adc = time_info.inputBufferAdcTime or time_info.currentTime
+            write(indata, samples_in, adc, time_info.currentTime)  # ring full = drop, never wait
+
+        self._stream = self._sd.InputStream(
+            samplerate=self.sr,
+            blocksize=hop_size,
+            channels=self.channels,
+            dtype="float32",
+            callback=callback,
+            device=self.device,
+        )
+        self._stream.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+class FileReplaySource:
+    """
+    Replay a WAV file (or a float array at `sr`) in hop-sized blocks.
+    realtime=True sleeps so blocks arrive at the rate a device would deliver them and
+    adc_time is when the block would have been captured; realtime=False runs flat out
+    (for throughput benchmarks and deterministic accuracy tests).
+    """
+
+    def __init__(
+        self,
+        audio: str | Path | np.ndarray,
+        sr: int | None = None,
+        *,
+        realtime: bool = True,
+        loop: bool = False,
+        channels: int | None = None,
+    ):
+        if isinstance(audio, np.ndarray):
+            if sr is None:
+                raise ValueError("sr is required when replaying an array")
+            y = audio
+        else:
+            import soundfile as sf
+
+            y, sr = sf.read(str(audio), dtype="float32", always_2d=True)
+        y = np.asarray(y, dtype=np.float32)
+        if y.ndim == 1:
+            y = y[:, None]
+        if channels is not None and channels != y.shape[1]:
+            # mono file into an N-channel pipeline: same signal on every channel
+            y = np.repeat(y[:, :1], channels, axis=1)
+        self.pcm = np.ascontiguousarray(y)
+        self.sr = int(sr)
+        self.channels = int(self.pcm.shape[1])
+        self.realtime = realtime
+        self.loop = loop
+        self._t0 = time.perf_counter()
+
+    def clock(self) -> float:
+        return time.perf_counter() - self._t0
+
+    async def blocks(self, hop_size: int):
+        self._t0 = time.perf_counter()
+        n = self.pcm.shape[0]
+        samples_in = 0
+        pos = 0
+        while True:
+            if pos >= n:
+                if not self.loop or n == 0:
+                    return
+                pos = 0
+            block = self.pcm[pos : pos + hop_size]
+            if block.shape[0] < hop_size:
+                block = np.pad(block, ((0, hop_size - block.shape[0]), (0, 0)))
+            pos += hop_size
+
+            if self.realtime:
+                adc = samples_in / self.sr
+                samples_in += hop_size
+                # a device hands over the block once its last sample has been captured
+                delay = samples_in / self.sr - self.clock()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            else:
+                samples_in += hop_size
+                adc = self.clock()
+                # still yield to the loop so concurrent replays and handlers interleave
+                await asyncio.sleep(0)
+            yield block.copy(), samples_in, adc, self.clock()
+
+    async def feed(self, hop_size: int, write) -> None:
+        """Hand blocks to write(); when it reports a full ring, back off instead of dropping."""
+        async for block, sample_index, adc, cb in self.blocks(hop_size):
+            while not write(block, sample_index, adc, cb):
+                await asyncio.sleep(0.001)
@@ -0,0 +1,142 @@
+"""
+One FFT per hop, shared by the live pitch and onset stages.
+
+The rolling window (n_streams, N) is transformed once, zero-padded to 2N:
+  - pitch: |X|^2 -> irfft is the window's linear autocorrelation, which is all YIN's
+    difference function needs (one YIN frame per window, integrated over the whole overlap)
+  - onset: a Hann-windowed spectrum is derived from X in the frequency domain
+    (3 taps at +-2 bins for a 2N-point DFT) and fed to a streaming spectral-flux detector
+    with an adaptive median/MAD threshold. The onset is then placed from the sub-block
+    energy rise over the last two hops, which gives sub-hop timing.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+
+def window_spectrum(buf: np.ndarray) -> np.ndarray:
+    """rfft of each row zero-padded to 2N (linear, not circular, autocorrelation)."""
+    return np.fft.rfft(buf, n=2 * buf.shape[-1], axis=-1)
+
+
+def yin_from_spectrum(
+    X: np.ndarray,
+    buf: np.ndarray,
+    sr: int,
+    fmin: float = 80.0,
+    fmax: float = 1000.0,
+    trough_threshold: float = 0.1,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    YIN f0 (Hz) and aperiodicity (0 = perfectly periodic) per row of buf, from its spectrum X.
+    """
+    n = buf.shape[-1]
+    min_lag = max(1, int(np.floor(sr / fmax)))
+    max_lag = min(n // 2, int(np.ceil(sr / fmin)))
+
+    # d(tau) = sum over the overlap (x[j] - x[j+tau])^2 = m(tau) - 2 r(tau), per overlapping sample
+    acf = np.fft.irfft(X.real**2 + X.imag**2, axis=-1)[:, : max_lag + 1]
+    sq = np.cumsum(buf.astype(np.float64) ** 2, axis=-1)
+    lags = np.arange(max_lag + 1)
+    m = sq[:, n - 1 - lags] + (sq[:, -1:] - np.concatenate([np.zeros((buf.shape[0], 1)), sq[:, lags[1:] - 1]], axis=-1))
+    diff = np.maximum(m - 2.0 * acf, 0.0) / (n - lags)
+
+    # cumulative mean normalized difference
+    tau = np.arange(1, max_lag + 1)
+    cmnd = np.ones_like(diff)
+    cmnd[:, 1:] = diff[:, 1:] * tau / (np.cumsum(diff[:, 1:], axis=-1) + 1e-12)
+
+    seg = cmnd[:, min_lag : max_lag + 1]
+    # first local minimum under the threshold, else the global minimum
+    is_trough = np.zeros_like(seg, dtype=bool)
+    is_trough[:, 1:-1] = (seg[:, 1:-1] <= seg[:, :-2]) & (seg[:, 1:-1] <= seg[:, 2:])
+    below = is_trough & (seg < trough_threshold)
+    idx = np.where(below.any(axis=-1), np.argmax(below, axis=-1), np.argmin(seg, axis=-1))
+
+    # parabolic interpolation around the chosen lag
+    rows = np.arange(seg.shape[0])
+    i0 = np.clip(idx - 1, 0, seg.shape[1] - 1)
+    i2 = np.clip(idx + 1, 0, seg.shape[1] - 1)
+    a, b, c = seg[rows, i0], seg[rows, idx], seg[rows, i2]
+    denom = a - 2.0 * b + c
+    shift = np.where((np.abs(denom) > 1e-12) & (i0 < idx) & (idx < i2), 0.5 * (a - c) / np.where(denom == 0, 1, denom), 0.0)
+    period = min_lag + idx + np.clip(shift, -1.0, 1.0)
+    return sr / period, np.clip(b, 0.0, 1.0)
+
+
+class SpectralFluxOnset:
+    """
+    Streaming spectral-flux onset detector over the shared window spectrum.
+    Threshold per stream = median + k * MAD of the recent flux (history_s), floored at delta;
+    an onset fires on the hop where flux crosses it, then stays quiet for min_gap_s.
+    """
+
+    def __init__(
+        self,
+        sr: int,
+        hop_size: int,
+        n_streams: int,
+        n_bins: int,
+        *,
+        history_s: float = 1.0,
+        k: float = 4.0,
+        delta: float = 0.1,
+        min_gap_s: float = 0.05,
+        sub_blocks: int = 8,
+        gamma: float = 100.0,
+    ):
+        self.sr = sr
+        self.hop_size = hop_size
+        self.k, self.delta, self.gamma = k, delta, gamma
+        self.sub_blocks = sub_blocks
+        self.min_gap = int(min_gap_s * sr)
+        self.hist = np.zeros((n_streams, max(4, int(history_s * sr / hop_size))))
+        self._pos = 0
+        self.prev_mag = np.zeros((n_streams, n_bins))
+        self._primed = False
+        self.prev_hop = None
+        self.prev_over = np.zeros(n_streams, dtype=bool)
+        self.last_onset = np.full(n_streams, -(10 ** 12), dtype=np.int64)
+
+    def process(self, X: np.ndarray, hop: np.ndarray, sample_index: int):
+        """
+        X: (n_streams, bins) window spectrum; hop: (n_streams, frames) newest samples.
+        Returns (onset bool, strength, onset_sample) per stream; strength = flux / threshold.
+        """
+        Xh = 0.5 * X
+        Xh[:, 2:] -= 0.25 * X[:, :-2]
+        Xh[:, :-2] -= 0.25 * X[:, 2:]
+        # |X| * 2/N ~ sinusoid amplitude, so gamma compresses the same way at any window size
+        mag = np.log1p(self.gamma * (2.0 / (X.shape[-1] - 1)) * np.abs(Xh))
+        flux = np.maximum(mag - self.prev_mag, 0.0).mean(axis=-1) * 100.0
+        if not self._primed:
+            flux[:] = 0.0  # no previous spectrum yet
+            self._primed = True
+        self.prev_mag = mag
+
+        med = np.median(self.hist, axis=-1)
+        mad = np.median(np.abs(self.hist - med[:, None]), axis=-1)
+        thr = np.maximum(med + self.k * mad, self.delta)
+        self.hist[:, self._pos] = flux
+        self._pos = (self._pos + 1) % self.hist.shape[1]
+
+        over = flux > thr
+        onset = over & ~self.prev_over & ((sample_index - self.last_onset) >= self.min_gap)
+        self.prev_over = over
+        strength = flux / thr
+
+        # sub-hop timing: the sub-block with the largest energy rise over the last two hops
+        # (the Hann taper can push detection one hop past the attack)
+        frames = hop.shape[1]
+        recent = np.concatenate([self.prev_hop[:, -frames:], hop], axis=-1) if self.prev_hop is not None else hop
+        self.prev_hop = hop.copy()
+        onset_sample = np.full(len(flux), sample_index, dtype=np.int64)
+        if onset.any():
+            sub = max(1, frames // self.sub_blocks)
+            n_sub = recent.shape[1] // sub
+            lead = recent.shape[1] - n_sub * sub
+            e = (recent[onset, lead:].astype(np.float64) ** 2).reshape(-1, n_sub, sub).sum(axis=-1)
+            rise = np.diff(np.concatenate([e[:, :1], e], axis=-1), axis=-1)
+            onset_sample[onset] = sample_index - n_sub * sub + np.argmax(rise, axis=-1) * sub
+            self.last_onset[onset] = onset_sample[onset]
+        return onset, strength, onset_sample
@@ -0,0 +1,300 @@
+"""
+Off-loop live DSP: audio is written into a shared-memory ring by the source (straight from
+the PortAudio callback for a device) and analyzed by a pool of worker processes, which post
+compact events back to the event loop. The loop only copies blocks in and events out.
+
+- ShmRing:        single-producer/single-consumer ring of hop-sized blocks in shared memory
+- LiveWorkerPool: lazily spawned worker processes (up to LIVE_WORKERS, default cores - 1);
+                  each session goes to the least-loaded worker, so several sessions spread
+                  across cores while one worker can still serve many light sessions
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import multiprocessing as mp
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_HEADER = 4           # int64: write count, read count, overruns, unused
+_STAMPS = 5           # float64 per slot: sample_index, frames, adc_time, capture_ms, t_write (perf_counter)
+
+
+class ShmRing:
+    """
+    Hop-sized slots in one shared-memory segment. write() never allocates large buffers and
+    never blocks: a full ring returns False (the caller drops, or backs off for file replay).
+    perf_counter is system-wide monotonic, so t_write is comparable across processes.
+    """
+
+    def __init__(self, n_slots: int, hop_size: int, channels: int, name: str | None = None):
+        self.n_slots, self.hop_size, self.channels = n_slots, hop_size, channels
+        size = 8 * _HEADER + 8 * _STAMPS * n_slots + 4 * n_slots * hop_size * channels
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        buf = self.shm.buf
+        self._counters = np.ndarray((_HEADER,), dtype=np.int64, buffer=buf, offset=0)
+        self._stamps = np.ndarray((n_slots, _STAMPS), dtype=np.float64, buffer=buf, offset=8 * _HEADER)
+        self._data = np.ndarray(
+            (n_slots, hop_size, channels), dtype=np.float32, buffer=buf,
+            offset=8 * _HEADER + 8 * _STAMPS * n_slots,
+        )
+        if self.owner:
+            self._counters[:] = 0
+
+    @property
+    def spec(self) -> tuple:
+        """Arguments to attach to this ring from another process."""
+        return (self.n_slots, self.hop_size, self.channels, self.shm.name)
+
+    @property
+    def overruns(self) -> int:
+        return int(self._counters[2])
+
+    def write(self, block: np.ndarray, sample_index: int, adc_time: float, cb_time: float) -> bool:
+        w, r = int(self._counters[0]), int(self._counters[1])
+        if w - r >= self.n_slots:
+            self._counters[2] += 1
+            return False
+        slot = w % self.n_slots
+        frames = min(block.shape[0], self.hop_size)
+        np.copyto(self._data[slot, :frames], block[:frames, : self.channels], casting="unsafe")
+        stamps = self._stamps[slot]
+        stamps[0] = sample_index
+        stamps[1] = frames
+        stamps[2] = adc_time
+        stamps[3] = (cb_time - adc_time) * 1000.0
+        stamps[4] = time.perf_counter()
+        self._counters[0] = w + 1  # publish after the data is in place
+        return True
+
+    def peek(self):
+        """Oldest unread (block view, sample_index, adc_time, capture_ms, t_write), or None. Call advance() when done."""
+        r = int(self._counters[1])
+        if r >= int(self._counters[0]):
+            return None
+        slot = r % self.n_slots
+        sample_index, frames, adc_time, capture_ms, t_write = self._stamps[slot]
+        return self._data[slot, : int(frames)], int(sample_index), float(adc_time), float(capture_ms), float(t_write)
+
+    def advance(self) -> None:
+        self._counters[1] += 1
+
+    def close(self) -> None:
+        # drop numpy views before closing the mapping
+        self._counters = self._stamps = self._data = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _worker_main(cmd_q, out_q) -> None:
+    """Worker process: drain every attached ring, run LiveAnalyzer, post (sid, event)."""
+    from dsp.live_listen import LiveAnalyzer
+
+    sessions: dict[int, list] = {}  # sid -> [ring, analyzer, eof]
+    while True:
+        while True:
+            try:
+                cmd = cmd_q.get(block=not sessions)
+            except Exception:
+                break
+            op, sid = cmd[0], cmd[1]
+            if op == "open":
+                _, _, spec, sr, win_size, min_interval_s, channel_mode = cmd
+                sessions[sid] = [ShmRing(*spec), LiveAnalyzer(sr, win_size, min_interval_s, channel_mode), False]
+            elif op == "eof" and sid in sessions:
+                sessions[sid][2] = True
+            elif op == "close" and sid in sessions:
+                sessions.pop(sid)[0].close()
+            elif op == "stop":
+                for ring, _, _ in sessions.values():
+                    ring.close()
+                return
+
+        busy = False
+        for sid, (ring, analyzer, eof) in list(sessions.items()):
+            item = ring.peek()
+            while item is not None:
+                busy = True
+                block, sample_index, adc_time, capture_ms, t_write = item
+                t_dequeue = time.perf_counter()
+                events = analyzer.process(block, sample_index)
+                ring.advance()
+                t_done = time.perf_counter()
+                for ev in events:
+                    ev["sample_index"] = sample_index
+                    ev["stream_t"] = sample_index / analyzer.sr
+                    ev["adc_time"] = adc_time
+                    ev["latency"] = {
+                        "capture_ms": capture_ms,
+                        "queue_ms": (t_dequeue - t_write) * 1000.0,
+                        "dsp_ms": (t_done - t_dequeue) * 1000.0,
+                        "_t_done": t_done,
+                    }
+                    out_q.put((sid, ev))
+                item = ring.peek()
+            if eof:
+                out_q.put((sid, None))  # ring drained after end of input
+                sessions.pop(sid)[0].close()
+        if not busy:
+            time.sleep(0.001)
+
+
+class _Worker:
+    def __init__(self, ctx, pool: "LiveWorkerPool"):
+        self.cmd_q = ctx.Queue()
+        self.out_q = ctx.Queue()
+        self.proc = ctx.Process(target=_worker_main, args=(self.cmd_q, self.out_q), daemon=True)
+        self.proc.start()
+        self.sessions: set[int] = set()
+        self._pool = pool
+        # pump thread: worker results -> the owning session's event loop
+        threading.Thread(target=self._pump, daemon=True).start()
+
+    def _pump(self) -> None:
+        while True:
+            try:
+                item = self.out_q.get()
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            sid, ev = item
+            sess = self._pool._sessions.get(sid)
+            if sess is not None:
+                sess.loop.call_soon_threadsafe(sess.events.put_nowait, ev)
+
+
+class LiveSession:
+    def __init__(self, sid: int, ring: ShmRing, worker: _Worker):
+        self.sid = sid
+        self.ring = ring
+        self.worker = worker
+        self.loop = asyncio.get_running_loop()
+        self.events: asyncio.Queue = asyncio.Queue()
+
+
+class LiveWorkerPool:
+    def __init__(self, max_workers: int | None = None):
+        if max_workers is None:
+            max_workers = int(os.environ.get("LIVE_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+        self.max_workers = max(1, max_workers)
+        # spawn: forking a process that runs uvicorn threads / PortAudio isn't safe
+        self._ctx = mp.get_context("spawn")
+        self._workers: list[_Worker] = []
+        self._sessions: dict[int, LiveSession] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _pick_worker(self) -> _Worker:
+        self._workers = [w for w in self._workers if w.proc.is_alive()]
+        idle = min(self._workers, key=lambda w: len(w.sessions), default=None)
+        if idle is None or (idle.sessions and len(self._workers) < self.max_workers):
+            idle = _Worker(self._ctx, self)
+            self._workers.append(idle)
+        return idle
+
+    def open(self, sr: int, channels: int, hop_size: int, win_size: int, min_interval_s: float,
+             channel_mode: str = "loudest", ring_seconds: float = 2.0) -> LiveSession:
+        n_slots = max(8, int(ring_seconds * sr / hop_size))
+        ring = ShmRing(n_slots, hop_size, channels)
+        with self._lock:
+            worker = self._pick_worker()
+            sid = next(self._ids)
+            sess = LiveSession(sid, ring, worker)
+            self._sessions[sid] = sess
+            worker.sessions.add(sid)
+        worker.cmd_q.put(("open", sid, ring.spec, sr, win_size, min_interval_s, channel_mode))
+        return sess
+
+    def end_of_input(self, sess: LiveSession) -> None:
+        sess.worker.cmd_q.put(("eof", sess.sid))
+
+    def close(self, sess: LiveSession) -> None:
+        with self._lock:
+            self._sessions.pop(sess.sid, None)
+            sess.worker.sessions.discard(sess.sid)
+        if sess.worker.proc.is_alive():
+            sess.worker.cmd_q.put(("close", sess.sid))
+        # worker closes its mapping; the segment is unlinked here (the mapping survives unlink)
+        sess.ring.close()
+
+    def shutdown(self, timeout: float = 2.0) -> None:
+        for w in self._workers:
+            if w.proc.is_alive():
+                w.cmd_q.put(("stop", 0))
+                w.out_q.put(None)
+        for w in self._workers:
+            w.proc.join(timeout)
+            if w.proc.is_alive():
+                w.proc.terminate()
+        self._workers = []
+
+
+_POOL: LiveWorkerPool | None = None
+
+
+def get_pool() -> LiveWorkerPool:
+    global _POOL
+    if _POOL is None:
+        _POOL = LiveWorkerPool()
+    return _POOL
+
+
+def shutdown_pool() -> None:
+    """Stop the live workers, if any were started (server shutdown)."""
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown()
+        _POOL = None
+
+
+async def stream_offloaded(source, hop_size: int, win_size: int, min_interval_s: float, channel_mode: str = "loudest",
+                           recorder=None):
+    """stream_live_guitar_events body for offload=True: source -> ring -> worker -> events."""
+    pool = get_pool()
+    sess = pool.open(source.sr, source.channels, hop_size, win_size, min_interval_s, channel_mode)
+    write = recorder.tee(sess.ring.write) if recorder is not None else sess.ring.write
+
+    async def _feed():
+        try:
+            await source.feed(hop_size, write)
+        finally:
+            pool.end_of_input(sess)
+
+    feeder = asyncio.create_task(_feed())
+    try:
+        while True:
+            try:
+                ev = await asyncio.wait_for(sess.events.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                if not sess.worker.proc.is_alive():
+                    raise RuntimeError("live worker exited")
+                if feeder.done() and feeder.exception() is not None:
+                    raise feeder.exception()
+                continue
+            if ev is None:
+                break
+            latency = ev["latency"]
+            latency["post_ms"] = (time.perf_counter() - latency.pop("_t_done")) * 1000.0
+            ev["ring_overruns"] = sess.ring.overruns
+            if recorder is not None:
+                recorder.add_event(ev)
+            yield ev
+        if feeder.done() and not feeder.cancelled() and feeder.exception() is not None:
+            raise feeder.exception()
+    finally:
+        feeder.cancel()
+        try:
+            await feeder
+        except BaseException:
+            pass
+        pool.close(sess)
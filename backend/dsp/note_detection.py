@@ -8,7 +8,8 @@ from __future__ import annotations
 import numpy as np
 import librosa
 
-from .chord_tabs import CHORD_SHAPES
+from .trace import span as trace_span  # notes_from_features has a local `span`
+from .voicings import pitch_class_mask, shape_for_mask
 
 # Standard tuning MIDI: 0=low E2, 1=A2, 2=D3, 3=G3, 4=B3, 5=high e4
 OPEN_MIDI = [40, 45, 50, 55, 59, 64]
@@ -37,16 +38,8 @@ def _pitch_classes_to_chord_shape(pcs: list[int]) -> list[int] | None:
     """Map pitch classes to a chord shape [s0,s1,s2,s3,s4,s5]. Returns None if no match."""
     if len(pcs) < 2:
         return None
-    # Try to match known chord shapes
-    for name, shape in CHORD_SHAPES.items():
-        shape_pcs = set()
-        for s, f in enumerate(shape):
-            if f >= 0:
-                midi = OPEN_MIDI[s] + f
-                shape_pcs.add(midi % 12)
-        if set(pcs) <= shape_pcs and len(shape_pcs) >= 2:
-            return shape
-    return None
+    # O(1): precomputed table over all 12-bit pitch-class masks (see dsp/voicings.py)
+    return shape_for_mask(pitch_class_mask(pcs))
 
 
 def _single_note_to_fret(pc: int) -> tuple[int, int] | None:
@@ -115,48 +108,69 @@ def _extract_notes_at_onset(
     return [n] if n else []
 
 
-def analyze_notes_from_audio(
+def extract_note_features(
     wav_path,
     hop_length: int = 512,
-    bpm: float | None = None,
     duration_limit: float = 30.0,
 ) -> dict:
-    """
-    Detect note-level events from audio using onsets + chroma.
-    Returns:
-      notes: [{"time": s, "string": 0-5, "fret": int, "duration": s}, ...]
-      duration: float
-      bpm: float
-    Notes are either individual (intro, arpeggio) or grouped (strum).
-    """
-    y, sr = librosa.load(wav_path, sr=None, mono=True, duration=duration_limit)
+    """Expensive part of onset note detection (load, beats, onsets, CQT chroma). Persisted per job."""
+    with trace_span("librosa.load", cat="librosa"):
+        y, sr = librosa.load(wav_path, sr=None, mono=True, duration=duration_limit)
+
+    with trace_span("librosa.beat.beat_track", cat="librosa"):
+        tempo, _ = librosa.beat.beat_track(y=y, sr=sr, hop_length=hop_length)
+
+    with trace_span("librosa.onset.onset_detect", cat="librosa"):
+        onset_frames = librosa.onset.onset_detect(
+            y=y,
+            sr=sr,
+            hop_length=hop_length,
+            units="frames",
+            backtrack=True,
+        )
+    onset_times = librosa.frames_to_time(onset_frames, sr=sr, hop_length=hop_length)
 
-    tempo, _ = librosa.beat.beat_track(y=y, sr=sr, hop_length=hop_length)
-    bpm = bpm or float(tempo)
+    with trace_span("librosa.feature.chroma_cqt", cat="librosa"):
+        chroma = librosa.feature.chroma_cqt(y=y, sr=sr, hop_length=hop_length)
+    return {
+        "chroma": chroma.astype(np.float32),
+        "onset_times": onset_times,
+        "tempo": float(np.atleast_1d(tempo)[0]),
+        "sr": int(sr),
+        "hop_length": int(hop_length),
+        "n_samples": int(len(y)),
+        "duration_limit": float(duration_limit),
+    }
+
+
+def notes_from_features(
+    features: dict,
+    bpm: float | None = None,
+    strum_window_s: float = STRUM_WINDOW_S,
+    arpeggio_span_s: float = ARPEGGIO_SPAN_S,
+    quantize_div: int = QUANTIZE_DIV,
+) -> dict:
+    """Cheap part: notes at each onset, strum/arpeggio grouping, quantizing. Re-run on reprocess."""
+    sr = features["sr"]
+    duration_limit = features["duration_limit"]
+    bpm = bpm or features["tempo"]
     beat_s = 60.0 / bpm if bpm > 0 else 0.5
-    quantize_s = beat_s / QUANTIZE_DIV
-
-    onset_frames = librosa.onset.onset_detect(
-        y=y,
-        sr=sr,
-        hop_length=hop_length,
-        units="frames",
-        backtrack=True,
-    )
-    onset_times = librosa.frames_to_time(onset_frames, sr=sr, hop_length=hop_length)
+    quantize_s = beat_s / quantize_div
 
-    chroma = librosa.feature.chroma_cqt(y=y, sr=sr, hop_length=hop_length)
-    hop_s = hop_length / sr
+    onset_times = features["onset_times"]
+    chroma = features["chroma"]
+    hop_s = features["hop_length"] / sr
     n_frames = chroma.shape[1]
 
     raw_events: list[tuple[float, list[tuple[int, int]]]] = []
-    for i, t in enumerate(onset_times):
-        frame = int(round(t / hop_s))
-        frame = max(0, min(frame, n_frames - 1))
-        prev = chroma[:, frame - 1] if frame >= 1 else None
-        notes = _extract_notes_at_onset(chroma, frame, prev_chroma=prev)
-        if notes:
-            raw_events.append((float(t), notes))
+    with trace_span("fingering", cat="dsp", source="onsets", onsets=len(onset_times)):
+        for i, t in enumerate(onset_times):
+            frame = int(round(t / hop_s))
+            frame = max(0, min(frame, n_frames - 1))
+            prev = chroma[:, frame - 1] if frame >= 1 else None
+            notes = _extract_notes_at_onset(chroma, frame, prev_chroma=prev)
+            if notes:
+                raw_events.append((float(t), notes))
 
     # Group nearby onsets: strum (collapse) vs arpeggio (preserve)
     out_notes: list[dict] = []
@@ -169,7 +183,7 @@ def analyze_notes_from_audio(
         j = i + 1
         while j < len(raw_events):
             tj, notesj = raw_events[j]
-            if tj - t0 <= STRUM_WINDOW_S:
+            if tj - t0 <= strum_window_s:
                 cluster.append((tj, notesj))
                 j += 1
             else:
@@ -187,7 +201,7 @@ def analyze_notes_from_audio(
                 if key not in all_notes or t < all_notes[key]:
                     all_notes[key] = t
 
-        if span <= STRUM_WINDOW_S and len(all_notes) >= 2:
+        if span <= strum_window_s and len(all_notes) >= 2:
             # Strum: collapse to quantized time
             t_quant = round(min(times) / quantize_s) * quantize_s
             t_quant = max(0, t_quant)
@@ -198,7 +212,7 @@ def analyze_notes_from_audio(
                     "fret": f,
                     "duration": note_dur,
                 })
-        elif span > ARPEGGIO_SPAN_S or len(cluster) >= 3:
+        elif span > arpeggio_span_s or len(cluster) >= 3:
             # Arpeggio: preserve individual times, quantize slightly
             for t, notes in cluster:
                 t_q = round(t / quantize_s) * quantize_s
@@ -235,7 +249,7 @@ def analyze_notes_from_audio(
             seen.add(key)
             deduped.append(n)
 
-    duration = float(len(y) / sr) if len(y) > 0 else 0
+    duration = float(features["n_samples"] / sr) if features["n_samples"] > 0 else 0
     if deduped:
         duration = max(duration, max(n["time"] for n in deduped) + 0.5)
 
@@ -244,3 +258,21 @@ def analyze_notes_from_audio(
         "duration": min(duration, duration_limit),
         "bpm": float(bpm),
     }
+
+
+def analyze_notes_from_audio(
+    wav_path,
+    hop_length: int = 512,
+    bpm: float | None = None,
+    duration_limit: float = 30.0,
+) -> dict:
+    """
+    Detect note-level events from audio using onsets + chroma.
+    Returns:
+      notes: [{"time": s, "string": 0-5, "fret": int, "duration": s}, ...]
+      duration: float
+      bpm: float
+    Notes are either individual (intro, arpeggio) or grouped (strum).
+    """
+    features = extract_note_features(wav_path, hop_length=hop_length, duration_limit=duration_limit)
+    return notes_from_features(features, bpm=bpm)
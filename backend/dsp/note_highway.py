@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import contextvars
 import csv
+import math
 import os
 import shutil
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .cancel import CURRENT, Cancelled, CancelToken, check, run_cancellable
+from .trace import span
 
 # Standard tuning (MIDI) for open strings, string index matches your UI:
 # 0=low E2, 1=A2, 2=D3, 3=G3, 4=B3, 5=high e4
@@ -13,6 +18,13 @@ OPEN_MIDI = [40, 45, 50, 55, 59, 64]
 
 REQUIRED = {"start_time_s", "end_time_s", "pitch_midi", "velocity"}
 
+# Long audio is transcribed as overlapping segments, one basic-pitch process each (see
+# run_basic_pitch_segmented). Each process pays the model load, so segments stay long.
+SEGMENT_S = 60.0
+OVERLAP_S = 4.0      # the seam sits in the middle, leaving each side 2 s of context
+SEAM_TOL_S = 0.06    # onsets this close across a seam are the same note
+SPAN_PAD_S = 2.0     # context either side of a stretch transcribed on its own (see spans)
+
 
 def _which_basic_pitch() -> str:
     """
@@ -45,10 +57,16 @@ def run_basic_pitch(out_dir: Path, audio_path: Path) -> Path:
     cmd = [exe, str(out_dir), str(audio_path), "--save-note-events"]
 
     # Basic Pitch prints a lot; we still want errors if it fails.
-    proc = subprocess.run(cmd, capture_output=True, text=True)
+    # Killed at once if the job/stage is cancelled (dsp.cancel).
+    proc = run_cancellable(cmd)
     if proc.returncode != 0:
         raise RuntimeError(f"basic-pitch failed ({proc.returncode}): {proc.stderr or proc.stdout}")
 
+    return find_basic_pitch_csv(out_dir, audio_path)
+
+
+def find_basic_pitch_csv(out_dir: Path, audio_path: Path) -> Path:
+    """The note-events CSV a previous basic-pitch run left in out_dir."""
     # Usually <stem>_basic_pitch.csv
     stem = audio_path.stem
     csv_path = out_dir / f"{stem}_basic_pitch.csv"
@@ -81,6 +99,166 @@ def load_notes(csv_path: Path) -> List[Dict]:
     return notes
 
 
+def write_notes_csv(csv_path: Path, notes: List[Dict]) -> None:
+    """Note events in basic-pitch's CSV layout, so load_notes / reprocess read them back."""
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["start_time_s", "end_time_s", "pitch_midi", "velocity"])
+        for n in notes:
+            w.writerow([f"{n['start']:.4f}", f"{n['end']:.4f}", n["midi"], n["velocity"]])
+
+
+def segment_bounds(duration: float, segment_s: float = SEGMENT_S, overlap_s: float = OVERLAP_S):
+    """[(t0, t1)] covering [0, duration); neighbours share overlap_s seconds."""
+    step = segment_s - overlap_s
+    n = max(1, math.ceil((duration - overlap_s) / step))
+    return [(k * step, min(duration, k * step + segment_s)) for k in range(n)]
+
+
+def stitch_segment(
+    stitched: List[Dict], seg_notes: List[Dict], left_end: float, seam: float, tol: float = SEAM_TOL_S
+) -> List[Dict]:
+    """
+    Join the next segment's notes (absolute times, sorted by start) onto the notes stitched
+    so far, whose last segment ended at left_end. `seam` is the cut inside the overlap:
+    onsets before it belong to the left side, onsets after it to the right, so each note
+    in the overlap is kept once. Two more fix-ups at the seam:
+      - a left note running into left_end was cut off by the segment edge; the right
+        segment's same-pitch note already sounding before the seam continues it
+      - an onset that lands a hair either side of the seam on the two sides is one note,
+        kept once however the two sides' timing jitter falls
+    """
+    keep = [n for n in stitched if n["start"] < seam]
+    held: Dict[int, Dict] = {}
+    near_seam: Dict[int, Dict] = {}
+    for n in keep:
+        if n["end"] >= left_end - tol:
+            held[n["midi"]] = n
+        if n["start"] >= seam - 2 * tol:
+            near_seam[n["midi"]] = n
+
+    for n in seg_notes:
+        h = held.get(n["midi"])
+        if h is not None and n["start"] < min(seam, h["end"]):
+            h["end"] = max(h["end"], n["end"])
+            h["velocity"] = max(h["velocity"], n["velocity"])
+            continue
+        if n["start"] < seam - tol:
+            continue
+        # just before the seam: the left side may have put this onset just after it
+        d = near_seam.get(n["midi"])
+        if d is not None and abs(n["start"] - d["start"]) <= 2 * tol:
+            d["end"] = max(d["end"], n["end"])
+            continue
+        keep.append(n)
+    return keep
+
+
+def run_basic_pitch_segmented(
+    out_dir: Path,
+    audio_path: Path,
+    *,
+    segment_s: float = SEGMENT_S,
+    overlap_s: float = OVERLAP_S,
+    workers: Optional[int] = None,
+    on_partial: Optional[Callable[[List[Dict], float], None]] = None,
+    spans: Optional[List[Tuple[float, float]]] = None,
+) -> Path:
+    """
+    run_basic_pitch for long audio: overlapping segments transcribed by parallel basic-pitch
+    processes (BASIC_PITCH_WORKERS, default one per core), stitched in order as they finish.
+    on_partial(notes, t) is called after each segment but the last with the notes starting
+    before t, which later segments no longer change (held-over note ends aside).
+    `spans` limits transcription to those stretches (dsp.structure skips repeats), each
+    padded with SPAN_PAD_S of context and keeping the notes that start inside it.
+    Writes the stitched notes as <stem>_basic_pitch.csv and returns its path.
+    """
+    import soundfile as sf
+
+    info = sf.info(str(audio_path))
+    whole = spans is None
+    spans = [(0.0, info.duration)] if whole else [(float(a), float(b)) for a, b in spans if b > a]
+    bounds: List[Tuple[float, float]] = []
+    owner: List[int] = []  # span of each segment
+    for i, (s0, s1) in enumerate(spans):
+        p0, p1 = (s0, s1) if whole else (max(0.0, s0 - SPAN_PAD_S), min(info.duration, s1 + SPAN_PAD_S))
+        for a, b in segment_bounds(p1 - p0, segment_s, overlap_s):
+            bounds.append((p0 + a, p0 + b))
+            owner.append(i)
+    if whole and len(bounds) == 1:
+        return run_basic_pitch(out_dir, audio_path)
+
+    seg_dir = out_dir / "segments"
+    seg_dir.mkdir(parents=True, exist_ok=True)
+
+    # segments run under a child of this stage's token: the first one to fail cancels the
+    # others (killing their basic-pitch processes) rather than leaving them to finish
+    parent = CURRENT.get()
+    token = parent.child() if parent is not None else CancelToken()
+    failed: List[BaseException] = []
+
+    def transcribe(k: int) -> List[Dict]:
+        CURRENT.set(token)
+        check()  # queued behind other segments when the job was cancelled
+        t0, t1 = bounds[k]
+        try:
+            with span(f"basic-pitch segment {k}", cat="basic-pitch", t0=t0, t1=t1):
+                y, sr = sf.read(
+                    str(audio_path), start=int(t0 * info.samplerate), stop=int(t1 * info.samplerate),
+                    dtype="float32",
+                )
+                seg_path = seg_dir / f"segment_{k:03d}.wav"
+                sf.write(str(seg_path), y, sr, subtype=info.subtype)
+                notes = load_notes(run_basic_pitch(seg_dir / f"segment_{k:03d}", seg_path))
+                seg_path.unlink(missing_ok=True)
+        except Cancelled:
+            raise
+        except BaseException as e:
+            failed.append(e)
+            token.cancel(f"basic-pitch segment {k} failed")
+            raise
+        for n in notes:
+            n["start"] += t0
+            n["end"] += t0
+        return sorted(notes, key=lambda n: n["start"])
+
+    workers = workers or int(os.getenv("BASIC_PITCH_WORKERS", 0)) or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=min(workers, len(bounds)), thread_name_prefix="basic-pitch") as pool:
+        futures = [pool.submit(contextvars.copy_context().run, transcribe, k) for k in range(len(bounds))]
+        def inside(notes: List[Dict], i: int) -> List[Dict]:
+            return [n for n in notes if spans[i][0] <= n["start"] < spans[i][1]]
+
+        try:
+            done: List[Dict] = []  # notes of the finished spans
+            notes = futures[0].result()
+            for k in range(1, len(bounds)):
+                if owner[k] != owner[k - 1]:
+                    done += inside(notes, owner[k - 1])
+                    if on_partial is not None:
+                        on_partial(list(done), spans[owner[k]][0])
+                    notes = futures[k].result()
+                    continue
+                seam = bounds[k][0] + overlap_s / 2
+                if on_partial is not None:
+                    on_partial(done + [n for n in notes if n["start"] < seam], seam)
+                seg_notes = futures[k].result()
+                with span("stitch", cat="basic-pitch", seam=seam):
+                    notes = stitch_segment(notes, seg_notes, bounds[k - 1][1], seam)
+            notes = done + inside(notes, owner[-1])
+        except BaseException as e:
+            token.cancel("basic-pitch stopped")
+            for f in futures:
+                f.cancel()
+            if failed and isinstance(e, Cancelled):
+                raise failed[0]  # a sibling's failure, not the job's cancellation
+            raise
+    shutil.rmtree(seg_dir, ignore_errors=True)
+
+    csv_path = out_dir / f"{audio_path.stem}_basic_pitch.csv"
+    write_notes_csv(csv_path, sorted(notes, key=lambda n: n["start"]))
+    return csv_path
+
+
 def _candidates_for_midi(midi: int, max_fret: int) -> List[Tuple[int, int]]:
     """
     Returns [(string, fret)] that can play midi within max_fret.
@@ -131,9 +309,8 @@ def _assign_frame(notes: List[Dict], max_fret: int) -> List[Dict]:
     return out
 
 
-def build_note_highway(
-    audio_path: Path,
-    out_dir: Path,
+def notes_to_highway(
+    raw_notes: List[Dict],
     *,
     max_fret: int = 12,
     min_velocity: int = 25,
@@ -141,22 +318,9 @@ def build_note_highway(
     max_notes: int = 1200,
 ) -> Dict:
     """
-    Returns a PracticeVisualizer-friendly structure:
-      {
-        "duration": <seconds>,
-        "notes": [{ "time": <seconds>, "string": 0..5, "fret": 0..max_fret, "duration": <seconds> }, ...]
-      }
-
-    - Uses basic-pitch CLI to extract note events.
-    - Filters low-velocity noise.
-    - Groups notes that start within `frame_window_s` seconds to form chord-ish frames.
-    - Assigns pitches to strings/frets, trying to avoid multiple notes on same string in a frame.
-
-    Tip: If it looks too busy, increase min_velocity (e.g., 40) or lower max_notes.
+    Post-process basic-pitch note events (see load_notes) into a note_highway.
+    Cheap; re-run with new parameters on reprocess without re-running basic-pitch.
     """
-    csv_path = run_basic_pitch(out_dir, audio_path)
-    raw_notes = load_notes(csv_path)
-
     # Filter noise
     raw_notes = [n for n in raw_notes if n["velocity"] >= min_velocity]
     raw_notes.sort(key=lambda n: n["start"])
@@ -174,10 +338,11 @@ def build_note_highway(
         frames.append(frame)
 
     notes_out: List[Dict] = []
-    for frame in frames:
-        notes_out.extend(_assign_frame(frame, max_fret=max_fret))
-        if len(notes_out) >= max_notes:
-            break
+    with span("fingering", cat="dsp", source="basic_pitch", frames=len(frames)):
+        for frame in frames:
+            notes_out.extend(_assign_frame(frame, max_fret=max_fret))
+            if len(notes_out) >= max_notes:
+                break
 
     duration = 0.0
     if raw_notes:
@@ -185,3 +350,51 @@ def build_note_highway(
 
     # PracticeVisualizer expects `duration` in seconds
     return {"duration": float(duration), "notes": notes_out}
+
+
+def build_note_highway(
+    audio_path: Path,
+    out_dir: Path,
+    *,
+    max_fret: int = 12,
+    min_velocity: int = 25,
+    frame_window_s: float = 0.04,
+    max_notes: int = 1200,
+    on_partial: Optional[Callable[[Dict], None]] = None,
+    structure: Optional[Dict] = None,
+) -> Dict:
+    """
+    Returns a PracticeVisualizer-friendly structure:
+      {
+        "duration": <seconds>,
+        "notes": [{ "time": <seconds>, "string": 0..5, "fret": 0..max_fret, "duration": <seconds> }, ...]
+      }
+
+    - Uses basic-pitch CLI to extract note events; long audio in parallel segments, with
+      on_partial(highway) getting the notes of each finished leading stretch early.
+    - With a dsp.structure analysis, transcribes only its spans and copies the notes of
+      each repeated section onto its repeats.
+    - Filters low-velocity noise.
+    - Groups notes that start within `frame_window_s` seconds to form chord-ish frames.
+    - Assigns pitches to strings/frets, trying to avoid multiple notes on same string in a frame.
+
+    Tip: If it looks too busy, increase min_velocity (e.g., 40) or lower max_notes
+    (POST /jobs/{id}/reprocess re-runs just this step with the saved note events).
+    """
+    from .structure import copy_repeats
+
+    params = dict(max_fret=max_fret, min_velocity=min_velocity, frame_window_s=frame_window_s, max_notes=max_notes)
+    copies = (structure or {}).get("copies") or []
+
+    def publish(notes: List[Dict], t: float) -> None:
+        if on_partial is not None:
+            notes = [n for n in copy_repeats(notes, copies) if n["start"] < t]
+            on_partial({**notes_to_highway(notes, **params), "duration": t})
+
+    spans = structure["spans"] if copies else None
+    csv_path = run_basic_pitch_segmented(out_dir, audio_path, on_partial=publish, spans=spans)
+    notes = load_notes(csv_path)
+    if copies:
+        notes = copy_repeats(notes, copies)
+        write_notes_csv(csv_path, notes)  # reprocess reads the whole song back
+    return notes_to_highway(notes, **params)
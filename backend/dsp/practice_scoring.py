@@ -0,0 +1,182 @@
+"""
+Server-side practice scoring: compare live pitch/onset events with a job's note_highway.
+The highway is indexed once into time-sorted numpy arrays, so every live event is matched
+with a couple of searchsorted calls (O(log n)) instead of scanning the whole notes list.
+"""
+from __future__ import annotations
+
+import time
+
+import numpy as np
+
+# Standard tuning MIDI: 0=low E2, 1=A2, 2=D3, 3=G3, 4=B3, 5=high e4
+OPEN_MIDI = np.array([40, 45, 50, 55, 59, 64], dtype=np.int16)
+
+# An onset within this many seconds of an expected note can hit it
+HIT_WINDOW_S = 0.15
+# An expected note nobody hit by this long after its time counts as a miss
+MISS_AFTER_S = 0.25
+
+
+class HighwayIndex:
+    """Time-sorted, columnar view of a note_highway. Built once per job, shared by sessions."""
+
+    def __init__(self, note_highway: dict | None):
+        notes = (note_highway or {}).get("notes") or []
+        times = np.array([float(n.get("time", 0.0)) for n in notes], dtype=np.float64)
+        order = np.argsort(times, kind="stable")
+
+        self.times = times[order]
+        self.strings = np.array([int(n.get("string", 0)) for n in notes], dtype=np.int16)[order]
+        self.frets = np.array([int(n.get("fret", 0)) for n in notes], dtype=np.int16)[order]
+        self.midi = OPEN_MIDI[np.clip(self.strings, 0, 5)] + self.frets
+        self.duration = float((note_highway or {}).get("duration") or (self.times[-1] if len(self.times) else 0.0))
+
+    def __len__(self) -> int:
+        return int(self.times.shape[0])
+
+    def window(self, t0: float, t1: float) -> tuple[int, int]:
+        """Index range [lo, hi) of notes with t0 <= time <= t1."""
+        lo = int(np.searchsorted(self.times, t0, side="left"))
+        hi = int(np.searchsorted(self.times, t1, side="right"))
+        return lo, hi
+
+
+class PlaybackClock:
+    """Song position in seconds, re-synced from the client's player ({"t": ..., "playing": ...})."""
+
+    def __init__(self, position: float = 0.0, playing: bool = True):
+        self.sync(position, playing)
+
+    def sync(self, position: float, playing: bool = True) -> None:
+        self._position = float(position)
+        self._playing = bool(playing)
+        self._anchor = time.monotonic()
+
+    def now(self) -> float:
+        if not self._playing:
+            return self._position
+        return self._position + (time.monotonic() - self._anchor)
+
+
+def _hz_to_midi(hz) -> float | None:
+    if hz is None or not np.isfinite(hz) or hz <= 0:
+        return None
+    return 69.0 + 12.0 * float(np.log2(hz / 440.0))
+
+
+class PracticeScorer:
+    """
+    Per-session scoring state over a shared HighwayIndex.
+    Misses are swept with a pointer that only seek() moves back, so a play-through costs O(n).
+    """
+
+    def __init__(
+        self,
+        index: HighwayIndex,
+        *,
+        hit_window_s: float = HIT_WINDOW_S,
+        miss_after_s: float = MISS_AFTER_S,
+    ):
+        self.index = index
+        self.hit_window_s = hit_window_s
+        self.miss_after_s = miss_after_s
+        self.hit = np.zeros(len(index), dtype=bool)
+        self._miss_ptr = 0
+        self.hits = 0
+        self.misses = 0
+        self.extras = 0
+        self._abs_timing_ms = 0.0
+
+    def seek(self, position: float) -> None:
+        """
+        Resume at position after the user scrubs: notes before it are skipped without penalty,
+        and notes from it on can be played (again, after a scrub back) and are swept anew.
+        """
+        ptr = int(np.searchsorted(self.index.times, position, side="left"))
+        self.hit[ptr:] = False
+        self._miss_ptr = ptr
+
+    def _sweep_misses(self, t: float) -> list[dict]:
+        idx = self.index
+        end = int(np.searchsorted(idx.times, t - self.miss_after_s, side="left"))
+        out = []
+        if end > self._miss_ptr:
+            missed = np.flatnonzero(~self.hit[self._miss_ptr:end]) + self._miss_ptr
+            self.hit[missed] = True  # resolved; can no longer be hit
+            self.misses += len(missed)
+            for i in missed:
+                out.append({
+                    "type": "miss",
+                    "note_index": int(i),
+                    "time": float(idx.times[i]),
+                    "string": int(idx.strings[i]),
+                    "fret": int(idx.frets[i]),
+                })
+            self._miss_ptr = end
+        return out
+
+    def _match(self, t: float, midi: float | None) -> int | None:
+        """Closest unplayed note in the hit window whose pitch (or pitch class) matches."""
+        idx = self.index
+        lo, hi = idx.window(t - self.hit_window_s, t + self.hit_window_s)
+        if hi <= lo:
+            return None
+        cand = np.arange(lo, hi)[~self.hit[lo:hi]]
+        if cand.size == 0:
+            return None
+        if midi is not None:
+            semis = np.abs(idx.midi[cand] - midi)
+            # YIN often lands an octave off on guitar; accept pitch-class matches too
+            ok = (semis < 0.5) | (np.abs(((semis + 6.0) % 12.0) - 6.0) < 0.5)
+            cand = cand[ok]
+            if cand.size == 0:
+                return None
+        return int(cand[np.argmin(np.abs(idx.times[cand] - t))])
+
+    def score(self) -> dict:
+        judged = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "extras": self.extras,
+            "accuracy": (self.hits / judged) if judged else 0.0,
+            "mean_abs_timing_ms": (self._abs_timing_ms / self.hits) if self.hits else 0.0,
+            "progress": (self._miss_ptr / len(self.index)) if len(self.index) else 1.0,
+        }
+
+    def on_event(self, event: dict, t: float) -> list[dict]:
+        """Score one live event heard at playback position t. Returns hit/miss/extra events."""
+        out = self._sweep_misses(t)
+        if not event.get("onset"):
+            return out
+
+        midi = _hz_to_midi(event.get("pitch_hz"))
+        i = self._match(t, midi)
+        if i is None:
+            self.extras += 1
+            out.append({"type": "extra", "time": t, "midi": midi})
+            return out
+
+        idx = self.index
+        # Mono pitch tracking can't resolve a strum: one matching onset plays the whole frame
+        lo, hi = idx.window(idx.times[i], idx.times[i])
+        frame = np.arange(lo, hi)[~self.hit[lo:hi]]
+        self.hit[frame] = True
+        self.hits += len(frame)
+
+        timing_ms = (t - float(idx.times[i])) * 1000.0
+        self._abs_timing_ms += abs(timing_ms) * len(frame)
+        # cents against the nearest octave of the expected note
+        cents = None if midi is None else float((((midi - idx.midi[i]) + 6.0) % 12.0 - 6.0) * 100.0)
+        out.append({
+            "type": "hit",
+            "note_index": i,
+            "notes": [int(k) for k in frame],
+            "time": float(idx.times[i]),
+            "string": int(idx.strings[i]),
+            "fret": int(idx.frets[i]),
+            "timing_error_ms": timing_ms,
+            "pitch_error_cents": cents,
+        })
+        return out
@@ -0,0 +1,158 @@
+"""
+Practice renditions: a job's processed audio slowed down and/or transposed, plus the
+note_highway and chords remapped to match.
+
+Audio is rendered in fixed-length chunks (each stretched with a little context on both
+sides, which is trimmed off again, so seams stay clean), written as separate WAVs as soon as
+they are ready so playback can start on chunk 0. Results are cached per (job, rate, semitones)
+in an LRU that deletes evicted renditions from disk. A render runs under its entry's
+dsp.cancel token ("cancel") and stops at the next chunk once the entry is dropped.
+"""
+from __future__ import annotations
+
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from .cancel import check
+from .voicings import NOTE_NAMES, OPEN_MIDI, parse_label
+
+RENDITION_CHUNK_S = 10.0
+# context stretched with each chunk and trimmed afterwards (hides phase-vocoder edge effects)
+RENDITION_PAD_S = 0.5
+MIN_RATE, MAX_RATE = 0.25, 2.0
+MAX_SEMITONES = 12
+MAX_FRET = 12
+
+
+def rendition_key(rate: float, semitones: int) -> str:
+    return f"r{rate:.2f}_s{semitones:+d}"
+
+
+def render_rendition(wav_path: Path, out_dir: Path, rate: float, semitones: int, on_chunk=None) -> list[dict]:
+    """
+    Render chunk_000.wav, chunk_001.wav, ... into out_dir. on_chunk(info) fires per chunk
+    with {"index", "file", "t0", "t1"} (times in rendition seconds). Returns all chunk infos.
+    """
+    import librosa
+    import soundfile as sf
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    y, sr = sf.read(str(wav_path), dtype="float32", always_2d=False)
+    if y.ndim > 1:
+        y = y.mean(axis=1)
+
+    chunk = int(RENDITION_CHUNK_S * sr)
+    pad = int(RENDITION_PAD_S * sr)
+    chunks: list[dict] = []
+    t_out = 0.0
+    for i, start in enumerate(range(0, len(y), chunk)):
+        check()
+        stop = min(len(y), start + chunk)
+        a, b = max(0, start - pad), min(len(y), stop + pad)
+        seg = y[a:b]
+        # one phase-vocoder pass for both: stretch to rate / shift, then resample by shift,
+        # which restores the tempo and raises the pitch (what pitch_shift does on its own)
+        shift = 2.0 ** (semitones / 12.0)
+        if rate / shift != 1.0:
+            seg = librosa.effects.time_stretch(seg, rate=rate / shift)
+        if semitones:
+            seg = librosa.resample(seg, orig_sr=sr * shift, target_sr=sr)
+        # trim the stretched context back off
+        lead = int(round((start - a) / rate))
+        body = int(round((stop - start) / rate))
+        seg = seg[lead : lead + body]
+
+        name = f"chunk_{i:03d}.wav"
+        sf.write(str(out_dir / name), seg, sr, subtype="PCM_16")
+        info = {"index": i, "file": name, "t0": t_out, "t1": t_out + len(seg) / sr}
+        t_out = info["t1"]
+        chunks.append(info)
+        if on_chunk is not None:
+            on_chunk(info)
+    return chunks
+
+
+def _transpose_note(string: int, fret: int, semitones: int) -> tuple[int, int] | None:
+    """Same pitch + semitones, on the same string if it fits, else the nearest string that can play it."""
+    midi = OPEN_MIDI[string] + fret + semitones
+    best = None
+    for s, open_m in enumerate(OPEN_MIDI):
+        f = midi - open_m
+        if 0 <= f <= MAX_FRET:
+            cost = abs(s - string) * 3 + f
+            if best is None or cost < best[0]:
+                best = (cost, s, f)
+    return (best[1], best[2]) if best else None
+
+
+def _transpose_label(label: str, semitones: int) -> str:
+    parsed = parse_label(label)
+    if parsed is None:
+        return label
+    root, quality = parsed
+    return NOTE_NAMES[(root + semitones) % 12] + quality
+
+
+def rescale_result(result: dict, rate: float, semitones: int) -> dict:
+    """note_highway and chords of a job result mapped onto the rendition's timeline and key."""
+    nh = result.get("note_highway") or {}
+    notes = []
+    for n in nh.get("notes") or []:
+        pos = (int(n["string"]), int(n["fret"]))
+        if semitones:
+            pos = _transpose_note(pos[0], pos[1], semitones)
+            if pos is None:
+                continue
+        notes.append({
+            **n,
+            "time": float(n["time"]) / rate,
+            "duration": float(n.get("duration", 0.0)) / rate,
+            "string": pos[0],
+            "fret": pos[1],
+        })
+    chords = [
+        {**c, "t0": float(c["t0"]) / rate, "t1": float(c["t1"]) / rate, "label": _transpose_label(c.get("label", ""), semitones)}
+        for c in result.get("chords") or []
+    ]
+    bpm = result.get("bpm")
+    return {
+        "bpm": (bpm * rate) if bpm else bpm,
+        "chords": chords,
+        "note_highway": {"duration": float(nh.get("duration", 0.0)) / rate, "notes": notes},
+    }
+
+
+class RenditionCache:
+    """LRU of rendition entries; evicting one removes its directory."""
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: tuple, entry: dict) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            # oldest first, skipping renditions still being written
+            idle = [k for k, e in self._entries.items() if e.get("status") != "rendering"]
+            for old_key in idle[: max(0, len(self._entries) - self.max_entries)]:
+                shutil.rmtree(self._entries.pop(old_key)["dir"], ignore_errors=True)
+
+    def drop_job(self, job_id: str) -> None:
+        """Forget a job's entries, stop their renders and delete their files."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == job_id]:
+                entry = self._entries.pop(key)
+                if entry.get("cancel") is not None:
+                    entry["cancel"].cancel("job deleted")
+                shutil.rmtree(entry["dir"], ignore_errors=True)
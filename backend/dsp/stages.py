@@ -0,0 +1,156 @@
+"""
+Small DAG scheduler for job stages.
+
+Each Stage is a blocking function run on the worker thread pool (asyncio.to_thread) as soon as
+its dependencies have results, so independent stages overlap. Dependency results are passed
+as keyword arguments named after the dependency. An `optional` dependency is waited for too,
+but a stage whose optional input failed or timed out still runs, with None for it.
+
+Stages sharing a `group` are alternatives for one output (e.g. note_highway from basic-pitch,
+onset detection or chords). The lowest `priority` value that succeeds wins: once it has a
+result, every other stage in the group is cancelled, and a fallback that finished early is
+only used if everything better failed or timed out. The group's result is then available
+to later stages under the group name.
+
+Each stage runs under its own dsp.cancel token (a child of the caller's), cancelled when the
+stage times out, loses its group or the whole run is cancelled, so its subprocesses die with it.
+It also runs inside a dsp.trace span named after it, so the job's timeline shows it.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from .cancel import CURRENT, CancelToken
+from .trace import span
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[..., Any]
+    deps: tuple[str, ...] = ()
+    optional: tuple[str, ...] = ()
+    timeout: float | None = None
+    group: str | None = None
+    priority: int = 0
+
+
+@dataclass
+class StageRun:
+    results: dict[str, Any] = field(default_factory=dict)
+    errors: dict[str, BaseException] = field(default_factory=dict)
+    timings: dict[str, float] = field(default_factory=dict)   # seconds per finished stage
+    winners: dict[str, str] = field(default_factory=dict)     # group -> winning stage
+    cancelled: list[str] = field(default_factory=list)
+
+
+def _call(token: CancelToken, name: str, fn: Callable[..., Any], kwargs: dict) -> Any:
+    CURRENT.set(token)  # this thread's context copy only
+    with span(name, cat="stage"):
+        return fn(**kwargs)
+
+
+async def _run_one(stage: Stage, kwargs: dict, token: CancelToken) -> Any:
+    call = asyncio.to_thread(_call, token, stage.name, stage.fn, kwargs)
+    try:
+        if stage.timeout is None:
+            return await call
+        return await asyncio.wait_for(call, timeout=stage.timeout)
+    except BaseException:
+        token.cancel("stage timed out or was cancelled")  # the thread outlives the await
+        raise
+
+
+async def run_stages(stages: list[Stage], token: CancelToken | None = None) -> StageRun:
+    """
+    Run the DAG to completion; never raises for stage failures (see StageRun.errors).
+    `token` (default: the current one) cancels every running stage.
+    """
+    token = token or CURRENT.get() or CancelToken()
+    run = StageRun()
+    waiting = {s.name: s for s in stages}
+    groups: dict[str, list[Stage]] = {}
+    for s in stages:
+        if s.group:
+            groups.setdefault(s.group, []).append(s)
+    for members in groups.values():
+        members.sort(key=lambda s: s.priority)
+    running: dict[asyncio.Task, tuple[Stage, float]] = {}
+    tokens: dict[str, CancelToken] = {}  # made at launch, so a stage's deadline starts with it
+
+    def _done(name: str) -> bool:
+        return name in run.results or name in run.errors
+
+    def _ready(s: Stage) -> bool:
+        return all(d in run.results for d in s.deps) and all(_done(d) or d not in names for d in s.optional)
+
+    names = {s.name for s in stages}
+
+    def _resolve_groups() -> None:
+        for group, members in groups.items():
+            if group in run.results or group in run.errors:
+                continue
+            for s in members:
+                if s.name in run.results:
+                    run.results[group] = run.results[s.name]
+                    run.winners[group] = s.name
+                    for other in members:
+                        if other is s or _done(other.name):
+                            continue
+                        run.cancelled.append(other.name)
+                        run.errors[other.name] = asyncio.CancelledError(f"lost to {s.name}")
+                        waiting.pop(other.name, None)
+                        if other.name in tokens:
+                            tokens[other.name].cancel(f"lost to {s.name}")
+                        for task, (rs, _) in running.items():
+                            if rs is other:
+                                task.cancel()
+                    break
+                if s.name not in run.errors:
+                    break  # a better candidate is still pending
+            else:
+                run.errors[group] = RuntimeError(f"all {group} stages failed")
+
+    while waiting or running:
+        for name, s in list(waiting.items()):
+            failed = [d for d in s.deps if d in run.errors]
+            if failed:
+                run.errors[name] = RuntimeError(f"dependency failed: {failed[0]}")
+                waiting.pop(name)
+            elif _ready(s):
+                waiting.pop(name)
+                kwargs = {d: run.results[d] for d in s.deps}
+                kwargs.update({d: run.results.get(d) for d in s.optional})
+                tokens[name] = token.child(s.timeout)
+                running[asyncio.create_task(_run_one(s, kwargs, tokens[name]))] = (s, time.perf_counter())
+        _resolve_groups()
+        if not running:
+            if waiting and not any(_ready(s) for s in waiting.values()):
+                for name in list(waiting):
+                    run.errors[name] = RuntimeError("unsatisfiable dependencies")
+                    waiting.pop(name)
+            continue
+
+        try:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            for task, (s, _) in running.items():
+                tokens[s.name].cancel("job cancelled")
+                task.cancel()
+            raise
+        for task in done:
+            s, t0 = running.pop(task)
+            if task.cancelled():
+                continue
+            run.timings[s.name] = time.perf_counter() - t0
+            exc = task.exception()
+            if exc is not None:
+                run.errors[s.name] = exc
+            else:
+                run.results[s.name] = task.result()
+        _resolve_groups()
+
+    return run
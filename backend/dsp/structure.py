@@ -0,0 +1,235 @@
+"""
+Song structure: repeated sections found in a beat-synchronous self-similarity matrix.
+
+The job's full-song chroma (the dsp.alignment features, shared with /compare) is averaged per
+beat and stacked over CONTEXT_BEATS, so each column describes a short phrase. A repeat is a
+stripe parallel to the main diagonal of the phrase self-similarity matrix; in time-lag form
+(row = lag, column = beat) every stripe is a horizontal run, so the runs of all lags are
+found with one thresholded array. Taken longest first, the stripes say which beats can be
+copied from which, which gives:
+
+  sections  labelled stretches of the song (chorus / verse / ... by how often they repeat)
+  copies    [t0, t1, offset]: transcription there can be copied from [t0 - offset, t1 - offset)
+  spans     [t0, t1] still to transcribe: the originals, plus any beat of a repeat whose
+            audio differs from its source
+"""
+from __future__ import annotations
+
+import numpy as np
+
+CONTEXT_BEATS = 4       # beats per phrase vector
+SMOOTH_BEATS = 4        # moving average along each lag row before thresholding
+MIN_LAG_BEATS = 8       # a repeat starts at least two bars after its source
+MIN_REPEAT_BEATS = 16   # and lasts at least four bars
+REPEAT_SIM = 0.9        # phrase cosine similarity of a repeat
+SAME_BEAT_SIM = 0.85    # a repeated beat whose own chroma is less similar is transcribed anyway
+MIN_COPY_S = 8.0        # shorter copies aren't worth another basic-pitch process
+MIN_SPAN_S = 1.0        # nor are slivers left between copies (see _plan_spans)
+BOUNDARY_LEAD_S = 0.08  # cuts go just before a beat, so a strum starting on it stays whole
+
+
+def beat_chroma(features: dict) -> tuple[np.ndarray, np.ndarray, float]:
+    """(beats, 12) centred unit chroma per beat, the beat times and the duration, from alignment features."""
+    import librosa
+
+    sr, hop = features["sr"], features["hop_length"]
+    chroma, env = features["chroma"], features["onset_env"]
+    duration = chroma.shape[1] * hop / sr
+    _, beat_frames = librosa.beat.beat_track(onset_envelope=env, sr=sr, hop_length=hop)
+    beat_frames = np.unique(beat_frames)
+    if len(beat_frames) < 2:
+        return np.zeros((0, 12)), np.zeros(0), duration
+    # cell b runs from beat b to beat b + 1 (the last one to the end)
+    cells = librosa.util.sync(chroma, beat_frames, aggregate=np.mean)[:, 1:].T
+    cells = cells / (np.linalg.norm(cells, axis=1, keepdims=True) + 1e-9)
+    # centred on the song's average: the key (or the flat chroma of noise) matches everywhere
+    cells = cells - cells.mean(axis=0)
+    cells /= np.linalg.norm(cells, axis=1, keepdims=True) + 1e-9
+    return cells, librosa.frames_to_time(beat_frames, sr=sr, hop_length=hop), duration
+
+
+def _lag_runs(cells: np.ndarray) -> np.ndarray:
+    """(n, 3) [start beat, end beat, lag] of every diagonal stripe (beats start..end-1 repeat start-lag..)."""
+    n = len(cells)
+    m = n - CONTEXT_BEATS + 1
+    if m <= MIN_LAG_BEATS:
+        return np.zeros((0, 3), dtype=int)
+    phrases = np.concatenate([cells[k: k + m] for k in range(CONTEXT_BEATS)], axis=1)
+    phrases /= np.linalg.norm(phrases, axis=1, keepdims=True) + 1e-9
+    ssm = phrases @ phrases.T
+
+    # time-lag form: lag_sim[l, b] = ssm[b - l, b]
+    lag = np.arange(m)[:, None]
+    beat = np.arange(m)[None, :]
+    lag_sim = np.where(beat >= lag, ssm[np.clip(beat - lag, 0, None), beat], 0.0)
+    c = np.cumsum(np.pad(lag_sim, ((0, 0), (SMOOTH_BEATS, 0))), axis=1)
+    smooth = (c[:, SMOOTH_BEATS:] - c[:, :-SMOOTH_BEATS]) / SMOOTH_BEATS
+    hit = (smooth >= REPEAT_SIM) & (lag >= MIN_LAG_BEATS) & (beat >= lag)
+
+    # runs along each row; the moving average trails, so a run ending at b covers phrases up to b
+    edges = np.diff(np.pad(hit.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    starts = np.maximum(starts - SMOOTH_BEATS + 1, rows)
+    ends = np.minimum(ends + CONTEXT_BEATS - 1, n)  # a phrase at b spans beats b..b+CONTEXT_BEATS-1
+    keep = ends - starts >= MIN_REPEAT_BEATS
+    return np.column_stack([starts[keep], ends[keep], rows[keep]])
+
+
+def _copy_lags(n: int, runs: np.ndarray) -> np.ndarray:
+    """
+    Per beat, how many beats back its transcription can be copied from (0: transcribe it).
+    Longest stripes first; a stripe's source beats are pinned as originals, so a whole chorus
+    copies from the first chorus rather than from the first half of itself.
+    """
+    lag = np.zeros(n, dtype=int)
+    pinned = np.zeros(n, dtype=bool)
+    for start, end, k in runs[np.argsort(-(runs[:, 1] - runs[:, 0]), kind="stable")]:
+        dst = np.arange(start, end)
+        ok = (lag[dst] == 0) & ~pinned[dst] & (lag[dst - k] == 0)
+        lag[dst[ok]] = k
+        pinned[dst[ok] - k] = True
+    return lag
+
+
+def _runs_of(values: np.ndarray, valid: np.ndarray) -> list[tuple[int, int]]:
+    """[start, end) runs of equal `values` where `valid`."""
+    breaks = np.flatnonzero((np.diff(values) != 0) | (np.diff(valid.astype(np.int8)) != 0)) + 1
+    bounds = np.concatenate([[0], breaks, [len(values)]])
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if valid[a]]
+
+
+def _label_sections(repeats: list[tuple[int, int, int]], n: int) -> list[dict]:
+    """
+    Beat-index sections. Every repeat's boundaries are mirrored into its source and back until
+    nothing changes, so the pieces line up; pieces that copy each other share a group.
+    Groups are named by how often they occur (chorus, verse, section C, ...); unrepeated
+    pieces are intro / bridge / outro.
+    """
+    cuts = {0, n}
+    for a, b, lag in repeats:
+        cuts |= {a, b, a - lag, b - lag}
+    for _ in range(8):
+        before = len(cuts)
+        for a, b, lag in repeats:
+            cuts |= {p + lag for p in cuts if a - lag < p < b - lag}
+            cuts |= {p - lag for p in cuts if a < p < b}
+        if len(cuts) == before:
+            break
+    bounds = [p for p in sorted(cuts) if 0 <= p <= n]
+    # pieces shorter than a bar join the one before
+    bounds = [p for i, p in enumerate(bounds) if i in (0, len(bounds) - 1) or bounds[i + 1] - p >= CONTEXT_BEATS]
+    pieces = list(zip(bounds[:-1], bounds[1:]))
+
+    group = list(range(len(pieces)))
+
+    def root(i):
+        while group[i] != i:
+            i = group[i]
+        return i
+
+    starts = {a: i for i, (a, _) in enumerate(pieces)}
+    for i, (a, b) in enumerate(pieces):
+        for ra, rb, lag in repeats:
+            if ra <= a and b <= rb and (a - lag) in starts:
+                group[root(i)] = root(starts[a - lag])
+    members: dict[int, list[int]] = {}
+    for i in range(len(pieces)):
+        members.setdefault(root(i), []).append(i)
+
+    repeated = sorted((m for m in members.values() if len(m) > 1), key=lambda m: (-len(m), m[0]))
+    names = {}
+    for rank, m in enumerate(sorted(repeated, key=lambda m: m[0])):
+        letter = chr(ord("A") + rank)
+        label = "chorus" if m is repeated[0] else "verse" if len(repeated) > 1 and m is repeated[1] else f"section {letter}"
+        for k, i in enumerate(m):
+            names[i] = (label, letter, k + 1)
+    out = []
+    for i, (a, b) in enumerate(pieces):
+        label, letter, instance = names.get(i) or (
+            "intro" if i == 0 else "outro" if i == len(pieces) - 1 else "bridge", None, 1
+        )
+        out.append({"a": a, "b": b, "label": label, "group": letter, "instance": instance})
+    return out
+
+
+def _plan_spans(copies: list, duration: float) -> list:
+    """
+    The [t0, t1] spans to transcribe: everything the copies leave. A sliver too short for its
+    own basic-pitch run goes with a neighbouring copy instead (extended in place), when that
+    copy's source runs on into transcribed audio; otherwise it is transcribed too.
+    """
+    gaps, pos = [], 0.0
+    for t0, t1, _ in copies + [[duration, duration, 0.0]]:
+        if t0 > pos:
+            gaps.append([pos, t0])
+        pos = max(pos, t1)
+    spans = [g for g in gaps if g[1] - g[0] >= MIN_SPAN_S]
+
+    def transcribed(a: float, b: float) -> bool:
+        return any(s0 <= a and b <= s1 for s0, s1 in spans)
+
+    for g0, g1 in gaps:
+        if g1 - g0 >= MIN_SPAN_S:
+            continue
+        before = next((c for c in copies if c[1] == g0), None)
+        after = next((c for c in copies if c[0] == g1), None)
+        if before is not None and transcribed(g0 - before[2], g1 - before[2]):
+            before[1] = g1
+        elif after is not None and transcribed(g0 - after[2], g1 - after[2]):
+            after[0] = g0
+        else:
+            spans.append([g0, g1])
+    return sorted(spans)
+
+
+def analyze_structure(features: dict) -> dict:
+    """
+    {"sections": [{"t0", "t1", "label", "group", "instance"}], "copies": [[t0, t1, offset]],
+     "spans": [[t0, t1]], "duration"} from a recording's dsp.alignment features.
+    """
+    cells, beat_times, duration = beat_chroma(features)
+    n = len(cells)
+    whole = {"sections": [{"t0": 0.0, "t1": duration, "label": "song", "group": None, "instance": 1}],
+             "copies": [], "spans": [[0.0, duration]], "duration": duration}
+    if n < 2 * MIN_REPEAT_BEATS:
+        return whole
+    # beat b is [edges[b], edges[b + 1]); the lead-in belongs to the first beat
+    edges = np.clip(np.append(beat_times - BOUNDARY_LEAD_S, duration), 0.0, duration)
+    edges[0] = 0.0
+
+    lag = _copy_lags(n, _lag_runs(cells))
+    repeats = [(a, b, int(lag[a])) for a, b in _runs_of(lag, lag > 0) if b - a >= MIN_REPEAT_BEATS]
+    sections = [
+        {"t0": float(edges[s["a"]]), "t1": float(edges[s["b"]]), "label": s["label"], "group": s["group"],
+         "instance": s["instance"]}
+        for s in _label_sections(repeats, n)
+    ]
+
+    # copy only beats that really sound like their source; everything else is transcribed
+    same = np.einsum("ij,ij->i", cells, cells[np.arange(n) - lag]) >= SAME_BEAT_SIM
+    copy_lag = np.where((lag > 0) & same, lag, 0)
+    copies = []
+    for a, b in _runs_of(copy_lag, copy_lag > 0):
+        k = int(copy_lag[a])
+        offset = float(beat_times[a] - beat_times[a - k])
+        # the repeat's cells where they overlap its source's, moved over: the first and last
+        # cells of the song stretch to its ends, their counterparts don't
+        t0 = max(float(edges[a]), float(edges[a - k]) + offset)
+        t1 = min(float(edges[b]), float(edges[b - k]) + offset)
+        if t1 - t0 >= MIN_COPY_S:
+            copies.append([t0, t1, offset])
+    spans = _plan_spans(copies, duration)
+    return {"sections": sections, "copies": copies, "spans": spans, "duration": duration}
+
+
+def copy_repeats(notes: list[dict], copies: list) -> list[dict]:
+    """Note events (load_notes layout) with each copy's source notes moved onto it, sorted by start."""
+    out = list(notes)
+    for t0, t1, offset in copies:
+        out += [
+            {**n, "start": n["start"] + offset, "end": n["end"] + offset}
+            for n in notes
+            if t0 - offset <= n["start"] < t1 - offset
+        ]
+    return sorted(out, key=lambda n: n["start"])
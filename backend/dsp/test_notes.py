@@ -1,7 +1,8 @@
 import asyncio
 import math
 import librosa
-from live_listen import stream_live_guitar_events
+# run from backend/: python -m dsp.test_notes
+from dsp.live_listen import stream_live_guitar_events
 
 def cents_off(hz: float):
     """How many cents sharp/flat relative to nearest equal-tempered note."""
@@ -0,0 +1,72 @@
+"""
+Time-sorted index over job result items (note_highway notes, chord segments) for windowed queries.
+Items are sorted once; each query is two searchsorted calls plus a slice, so response size and
+cost depend on the window, not on the length of the song.
+
+Pages are chained with opaque "<version>.<offset>" cursors. The version is the job's when the
+index was built; reprocessing replaces the index, and a cursor from the old one is rejected
+(StaleCursor) instead of silently paging through different items.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+
+class StaleCursor(ValueError):
+    """The cursor belongs to an index that has since been rebuilt."""
+
+
+class TimeIndex:
+    """
+    items: list of dicts with a start time under `start_key`.
+    end_key: for non-overlapping segments (chords), also match items that started before t0
+    but are still sounding. Ends must be sorted, which holds for contiguous segments.
+    """
+
+    def __init__(self, items: list | None, start_key: str = "time", end_key: str | None = None, version: int = 0):
+        self.version = version
+        items = list(items or [])
+        starts = np.array([float(it.get(start_key, 0.0)) for it in items], dtype=np.float64)
+        order = np.argsort(starts, kind="stable")
+        self.items = [items[i] for i in order]
+        self.starts = starts[order]
+        self.ends = None
+        if end_key is not None:
+            self.ends = np.array([float(it.get(end_key, it.get(start_key, 0.0))) for it in self.items], dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def span(self, t0: float, t1: float) -> tuple[int, int]:
+        """Index range [lo, hi) of items in the window [t0, t1)."""
+        if self.ends is not None:
+            lo = int(np.searchsorted(self.ends, t0, side="right"))
+        else:
+            lo = int(np.searchsorted(self.starts, t0, side="left"))
+        hi = int(np.searchsorted(self.starts, t1, side="left"))
+        return lo, max(lo, hi)
+
+    def _offset(self, cursor: str) -> int:
+        """Item offset of a next_cursor; ValueError if malformed, StaleCursor if from an older index."""
+        version, _, offset = str(cursor).partition(".")
+        if not offset:
+            raise ValueError(f"malformed cursor {cursor!r}")
+        if int(version) != self.version:
+            raise StaleCursor("cursor is from an earlier result (the job was reprocessed); start again without it")
+        return int(offset)
+
+    def query(self, t0: float, t1: float | None, cursor: str | None = None, limit: int = 500) -> dict:
+        """
+        Page of items in [t0, t1). `cursor` is the `next_cursor` of the previous page, valid
+        for as long as this index is (see the module docstring). t1=None means to the end of the song.
+        """
+        lo, hi = self.span(t0, float("inf") if t1 is None else t1)
+        start = lo if cursor is None else min(max(self._offset(cursor), lo), hi)
+        stop = min(hi, start + max(1, int(limit)))
+        return {
+            "t0": t0,
+            "t1": t1,
+            "total": hi - lo,
+            "items": self.items[start:stop],
+            "next_cursor": f"{self.version}.{stop}" if stop < hi else None,
+        }
@@ -0,0 +1,101 @@
+"""
+Per-job timeline in Chrome trace-event format (chrome://tracing, Perfetto, speedscope).
+
+A job's JobTrace is the context's TRACE; like dsp.cancel.CURRENT it follows the job into
+asyncio.to_thread workers and stage threads. `with span("name"):` anywhere in the job's call
+tree records a complete event with the pid, native thread id and the process's current and
+peak RSS. Outside a job, span() costs one contextvar lookup.
+"""
+from __future__ import annotations
+
+import contextvars
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+MAX_EVENTS = 20000  # per job; later spans are counted, not kept
+
+
+def rss_mb(pid: int | None = None) -> tuple[float | None, float | None]:
+    """(current, peak) resident set size in MB of this process or of `pid`; None where unknown."""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["VmRSS"].split()[0]) / 1024.0, int(fields["VmHWM"].split()[0]) / 1024.0
+    except (OSError, KeyError, ValueError):
+        pass
+    if pid is None:
+        try:
+            import resource
+        except ImportError:  # Windows
+            return None, None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB on Linux, bytes on macOS
+        return None, peak / (1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0)
+    return None, None
+
+
+class JobTrace:
+    """Thread-safe span recorder for one job."""
+
+    def __init__(self, name: str = "job"):
+        self.name = name
+        self.t0 = time.perf_counter()
+        self.pid = os.getpid()
+        self.dropped = 0
+        self._events: list[dict] = []
+        self._threads: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, cat: str, start: float, end: float, args: dict) -> None:
+        tid = threading.get_native_id()
+        rss, peak = rss_mb()
+        ts = (start - self.t0) * 1e6
+        end_ts = (end - self.t0) * 1e6
+        events = [{
+            "name": name, "cat": cat, "ph": "X", "ts": ts, "dur": end_ts - ts, "pid": self.pid, "tid": tid,
+            "args": {**args, "rss_mb": rss, "peak_rss_mb": peak},
+        }]
+        memory = {k: v for k, v in (("rss_mb", rss), ("peak_rss_mb", peak)) if v is not None}
+        if memory:
+            events.append({"name": "memory", "ph": "C", "ts": end_ts, "pid": self.pid, "args": memory})
+        with self._lock:
+            if len(self._events) >= MAX_EVENTS:
+                self.dropped += 1
+                return
+            self._threads.setdefault(tid, threading.current_thread().name)
+            self._events.extend(events)
+
+    def chrome(self) -> dict:
+        """The trace as a Chrome trace-event JSON object."""
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        meta = [{"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": self.name}}]
+        meta += [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        return {"traceEvents": meta + events, "displayTimeUnit": "ms", "otherData": {"dropped_spans": self.dropped}}
+
+
+TRACE: contextvars.ContextVar[JobTrace | None] = contextvars.ContextVar("job_trace", default=None)
+
+
+@contextmanager
+def span(name: str, cat: str = "job", **args):
+    """
+    Record the block as a span in the current job's trace. Yields the span's args dict, so
+    the block can add results (sizes, counts) to it; an exception is noted in args["error"].
+    """
+    trace = TRACE.get()
+    start = time.perf_counter()
+    try:
+        yield args
+    except BaseException as e:
+        args["error"] = type(e).__name__
+        raise
+    finally:
+        if trace is not None:
+            trace.add(name, cat, start, time.perf_counter(), args)
@@ -0,0 +1,165 @@
+"""
+Chord-voicing database: every root x detected quality, in open, barre and capo positions,
+generated once on import from CAGED templates (plus the hand-written CHORD_SHAPES).
+
+Lookups are O(1):
+  voicing_for_label("F#m")        -> best shape for a chord label (sharps or flats)
+  shape_for_mask(mask)            -> best shape for a 12-bit pitch-class mask (chroma -> shape)
+Shapes are [lowE, A, D, G, B, highE]; -1 = muted, 0 = open, >0 = fretted.
+"""
+from __future__ import annotations
+
+import re
+
+import numpy as np
+
+# Standard tuning MIDI: 0=low E2, 1=A2, 2=D3, 3=G3, 4=B3, 5=high e4
+OPEN_MIDI = [40, 45, 50, 55, 59, 64]
+NOTE_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+_FLATS = {"Db": "C#", "Eb": "D#", "Gb": "F#", "Ab": "G#", "Bb": "A#", "Cb": "B", "Fb": "E"}
+
+# Chord qualities the analysis can emit (dsp/chords.py templates): label suffix -> intervals
+QUALITIES = {"": (0, 4, 7), "m": (0, 3, 7)}
+
+# Chord shapes: [string0, 1, 2, 3, 4, 5] = [lowE, A, D, G, B, highE]
+# Hand-written; must match frontend GuitarHeroFretboard CHORD_SHAPES.
+CHORD_SHAPES = {
+    "C": [0, 3, 2, 0, 1, 0],
+    "D": [-1, -1, 0, 2, 3, 2],
+    "E": [0, 2, 2, 1, 0, 0],
+    "F": [1, 3, 3, 2, 1, 1],
+    "G": [3, 2, 0, 0, 3, 3],
+    "A": [0, 0, 2, 2, 2, 0],
+    "Am": [0, 0, 2, 2, 1, 0],
+    "B": [2, 2, 4, 4, 4, 2],
+    "Bm": [2, 3, 4, 4, 3, 2],
+}
+
+# CAGED templates at the nut: (shape, root pitch class, quality, family).
+# Moved up k frets, E/A shapes become barre chords and the rest are played with a capo at k.
+_TEMPLATES = [
+    ([0, 2, 2, 1, 0, 0], 4, "", "E"),
+    ([0, 2, 2, 0, 0, 0], 4, "m", "E"),
+    ([-1, 0, 2, 2, 2, 0], 9, "", "A"),
+    ([-1, 0, 2, 2, 1, 0], 9, "m", "A"),
+    ([-1, 3, 2, 0, 1, 0], 0, "", "C"),
+    ([-1, -1, 0, 2, 3, 2], 2, "", "D"),
+    ([-1, -1, 0, 2, 3, 1], 2, "m", "D"),
+    ([3, 2, 0, 0, 0, 3], 7, "", "G"),
+]
+_BARRE_FAMILIES = {"E", "A"}
+MAX_FRET = 12
+
+
+def pitch_class_mask(pcs) -> int:
+    """12-bit mask, bit i set for pitch class i."""
+    m = 0
+    for pc in pcs:
+        m |= 1 << (int(pc) % 12)
+    return m
+
+
+def _shape_mask(shape: list[int]) -> int:
+    return pitch_class_mask(OPEN_MIDI[s] + f for s, f in enumerate(shape) if f >= 0)
+
+
+def parse_label(label: str) -> tuple[int, str] | None:
+    """'C#m' / 'Dbm' / 'F' -> (root pitch class, quality suffix), or None if unsupported."""
+    if not label or not isinstance(label, str):
+        return None
+    m = re.match(r"^([A-G])([#b]?)(.*)$", label.strip())
+    if not m:
+        return None
+    root = m.group(1) + m.group(2)
+    root = _FLATS.get(root, root)
+    quality = {"min": "m", "maj": ""}.get(m.group(3), m.group(3))
+    if root not in NOTE_NAMES or quality not in QUALITIES:
+        return None
+    return NOTE_NAMES.index(root), quality
+
+
+def _build():
+    voicings: dict[str, list[dict]] = {}
+
+    def add(label, shape, kind, capo, cost):
+        root, quality = parse_label(label)
+        chord_mask = pitch_class_mask((root + iv) % 12 for iv in QUALITIES[quality])
+        if _shape_mask(shape) != chord_mask:
+            return  # reject wrong shapes rather than emit wrong notes
+        voicings.setdefault(label, []).append({
+            "label": label,
+            "shape": list(shape),
+            "kind": kind,
+            "capo": capo,
+            "cost": cost,
+        })
+
+    for label, shape in CHORD_SHAPES.items():
+        add(label, shape, "open", 0, -1.0)  # hand-written shapes win when they are correct
+
+    for shape, root_pc, quality, family in _TEMPLATES:
+        for k in range(0, MAX_FRET - max(shape) + 1):
+            label = NOTE_NAMES[(root_pc + k) % 12] + quality
+            moved = [f + k if f >= 0 else -1 for f in shape]
+            if k == 0:
+                add(label, moved, "open", 0, 0.0)
+            elif family in _BARRE_FAMILIES:
+                add(label, moved, "barre", 0, 2.0 + 0.5 * k)
+            else:
+                add(label, moved, "capo", k, 4.0 + k)
+
+    for label in voicings:
+        uniq, seen = [], set()
+        for v in sorted(voicings[label], key=lambda v: v["cost"]):
+            if tuple(v["shape"]) not in seen:
+                seen.add(tuple(v["shape"]))
+                uniq.append(v)
+        voicings[label] = uniq
+
+    # chord order for mask ties: majors before minors, then by root
+    labels = [NOTE_NAMES[r] + q for q in QUALITIES for r in range(12)]
+    chord_masks = np.array(
+        [pitch_class_mask((r + iv) % 12 for iv in QUALITIES[q]) for q in QUALITIES for r in range(12)],
+        dtype=np.int64,
+    )
+    roots = np.array([r for _ in QUALITIES for r in range(12)], dtype=np.int64)
+
+    # For every possible chroma mask, the chord containing all of its pitch classes:
+    # exact match first, then one whose root is present, then tie order above.
+    masks = np.arange(4096, dtype=np.int64)[:, None]
+    subset = (masks & ~chord_masks[None, :]) == 0
+    exact = masks == chord_masks[None, :]
+    has_root = ((masks >> roots[None, :]) & 1) == 1
+    score = np.where(subset, 1 + 2 * exact + has_root, 0) * 1000 - np.arange(len(labels))[None, :]
+    best = np.argmax(score, axis=1)
+    table = np.where(subset[np.arange(4096), best], best, -1)
+    table[0] = -1
+    return voicings, labels, table
+
+
+VOICINGS, _LABELS, _MASK_TABLE = _build()
+
+
+def voicings_for_label(label: str) -> list[dict]:
+    """All voicings for a chord label, easiest first (open, then barre, then capo positions)."""
+    parsed = parse_label(label)
+    if parsed is None:
+        return []
+    root, quality = parsed
+    return VOICINGS.get(NOTE_NAMES[root] + quality, [])
+
+
+def voicing_for_label(label: str) -> list[int] | None:
+    v = voicings_for_label(label)
+    return list(v[0]["shape"]) if v else None
+
+
+def label_for_mask(mask: int) -> str | None:
+    i = int(_MASK_TABLE[int(mask) & 0xFFF])
+    return _LABELS[i] if i >= 0 else None
+
+
+def shape_for_mask(mask: int) -> list[int] | None:
+    """Best shape for a chord that contains every pitch class in mask (O(1) table lookup)."""
+    label = label_for_mask(mask)
+    return voicing_for_label(label) if label else None
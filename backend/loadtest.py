@@ -0,0 +1,377 @@
+"""
+Local load test for the API: uploads, job polling and live websockets.
+
+  cd backend
+  python loadtest.py --duration 60 --mix upload=2,poll=8,live=4
+  python loadtest.py --url http://127.0.0.1:8000 --mix live=16 --replay <job_id>
+
+Without --url it starts `uvicorn main:app` on a free local port (plus a synthetic replay WAV
+in processed/) and samples that process tree's CPU and RSS. --mix sets how many concurrent
+virtual users run each pattern until --duration is up:
+
+  upload  POST /upload with synthetic audio, then long-poll GET /jobs/{id} until it finishes
+  poll    GET /jobs/{id} on known jobs with If-None-Match (what the Processing screen does)
+  live    /ws/live?replay=<job>, paced in real time, for --live-s seconds per session
+
+Reports requests/s, errors and p50/p95/p99 latency per endpoint, plus server CPU / RSS.
+Needs httpx and websockets (websockets comes with uvicorn[standard]).
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from dsp.latency import LatencyHistogram
+
+BACKEND_DIR = Path(__file__).resolve().parent
+PATTERNS = ("upload", "poll", "live")
+
+
+def synthetic_wav(seconds: float, sr: int = 22050, seed: int | None = None) -> bytes:
+    """Plucked-string-ish notes at random pitches and spacing, as 16-bit WAV bytes."""
+    import soundfile as sf
+
+    rng = np.random.default_rng(seed)
+    y = np.zeros(int(seconds * sr), dtype=np.float32)
+    t = np.arange(int(0.6 * sr)) / sr
+    pos = 0
+    while pos + len(t) < len(y):
+        f = rng.choice([82.4, 110.0, 146.8, 196.0, 246.9, 329.6]) * rng.choice([1, 2])
+        y[pos : pos + len(t)] += (0.2 * np.exp(-5 * t) * (np.sin(2 * np.pi * f * t) + 0.3 * np.sin(4 * np.pi * f * t))).astype(np.float32)
+        pos += int(rng.uniform(0.15, 0.6) * sr)
+    y += 1e-3 * rng.standard_normal(len(y)).astype(np.float32)
+    buf = io.BytesIO()
+    sf.write(buf, y, sr, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+class Stats:
+    def __init__(self):
+        self.latency: dict[str, LatencyHistogram] = {}
+        self.errors: dict[str, int] = {}
+
+    def record(self, name: str, ms: float) -> None:
+        self.latency.setdefault(name, LatencyHistogram()).record(ms)
+
+    def error(self, name: str) -> None:
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def report(self, wall_s: float) -> dict:
+        out = {}
+        for name in sorted(set(self.latency) | set(self.errors)):
+            snap = self.latency[name].snapshot() if name in self.latency else {"count": 0}
+            out[name] = {**snap, "errors": self.errors.get(name, 0), "per_s": snap["count"] / wall_s}
+        return out
+
+
+class ProcessSampler:
+    """CPU % and RSS of a process and its children (live workers), via psutil or /proc."""
+
+    def __init__(self, pid: int, interval_s: float = 0.5):
+        self.pid = pid
+        self.interval_s = interval_s
+        self.cpu_pct: list[float] = []
+        self.rss_mb: list[float] = []
+
+    def _tree(self) -> tuple[float, float]:
+        """(cpu seconds, rss bytes) summed over the tree."""
+        try:
+            import psutil
+
+            root = psutil.Process(self.pid)
+            procs = [root, *root.children(recursive=True)]
+            cpu = rss = 0.0
+            for p in procs:
+                try:
+                    t = p.cpu_times()
+                    cpu += t.user + t.system
+                    rss += p.memory_info().rss
+                except psutil.NoSuchProcess:
+                    pass
+            return cpu, rss
+        except ImportError:
+            pass
+        # Linux without psutil
+        tick = os.sysconf("SC_CLK_TCK")
+        page = os.sysconf("SC_PAGE_SIZE")
+        stats = {}
+        for d in Path("/proc").iterdir():
+            if d.name.isdigit():
+                try:
+                    fields = (d / "stat").read_text().rsplit(")", 1)[1].split()
+                except OSError:
+                    continue
+                # fields[1] = ppid, [11]/[12] = utime/stime, [21] = rss pages
+                stats[int(d.name)] = (int(fields[1]), int(fields[11]) + int(fields[12]), int(fields[21]))
+        tree, frontier = {self.pid}, [self.pid]
+        while frontier:
+            parent = frontier.pop()
+            for pid, (ppid, _, _) in stats.items():
+                if ppid == parent and pid not in tree:
+                    tree.add(pid)
+                    frontier.append(pid)
+        cpu = sum(stats[p][1] for p in tree if p in stats) / tick
+        rss = sum(stats[p][2] for p in tree if p in stats) * page
+        return cpu, rss
+
+    async def run(self, stop: asyncio.Event) -> None:
+        last_cpu, last_t = self._tree()[0], time.perf_counter()
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.interval_s)
+            except asyncio.TimeoutError:
+                pass
+            cpu, rss = await asyncio.to_thread(self._tree)
+            now = time.perf_counter()
+            self.cpu_pct.append(100.0 * (cpu - last_cpu) / max(1e-9, now - last_t))
+            self.rss_mb.append(rss / 2**20)
+            last_cpu, last_t = cpu, now
+
+    def report(self) -> dict:
+        if not self.cpu_pct:
+            return {}
+        return {
+            "cpu_pct_mean": float(np.mean(self.cpu_pct)),
+            "cpu_pct_max": float(np.max(self.cpu_pct)),
+            "rss_mb_start": self.rss_mb[0],
+            "rss_mb_max": float(np.max(self.rss_mb)),
+        }
+
+
+async def upload_user(client, args, stats: Stats, jobs: list, deadline: float) -> None:
+    while time.perf_counter() < deadline:
+        body = synthetic_wav(args.audio_s, seed=random.getrandbits(32))
+        t0 = time.perf_counter()
+        try:
+            r = await client.post(
+                "/upload",
+                files={"file": ("loadtest.wav", body, "audio/wav")},
+                params={"reuse": str(args.reuse).lower()},
+            )
+            r.raise_for_status()
+        except Exception:
+            stats.error("POST /upload")
+            await asyncio.sleep(0.5)
+            continue
+        stats.record("POST /upload", (time.perf_counter() - t0) * 1000.0)
+        job_id = r.json()["job_id"]
+        jobs.append(job_id)
+
+        version = -1
+        while time.perf_counter() < deadline + args.drain_s:
+            try:
+                r = await client.get(f"/jobs/{job_id}", params={"version": version, "wait": 10})
+                r.raise_for_status()
+                status = r.json()
+            except Exception:
+                stats.error("job done")
+                break
+            version = status.get("version", version)
+            if status["status"] == "done":
+                stats.record("job done", (time.perf_counter() - t0) * 1000.0)
+                break
+            if status["status"] == "error":
+                stats.error("job done")
+                break
+
+
+async def poll_user(client, args, stats: Stats, jobs: list, deadline: float) -> None:
+    etags: dict[str, str] = {}
+    while time.perf_counter() < deadline:
+        if not jobs:
+            await asyncio.sleep(0.1)
+            continue
+        job_id = random.choice(jobs)
+        headers = {"Accept-Encoding": "gzip, br"}
+        if job_id in etags:
+            headers["If-None-Match"] = etags[job_id]
+        t0 = time.perf_counter()
+        try:
+            r = await client.get(f"/jobs/{job_id}", headers=headers)
+            if r.status_code not in (200, 304):
+                raise RuntimeError(r.status_code)
+        except Exception:
+            stats.error("GET /jobs/{id}")
+            continue
+        stats.record("GET /jobs/{id}", (time.perf_counter() - t0) * 1000.0)
+        if "etag" in r.headers:
+            etags[job_id] = r.headers["etag"]
+        await asyncio.sleep(args.poll_interval_s)
+
+
+async def live_user(args, stats: Stats, ws_url: str, deadline: float) -> None:
+    import websockets
+
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        first = True
+        try:
+            async with websockets.connect(f"{ws_url}/ws/live?replay={args.replay}&realtime=true") as ws:
+                stats.record("WS /ws/live connect", (time.perf_counter() - t0) * 1000.0)
+                t_open = time.perf_counter()
+                while time.perf_counter() - t_open < args.live_s and time.perf_counter() < deadline:
+                    try:
+                        msg = await asyncio.wait_for(ws.recv(), timeout=5.0)
+                    except asyncio.TimeoutError:
+                        stats.error("WS /ws/live event")
+                        break
+                    except websockets.ConnectionClosed:
+                        break  # replay ran out
+                    now = time.perf_counter()
+                    ev = json.loads(msg)
+                    if first:
+                        stats.record("WS /ws/live first event", (now - t_open) * 1000.0)
+                        first = False
+                    if ev.get("stream_t") is not None:
+                        # how far the event trails the real-time replay of the audio it describes
+                        stats.record("WS /ws/live event lag", ((now - t_open) - ev["stream_t"]) * 1000.0)
+        except Exception:
+            stats.error("WS /ws/live connect")
+            await asyncio.sleep(0.5)
+
+
+async def _delete_jobs(client, job_ids: list[str]) -> None:
+    """
+    DELETE the load-test jobs on the local server, which removes everything it wrote for
+    them (uploads, WAVs, artifacts, lessons, renditions, fingerprint index entries).
+    """
+    for job_id in job_ids:
+        try:
+            await client.delete(f"/jobs/{job_id}")
+        except Exception:
+            pass
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_healthy(client, proc, timeout_s: float = 60.0) -> None:
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout_s:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with {proc.returncode}")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn did not become healthy")
+
+
+async def main_async(args) -> None:
+    import httpx
+
+    mix = {name: 0 for name in PATTERNS}
+    for part in filter(None, args.mix.split(",")):
+        name, _, n = part.partition("=")
+        if name not in mix:
+            raise SystemExit(f"unknown pattern {name!r}; choose from {', '.join(PATTERNS)}")
+        mix[name] = int(n or 1)
+
+    proc = replay_path = None
+    url = args.url
+    if url is None:
+        port = _free_port()
+        url = f"http://127.0.0.1:{port}"
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning"],
+            cwd=str(BACKEND_DIR),
+        )
+        if mix["live"] and not args.replay:
+            args.replay = f"loadtest_{uuid.uuid4().hex[:8]}"
+            replay_path = BACKEND_DIR / "processed" / f"{args.replay}.wav"
+            replay_path.parent.mkdir(parents=True, exist_ok=True)
+            replay_path.write_bytes(synthetic_wav(max(args.live_s, 5.0) + 1.0, sr=44100, seed=0))
+    elif mix["live"] and not args.replay:
+        raise SystemExit("--replay <job_id> is needed for live sessions against --url")
+
+    stats = Stats()
+    jobs: list[str] = list(args.jobs)
+    try:
+        async with httpx.AsyncClient(base_url=url, timeout=120.0) as client:
+            try:
+                if proc is not None:
+                    await _wait_healthy(client, proc)
+                stop = asyncio.Event()
+                sampler = ProcessSampler(proc.pid) if proc is not None else None
+                sampler_task = asyncio.create_task(sampler.run(stop)) if sampler else None
+
+                t0 = time.perf_counter()
+                deadline = t0 + args.duration
+                ws_url = "ws" + url[len("http"):]
+                users = (
+                    [upload_user(client, args, stats, jobs, deadline) for _ in range(mix["upload"])]
+                    + [poll_user(client, args, stats, jobs, deadline) for _ in range(mix["poll"])]
+                    + [live_user(args, stats, ws_url, deadline) for _ in range(mix["live"])]
+                )
+                await asyncio.gather(*users)
+                wall = time.perf_counter() - t0
+                stop.set()
+                if sampler_task:
+                    await sampler_task
+                try:
+                    live_latency = (await client.get("/metrics/live-latency")).json()
+                except Exception:
+                    live_latency = None
+            finally:
+                # the server's own DELETE cleans up; only jobs this run uploaded, not --jobs
+                if proc is not None and not args.keep and proc.poll() is None:
+                    await _delete_jobs(client, jobs[len(args.jobs):])
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if replay_path is not None:
+            replay_path.unlink(missing_ok=True)
+
+    report = {
+        "url": url,
+        "mix": mix,
+        "duration_s": wall,
+        "endpoints": stats.report(wall),
+        "server": sampler.report() if sampler else None,
+        "server_live_latency": live_latency,
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2))
+        print("Saved:", args.out)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--url", default=None, help="existing server; default starts a local uvicorn")
+    ap.add_argument("--mix", default="upload=1,poll=4,live=2", help="pattern=users,... (upload, poll, live)")
+    ap.add_argument("--duration", type=float, default=30.0)
+    ap.add_argument("--drain-s", type=float, default=60.0, help="extra time to wait for uploaded jobs to finish")
+    ap.add_argument("--audio-s", type=float, default=20.0, help="length of each synthetic upload")
+    ap.add_argument("--reuse", action="store_true", help="let uploads hit the fingerprint cache")
+    ap.add_argument("--poll-interval-s", type=float, default=0.5)
+    ap.add_argument("--live-s", type=float, default=15.0, help="length of each live session")
+    ap.add_argument("--replay", default=None, help="job id whose processed WAV feeds /ws/live")
+    ap.add_argument("--jobs", nargs="*", default=[], help="extra job ids for the poll pattern")
+    ap.add_argument("--keep", action="store_true", help="keep the local server's files for load-test jobs")
+    ap.add_argument("--out", default=None)
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,26 @@
 from __future__ import annotations
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from uuid import uuid4
 from pathlib import Path
+from contextlib import asynccontextmanager
+from functools import partial
 import asyncio
 import sys
+import time
 
 from dsp.audio_io import save_upload_and_convert_to_wav
-from dsp.analyze_song import analyze_wav_for_chords
+from dsp.cancel import CURRENT, Cancelled, CancelToken, check
+from dsp.analyze_song import chords_from_features, extract_chord_features
+from dsp.artifacts import load_features, save_features
 from dsp.chord_tabs import chords_to_note_highway, chords_to_tab_text
-from dsp.note_detection import analyze_notes_from_audio
+from dsp.note_detection import extract_note_features, notes_from_features
+from dsp.trace import TRACE, JobTrace, span
 
 # --- paths ---
 BASE_DIR = Path(__file__).resolve().parent
@@ -24,7 +31,18 @@ UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
 # --- app ---
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    reaper = asyncio.create_task(_reap_abandoned_jobs())
+    yield
+    reaper.cancel()
+    # uvicorn exits by re-raising SIGTERM, which skips multiprocessing's atexit cleanup
+    from dsp.live_worker import shutdown_pool
+
+    shutdown_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Serve uploaded audio and processed WAV (use WAV for playback – times match note_highway)
 app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
@@ -43,6 +61,27 @@ app.add_middleware(
 JOBS: dict[str, dict] = {}
 
 
+class ReprocessParams(BaseModel):
+    """
+    Downstream parameters for POST /jobs/{job_id}/reprocess; omitted fields keep defaults.
+    Out-of-range values are rejected with 422 rather than failing (or misbehaving) mid-analysis.
+    """
+    # basic-pitch post-processing (dsp.note_highway.notes_to_highway)
+    min_velocity: Optional[int] = Field(None, ge=0, le=127)
+    frame_window_s: Optional[float] = Field(None, ge=0)
+    max_fret: Optional[int] = Field(None, ge=0, le=24)
+    max_notes: Optional[int] = Field(None, gt=0)
+    # onset note detection (dsp.note_detection.notes_from_features)
+    strum_window_s: Optional[float] = Field(None, ge=0)
+    arpeggio_span_s: Optional[float] = Field(None, ge=0)
+    quantize_div: Optional[int] = Field(None, gt=0)
+    # chord segmentation (dsp.analyze_song.chords_from_features)
+    smooth_win: Optional[int] = Field(None, gt=0)
+    min_dur: Optional[float] = Field(None, ge=0)
+    # chord-based highway (dsp.chord_tabs.chords_to_note_highway)
+    strums_per_beat: Optional[int] = Field(None, gt=0)
+
+
 class UploadResponse(BaseModel):
     job_id: str
     filename: str  # saved filename in /uploads (jobid_originalname)
@@ -53,6 +92,113 @@ class JobStatus(BaseModel):
     status: str   # "processing" | "done" | "error"
     result: Optional[dict] = None
     error: Optional[str] = None
+    version: int = 0  # bumps on every change; pass back as ?version=&wait= to long-poll
+    stage: Optional[str] = None  # "preview": rough result while processing, "final": full analysis
+    lesson: Optional[str] = None  # immutable lesson bundle URL, shortly after the job is done
+
+
+# Longest a GET /jobs/{job_id}?wait= long-poll is held open
+LONG_POLL_MAX_S = 30.0
+
+# Whole-job deadline (upload conversion + analysis); per-stage ones are STAGE_TIMEOUTS
+JOB_DEADLINE_S = 600.0
+# A processing job nobody has polled for this long is cancelled and deleted
+JOB_TTL_S = 120.0
+REAP_INTERVAL_S = 15.0
+
+
+def _new_job() -> dict:
+    return {
+        "status": "processing",
+        "stage": None,
+        "result": None,
+        "error": None,
+        "version": 0,
+        "changed": asyncio.Event(),
+        "created": time.perf_counter(),
+        "last_seen": time.perf_counter(),  # last GET /jobs/{id}, for TTL reaping
+        "cancel": CancelToken(timeout=JOB_DEADLINE_S),
+        "task": None,
+        "trace": JobTrace(),  # GET /jobs/{id}/trace
+    }
+
+
+def _freeze_job_body(job_id: str, j: dict) -> None:
+    """
+    Serialize a finished job once: JSON bytes plus compressed variants and a strong ETag, so
+    polls never rebuild the pydantic model or re-encode the result. This runs on the event
+    loop, so it only does a fast gzip; _recompress_job_body adds the small ones in a thread.
+    """
+    import gzip
+    import hashlib
+    import json
+
+    with span("serialize", cat="serialize") as info:
+        payload = JobStatus(
+            job_id=job_id, status=j["status"], result=j["result"], error=j["error"], version=j["version"],
+            stage=j.get("stage"), lesson=j.get("lesson_url"),
+        ).model_dump()
+        raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        body = {"identity": raw, "gzip": gzip.compress(raw, compresslevel=1)}
+        info.update({f"{k}_bytes": len(v) for k, v in body.items()})
+    j["body"] = body
+    j["etag"] = '"' + hashlib.sha256(raw).hexdigest()[:32] + '"'
+    j["body_task"] = asyncio.create_task(_recompress_job_body(j, body))
+
+
+def _compress_body(raw: bytes) -> dict:
+    """gzip-9 and (if installed) brotli-9 variants of a frozen body."""
+    import gzip
+
+    with span("compress", cat="serialize") as info:
+        body = {"gzip": gzip.compress(raw, compresslevel=9)}
+        try:
+            import brotli
+
+            body["br"] = brotli.compress(raw, quality=9)
+        except ImportError:
+            pass
+        info.update({f"{k}_bytes": len(v) for k, v in body.items()})
+    return body
+
+
+async def _recompress_job_body(j: dict, body: dict) -> None:
+    """Swap the smaller encodings into a frozen body, unless it was re-frozen meanwhile."""
+    smaller = await asyncio.to_thread(_compress_body, body["identity"])
+    if j.get("body") is body:
+        j["body"] = {**body, **smaller}  # same JSON, so the same ETag
+
+
+def _set_job(job_id: str, **fields) -> None:
+    """Update a job, bump its version and wake long-polls. Finished jobs are frozen to bytes."""
+    j = JOBS[job_id]
+    j.update(fields)
+    j["version"] = j.get("version", 0) + 1
+    if "result" in fields:
+        # derived views of the old result
+        for k in ("highway_index", "time_index", "tiers", "body", "etag", "lesson_url", "lesson_task"):
+            j.pop(k, None)
+    if j["status"] in ("done", "error"):
+        _freeze_job_body(job_id, j)
+    changed = j.get("changed")
+    j["changed"] = asyncio.Event()
+    if changed is not None:
+        changed.set()
+
+
+def _pick_encoding(accept_encoding: str, body: dict) -> str:
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    for enc in ("br", "gzip"):
+        if enc in body and enc in accepted:
+            return enc
+    return "identity"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in tags or etag in tags
 
 
 def _basic_pitch_available() -> bool:
@@ -73,20 +219,77 @@ def root():
         "message": "GuitarBob API",
         "docs": "/docs",
         "health": "/health",
-        "upload": "POST /upload",
-        "jobs": "GET /jobs/{job_id}",
+        "upload": "POST /upload?reuse=<fingerprint lookup, default true>",
+        "jobs": "GET /jobs/{job_id} (DELETE cancels and deletes)",
+        "notes": "GET /jobs/{job_id}/notes?t0=&t1=&cursor=&tier=easy|medium|hard",
+        "chords": "GET /jobs/{job_id}/chords?t0=&t1=&cursor=",
+        "reprocess": "POST /jobs/{job_id}/reprocess",
+        "lesson": "GET /jobs/{job_id}/lesson (redirects to the immutable bundle)",
+        "trace": "GET /jobs/{job_id}/trace (Chrome trace-event JSON of the job's timeline)",
+        "compare": "POST /jobs/{job_id}/compare?tier= (multipart take; per-note and per-chord scores)",
+        "backing": "GET /jobs/{job_id}/backing?rate=&semitones= (click / backing / mix stems, chunked as they render)",
+        "practice": "WS /ws/practice/{job_id}?t=<start seconds>",
+        "recordings": "GET /recordings (WS /ws/live?record=1)",
     }
 
 
+async def _send_live_event(websocket: WebSocket, event: dict, payload: Optional[dict] = None):
+    """Send one live event and record its capture/queue/DSP/send latency breakdown."""
+    from dsp.latency import record_live_latency
+
+    t0 = time.perf_counter()
+    await websocket.send_json(payload if payload is not None else event)
+    record_live_latency(event.get("latency") or {}, (time.perf_counter() - t0) * 1000.0)
+
+
+def _live_source(replay: Optional[str], realtime: bool):
+    """None = audio interface; replay=<job_id> replays that job's processed WAV instead."""
+    if not replay:
+        return None
+    from dsp.live_sources import FileReplaySource
+
+    wav_path = (PROCESSED_DIR / f"{replay}.wav").resolve()
+    if wav_path.parent != PROCESSED_DIR.resolve() or not wav_path.exists():
+        raise FileNotFoundError(f"no processed audio for job {replay}")
+    return FileReplaySource(wav_path, realtime=realtime)
+
+
+def _recordings_dir() -> Path:
+    return PROCESSED_DIR / "recordings"
+
+
 @app.websocket("/ws/live")
-async def websocket_live(websocket: WebSocket):
-    """Stream live guitar pitch/note events from Scarlett (CoreAudio) to the frontend."""
+async def websocket_live(
+    websocket: WebSocket,
+    replay: Optional[str] = None,
+    realtime: bool = True,
+    channel_mode: str = "loudest",
+    record: bool = False,
+):
+    """
+    Stream live guitar pitch/note events from Scarlett (CoreAudio) to the frontend.
+    ?replay=<job_id> feeds the pipeline from the job's processed WAV (realtime=false: flat out).
+    ?channel_mode=all analyzes every interface input; events carry "channel".
+    ?record=1 saves the raw input and its events as FLAC segments (see GET /recordings/{id});
+    the first message is then {"type": "recording", "session_id", "manifest"}.
+    """
     await websocket.accept()
     try:
         from dsp.live_listen import stream_live_guitar_events
 
-        async for event in stream_live_guitar_events():
-            await websocket.send_json(event)
+        record_dir = None
+        if record:
+            session_id = time.strftime("%Y%m%d-%H%M%S-") + uuid4().hex[:8]
+            record_dir = _recordings_dir() / session_id
+            await websocket.send_json({
+                "type": "recording",
+                "session_id": session_id,
+                "manifest": f"/recordings/{session_id}",
+            })
+        async for event in stream_live_guitar_events(
+            source=_live_source(replay, realtime), channel_mode=channel_mode, record_dir=record_dir
+        ):
+            await _send_live_event(websocket, event)
     except WebSocketDisconnect:
         pass
     except Exception:
@@ -96,6 +299,116 @@ async def websocket_live(websocket: WebSocket):
             pass
 
 
+@app.get("/recordings")
+def list_recordings():
+    """Recorded live sessions, newest first."""
+    import json
+
+    out = []
+    root = _recordings_dir()
+    for d in sorted(root.iterdir(), reverse=True) if root.exists() else []:
+        manifest = d / "session.json"
+        if manifest.exists():
+            m = json.loads(manifest.read_text())
+            out.append({
+                "session_id": d.name,
+                "started": m["started"],
+                "duration_s": sum(seg["frames"] for seg in m["segments"]) / m["sr"],
+                "segments": len(m["segments"]),
+            })
+    return {"recordings": out}
+
+
+@app.get("/recordings/{session_id}")
+def recording(session_id: str):
+    """A recorded session's manifest, with URLs for each FLAC segment and its event index."""
+    import json
+
+    d = (_recordings_dir() / session_id).resolve()
+    manifest = d / "session.json"
+    if d.parent != _recordings_dir().resolve() or not manifest.exists():
+        raise HTTPException(status_code=404, detail="recording not found")
+    m = json.loads(manifest.read_text())
+    base = f"/processed/recordings/{session_id}"
+    for seg in m["segments"]:
+        seg["url"] = f"{base}/{seg['file']}"
+        seg["events_url"] = f"{base}/{seg['events']}"
+    return {"session_id": session_id, **m}
+
+
+def _highway_index(job_id: str):
+    """Time-sorted index of a finished job's note_highway, built once and shared by sessions."""
+    from dsp.practice_scoring import HighwayIndex
+
+    j = JOBS.get(job_id)
+    if not j or j["status"] != "done" or not j["result"]:
+        return None
+    if j.get("highway_index") is None:
+        j["highway_index"] = HighwayIndex(j["result"].get("note_highway"))
+    return j["highway_index"]
+
+
+@app.websocket("/ws/practice/{job_id}")
+async def websocket_practice(
+    websocket: WebSocket,
+    job_id: str,
+    t: float = 0.0,
+    replay: Optional[str] = None,
+    realtime: bool = True,
+):
+    """
+    Live practice session scored against a job's note_highway.
+    The client keeps the playback clock in sync by sending {"t": <song seconds>, "playing": bool}.
+    ?replay=<job_id> plays a processed job into the session instead of the audio interface.
+    Each message is the live event plus hit/miss/extra results and the running score.
+    """
+    await websocket.accept()
+    index = _highway_index(job_id)
+    if index is None:
+        await websocket.send_json({"error": "job not found or not finished"})
+        await websocket.close()
+        return
+
+    from dsp.live_listen import stream_live_guitar_events
+    from dsp.practice_scoring import PlaybackClock, PracticeScorer
+
+    clock = PlaybackClock(t)
+    scorer = PracticeScorer(index)
+    scorer.seek(t)
+
+    async def _receive_clock():
+        while True:
+            msg = await websocket.receive_json()
+            if "t" in msg:
+                pos = float(msg["t"])
+                if pos < clock.now() - 1.0 or pos > clock.now() + 1.0:
+                    scorer.seek(pos)
+                clock.sync(pos, msg.get("playing", True))
+
+    receiver = asyncio.create_task(_receive_clock())
+    try:
+        async for event in stream_live_guitar_events(source=_live_source(replay, realtime)):
+            if receiver.done():
+                break
+            pos = clock.now()
+            results = scorer.on_event(event, pos)
+            await _send_live_event(websocket, event, {
+                **event,
+                "playback_t": pos,
+                "results": results,
+                "score": scorer.score(),
+            })
+    except WebSocketDisconnect:
+        pass
+    except Exception:
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+    finally:
+        receiver.cancel()
+
+
 @app.get("/devices")
 def list_devices():
     """List audio input devices. Set SCARLETT_DEVICE=<index> to force one."""
@@ -113,6 +426,185 @@ def list_devices():
     return {"inputs": out}
 
 
+RENDITIONS = None  # dsp.renditions.RenditionCache, created on first use
+
+
+def _rendition_manifest(job_id: str, entry: dict) -> dict:
+    from dsp.renditions import rescale_result
+
+    base = f"/processed/renditions/{entry['dir'].name}"
+    return {
+        "job_id": job_id,
+        "rate": entry["rate"],
+        "semitones": entry["semitones"],
+        "status": entry["status"],
+        "error": entry.get("error"),
+        "chunks": [{**c, "url": f"{base}/{c['file']}"} for c in list(entry["chunks"])],
+        # from the current result, so it follows reprocessing
+        **rescale_result(JOBS[job_id]["result"], entry["rate"], entry["semitones"]),
+    }
+
+
+@app.post("/jobs/{job_id}/renditions")
+@app.get("/jobs/{job_id}/renditions")
+async def job_rendition(job_id: str, rate: float = 1.0, semitones: int = 0):
+    """
+    Slowed-down / transposed practice version of a finished job, rendered in the background.
+    Returns the chunk list so far (play chunks in order as they appear) plus the
+    note_highway and chords rescaled to the rendition's timeline and key.
+    """
+    global RENDITIONS
+    from dsp.renditions import (
+        MAX_RATE, MAX_SEMITONES, MIN_RATE, RenditionCache, render_rendition, rendition_key,
+    )
+
+    j = JOBS.get(job_id)
+    if not j:
+        raise HTTPException(status_code=404, detail="job not found")
+    if j["status"] != "done" or not j["result"]:
+        raise HTTPException(status_code=409, detail=f"job is {j['status']}")
+    if not (MIN_RATE <= rate <= MAX_RATE) or abs(semitones) > MAX_SEMITONES:
+        raise HTTPException(status_code=422, detail=f"rate must be {MIN_RATE}-{MAX_RATE}, |semitones| <= {MAX_SEMITONES}")
+    rate = round(rate, 2)
+
+    if RENDITIONS is None:
+        RENDITIONS = RenditionCache()
+    key = (job_id, rate, semitones)
+    entry = RENDITIONS.get(key)
+    if entry is None:
+        entry = {
+            "rate": rate,
+            "semitones": semitones,
+            "status": "rendering",
+            "chunks": [],
+            "dir": PROCESSED_DIR / "renditions" / f"{job_id}_{rendition_key(rate, semitones)}",
+            "cancel": CancelToken(),
+        }
+        RENDITIONS.put(key, entry)
+
+        async def _render():
+            CURRENT.set(entry["cancel"])  # this task's context; drop_job stops the render
+            try:
+                await asyncio.to_thread(
+                    render_rendition, PROCESSED_DIR / f"{job_id}.wav", entry["dir"], rate, semitones,
+                    entry["chunks"].append,
+                )
+                entry["status"] = "done"
+            except Exception as e:
+                entry["status"] = "error"
+                entry["error"] = str(e)
+
+        asyncio.create_task(_render())
+    return _rendition_manifest(job_id, entry)
+
+
+BACKINGS = None  # dsp.renditions.RenditionCache of backing tracks, created on first use
+
+
+def _backing_manifest(job_id: str, entry: dict) -> dict:
+    base = f"/processed/backing/{entry['dir'].name}"
+    bpm = JOBS[job_id]["result"].get("bpm")
+    return {
+        "job_id": job_id,
+        "rate": entry["rate"],
+        "semitones": entry["semitones"],
+        "status": entry["status"],
+        "error": entry.get("error"),
+        "bpm": (bpm * entry["rate"]) if bpm else bpm,
+        "chunks": [
+            {**c, "urls": {stem: f"{base}/{name}" for stem, name in c["files"].items()}}
+            for c in list(entry["chunks"])
+        ],
+    }
+
+
+@app.post("/jobs/{job_id}/backing")
+@app.get("/jobs/{job_id}/backing")
+async def job_backing(job_id: str, rate: float = 1.0, semitones: int = 0):
+    """
+    Click track and bass + strum backing for a finished job at a practice tempo and key,
+    synthesized in the background. Returns the chunk list so far; each chunk has click,
+    backing and mix stems, lined up with the rendition of the same rate and semitones.
+    """
+    global BACKINGS
+    from dsp.backing import backing_key, backing_signature, render_backing
+    from dsp.renditions import MAX_RATE, MAX_SEMITONES, MIN_RATE, RenditionCache
+
+    j = JOBS.get(job_id)
+    if not j:
+        raise HTTPException(status_code=404, detail="job not found")
+    if j["status"] != "done" or not j["result"]:
+        raise HTTPException(status_code=409, detail=f"job is {j['status']}")
+    if not (MIN_RATE <= rate <= MAX_RATE) or abs(semitones) > MAX_SEMITONES:
+        raise HTTPException(status_code=422, detail=f"rate must be {MIN_RATE}-{MAX_RATE}, |semitones| <= {MAX_SEMITONES}")
+    rate = round(rate, 2)
+
+    result = j["result"]
+    chords, bpm = result.get("chords") or [], result.get("bpm")
+
+    def _inputs():
+        beats = _beat_times(job_id, j)  # loads the job's chord features on first use
+        # keyed on what it is played from as well, so a reprocessed result gets a new track
+        return beats, backing_signature(chords, beats, bpm)
+
+    beats, signature = await asyncio.to_thread(_inputs)
+    if JOBS.get(job_id) is not j:
+        raise HTTPException(status_code=404, detail="job not found")  # deleted meanwhile
+    if BACKINGS is None:
+        BACKINGS = RenditionCache()
+    key = (job_id, rate, semitones, signature)
+    entry = BACKINGS.get(key)
+    if entry is None:
+        entry = {
+            "rate": rate,
+            "semitones": semitones,
+            "status": "rendering",
+            "chunks": [],
+            "dir": PROCESSED_DIR / "backing" / f"{job_id}_{backing_key(rate, semitones, signature)}",
+            "cancel": CancelToken(),
+        }
+        BACKINGS.put(key, entry)
+
+        async def _render():
+            CURRENT.set(entry["cancel"])  # this task's context; drop_job stops the render
+            try:
+                await asyncio.to_thread(
+                    render_backing, PROCESSED_DIR / f"{job_id}.wav", entry["dir"], chords, beats, bpm,
+                    rate, semitones, entry["chunks"].append,
+                )
+                entry["status"] = "done"
+            except Exception as e:
+                entry["status"] = "error"
+                entry["error"] = str(e)
+
+        asyncio.create_task(_render())
+    return _backing_manifest(job_id, entry)
+
+
+@app.get("/metrics/live-latency")
+def live_latency(reset: bool = False):
+    """Input-to-websocket latency histograms (ms) aggregated over all live sessions."""
+    from dsp.latency import LIVE_LATENCY
+
+    out = {stage: h.snapshot() for stage, h in LIVE_LATENCY.items()}
+    if reset:
+        for h in LIVE_LATENCY.values():
+            h.reset()
+    return out
+
+
+@app.get("/metrics/job-latency")
+def job_latency(reset: bool = False):
+    """Upload -> preview and upload -> final result latency histograms (ms) over all jobs."""
+    from dsp.latency import JOB_LATENCY
+
+    out = {stage: h.snapshot() for stage, h in JOB_LATENCY.items()}
+    if reset:
+        for h in JOB_LATENCY.values():
+            h.reset()
+    return out
+
+
 @app.get("/health")
 def health():
     return {
@@ -122,93 +614,774 @@ def health():
     }
 
 
-async def run_job(job_id: str, wav_path: Path):
+# Per-stage timeouts (seconds) for run_job
+STAGE_TIMEOUTS = {
+    "chords": 120.0,
+    "structure": 20.0,  # basic-pitch waits for it (a few seconds), but only this long
+    "basic_pitch": 300.0,
+    "onset_notes": 120.0,
+    "chord_highway": 10.0,
+}
+
+
+def _job_stages(job_id: str, wav_path: Path) -> list:
+    """
+    run_job as a DAG: chords, structure and onset notes start together on the worker pool;
+    note_highway is the best of basic-pitch > onset-based > chord-based that succeeds in time.
+    basic-pitch waits for structure, so it transcribes each repeated section only once; if
+    structure fails or times out, basic-pitch transcribes the whole song.
+    """
+    from dsp.stages import Stage
+
+    art_dir = _artifacts_dir(job_id)
+
+    def chords():
+        features = extract_chord_features(wav_path)
+        check()  # librosa can't be interrupted; stop between steps instead
+        save_features(art_dir / "chord_features.npz", features)
+        return chords_from_features(features)
+
+    def onset_notes():
+        # runs alongside chord analysis, so it estimates its own tempo
+        features = extract_note_features(wav_path, duration_limit=30.0)
+        check()
+        save_features(art_dir / "onset_features.npz", features)
+        note_result = notes_from_features(features)
+        return {"notes": note_result["notes"], "duration": note_result["duration"]}
+
+    def structure():
+        from dsp.alignment import extract_align_features
+        from dsp.structure import analyze_structure
+
+        try:
+            features = extract_align_features(wav_path)
+            check()
+            save_features(art_dir / "align_features.npz", features)  # POST /compare's reference
+            return analyze_structure(features)
+        except Cancelled:
+            raise
+        except Exception:
+            return None  # no sections; basic-pitch transcribes the whole song
+
+    def chord_highway(chords):
+        return chords_to_note_highway(
+            chords.get("chords", []),
+            duration_seconds=30.0,
+            bpm=chords.get("bpm"),
+            strums_per_beat=2,
+        )
+
+    stages = [
+        Stage("chords", chords, timeout=STAGE_TIMEOUTS["chords"]),
+        Stage("structure", structure, timeout=STAGE_TIMEOUTS["structure"]),
+        Stage("onset_notes", onset_notes, timeout=STAGE_TIMEOUTS["onset_notes"],
+              group="note_highway", priority=1),
+        Stage("chord_highway", chord_highway, deps=("chords",), timeout=STAGE_TIMEOUTS["chord_highway"],
+              group="note_highway", priority=2),
+    ]
+    # Note highway: prefer basic-pitch (macOS/Linux), else onset-based, else chord-based
+    if sys.platform != "win32":
+        from dsp.note_highway import build_note_highway
+
+        loop = asyncio.get_running_loop()
+
+        def on_partial(note_highway):
+            loop.call_soon_threadsafe(_publish_partial_notes, job_id, note_highway)
+
+        stages.append(Stage(
+            "basic_pitch",
+            partial(build_note_highway, wav_path, _basic_pitch_dir(job_id), on_partial=on_partial),
+            optional=("structure",),
+            timeout=STAGE_TIMEOUTS["basic_pitch"],
+            group="note_highway",
+            priority=0,
+        ))
+    return stages
+
+
+def _artifacts_dir(job_id: str) -> Path:
+    return PROCESSED_DIR / f"{job_id}_artifacts"
+
+
+def _basic_pitch_dir(job_id: str) -> Path:
+    return PROCESSED_DIR / f"{job_id}_bp"
+
+
+# Convert numpy types to native Python for JSON serialization
+def _to_json_safe(obj):
+    import numpy as np
+    if isinstance(obj, (np.integer, np.int64)):
+        return int(obj)
+    if isinstance(obj, (np.floating, np.float64)):
+        return float(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, dict):
+        return {k: _to_json_safe(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_to_json_safe(v) for v in obj]
+    return obj
+
+
+def _assemble_result(
+    chords_result: dict, note_highway: Optional[dict], note_source: Optional[str], sections: Optional[list] = None
+) -> dict:
+    tabs_text = chords_to_tab_text(
+        chords_result.get("chords", []),
+        bpm=chords_result.get("bpm"),
+    )
+    return _to_json_safe({
+        **chords_result,
+        "note_highway": note_highway,
+        "note_source": note_source,
+        "tabs": tabs_text,
+        "sections": sections,  # dsp.structure: [{t0, t1, label, group, instance}], for looping a chorus
+    })
+
+
+FINGERPRINTS = None  # dsp.fingerprint.FingerprintIndex, opened on first use
+
+
+def _fingerprint_index():
+    global FINGERPRINTS
+    if FINGERPRINTS is None:
+        from dsp.fingerprint import FingerprintIndex
+
+        FINGERPRINTS = FingerprintIndex(PROCESSED_DIR / "fingerprints.sqlite")
+    return FINGERPRINTS
+
+
+def _stored_result(job_id: str) -> Optional[dict]:
+    """A finished job's result: from memory, else from its artifacts (survives restarts)."""
+    import json
+
+    j = JOBS.get(job_id)
+    if j and j["status"] == "done" and j["result"]:
+        return j["result"]
+    path = _artifacts_dir(job_id) / "result.json"
+    if path.exists():
+        return json.loads(path.read_text())
+    return None
+
+
+def _shifted_result(result: dict, offset_s: float) -> dict:
+    from dsp.fingerprint import shift_result
+
+    if not offset_s:
+        return result
+    shifted = shift_result(result, offset_s)
+    shifted["tabs"] = chords_to_tab_text(shifted.get("chords", []), bpm=shifted.get("bpm"))
+    return shifted
+
+
+def _adopt_artifacts(job_id: str, source_id: str) -> None:
+    """
+    Give a fingerprint-reusing job its own links (or copies) of the source job's saved
+    features and basic-pitch notes, so deleting the source doesn't take them away.
+    They stay on the source's timeline; reused_from["offset_s"] maps them onto this job's.
+    """
+    import os
+    import shutil
+    from dsp.note_highway import find_basic_pitch_csv
+
+    def link(src: Path, dst: Path) -> None:
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+    for name in ("chord_features", "onset_features"):
+        src = _artifacts_dir(source_id) / f"{name}.npz"
+        if src.exists():
+            link(src, _artifacts_dir(job_id) / f"{name}.npz")
     try:
-        chords_result = await asyncio.to_thread(analyze_wav_for_chords, wav_path)
-        bpm = chords_result.get("bpm")
+        csv = find_basic_pitch_csv(_basic_pitch_dir(source_id), PROCESSED_DIR / f"{source_id}.wav")
+    except FileNotFoundError:
+        return
+    link(csv, _basic_pitch_dir(job_id) / f"{job_id}_basic_pitch.csv")
 
-        # Note highway: prefer basic-pitch (macOS/Linux), else onset-based, else chord-based
-        note_highway = None
-        if sys.platform != "win32":
-            try:
-                from dsp.note_highway import build_note_highway
-                nh_out_dir = PROCESSED_DIR / f"{job_id}_bp"
-                note_highway = await asyncio.to_thread(build_note_highway, wav_path, nh_out_dir)
-            except Exception:
-                pass
-        if note_highway is None:
-            try:
-                note_result = await asyncio.to_thread(
-                    analyze_notes_from_audio,
-                    wav_path,
-                    bpm=bpm,
-                    duration_limit=30.0,
-                )
-                note_highway = {
-                    "notes": note_result["notes"],
-                    "duration": note_result["duration"],
-                }
-            except Exception:
-                note_highway = chords_to_note_highway(
-                    chords_result.get("chords", []),
-                    duration_seconds=30.0,
-                    bpm=bpm,
-                    strums_per_beat=2,
-                )
 
-        tabs_text = chords_to_tab_text(
-            chords_result.get("chords", []),
-            bpm=bpm,
+def _fingerprint_lookup(job_id: str, wav_path: Path):
+    """
+    Fingerprint the upload and look for an already analyzed copy of the same song.
+    Returns (landmarks, duration, reused result or None). Never fails the job.
+    """
+    from dsp.fingerprint import fingerprint_file
+
+    try:
+        with span("fingerprint"):
+            landmarks, duration = fingerprint_file(wav_path)
+            match = _fingerprint_index().match(landmarks, exclude=job_id)
+    except Exception:
+        return None, 0.0, None
+    source = _stored_result(match["job_id"]) if match else None
+    if source is None:
+        return landmarks, duration, None
+    try:
+        _adopt_artifacts(job_id, match["job_id"])
+    except OSError:
+        return landmarks, duration, None  # the source went away meanwhile; analyze after all
+    JOBS[job_id]["reused_from"] = {"job_id": match["job_id"], "offset_s": match["offset_s"]}
+    result = dict(_shifted_result(source, match["offset_s"]))
+    result["reused_from"] = {k: match[k] for k in ("job_id", "offset_s", "matches")}
+    return landmarks, duration, result
+
+
+def _remember_analysis(job_id: str, result: dict, landmarks, duration: float) -> None:
+    """Keep a finished analysis for fingerprint reuse: result.json + index entry."""
+    import json
+
+    with span("remember analysis", cat="io"):
+        path = _artifacts_dir(job_id) / "result.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(result))
+        if landmarks is not None:
+            _fingerprint_index().add(job_id, landmarks, duration)
+
+
+def _preview_result(wav_path: Path) -> dict:
+    from dsp.analyze_song import preview_chords
+
+    with span("preview"):
+        chords_result = preview_chords(wav_path)
+        note_highway = chords_to_note_highway(
+            chords_result["chords"], duration_seconds=30.0, bpm=chords_result.get("bpm"), strums_per_beat=2
         )
+    return _assemble_result(chords_result, note_highway, "chord_highway")
+
+
+async def _run_preview(job_id: str, wav_path: Path) -> None:
+    """Publish rough chords while the full analysis runs; status stays "processing"."""
+    from dsp.latency import JOB_LATENCY
+
+    t0 = time.perf_counter()
+    try:
+        result = await asyncio.to_thread(_preview_result, wav_path)
+    except Exception:
+        return  # the full analysis still reports
+    j = JOBS.get(job_id)
+    if j is None or j["status"] != "processing":
+        return  # final result (or an error) got there first
+    j.setdefault("stage_timings", {})["preview"] = time.perf_counter() - t0
+    if j.get("partial_notes") is not None:
+        result = {**result, "note_highway": j["partial_notes"], "note_source": "basic_pitch"}
+    _set_job(job_id, stage="preview", result=result)
+    JOB_LATENCY["preview"].record((time.perf_counter() - j["created"]) * 1000.0)
+
+
+def _publish_partial_notes(job_id: str, note_highway: dict) -> None:
+    """basic-pitch notes for the start of a long song, shown with the preview until the rest lands."""
+    j = JOBS.get(job_id)
+    if j is None or j["status"] != "processing":
+        return
+    j["partial_notes"] = _to_json_safe(note_highway)
+    if j["result"] is not None:
+        _set_job(job_id, result={**j["result"], "note_highway": j["partial_notes"], "note_source": "basic_pitch"})
 
-        result = {
-            **chords_result,
-            "note_highway": note_highway,
-            "tabs": tabs_text,
-        }
 
-        # Convert numpy types to native Python for JSON serialization
-        def _to_json_safe(obj):
-            import numpy as np
-            if isinstance(obj, (np.integer, np.int64)):
-                return int(obj)
-            if isinstance(obj, (np.floating, np.float64)):
-                return float(obj)
-            if isinstance(obj, np.ndarray):
-                return obj.tolist()
-            if isinstance(obj, dict):
-                return {k: _to_json_safe(v) for k, v in obj.items()}
-            if isinstance(obj, list):
-                return [_to_json_safe(v) for v in obj]
-            return obj
-
-        JOBS[job_id]["status"] = "done"
-        JOBS[job_id]["result"] = _to_json_safe(result)
+def _finish_job(job_id: str, result: dict) -> None:
+    from dsp.latency import JOB_LATENCY
+
+    JOBS[job_id].pop("partial_notes", None)
+    _set_job(job_id, status="done", stage="final", result=result)
+    _lesson_task(job_id)
+    JOB_LATENCY["final"].record((time.perf_counter() - JOBS[job_id]["created"]) * 1000.0)
+
+
+async def run_job(job_id: str, wav_path: Path, reuse: bool = True):
+    """
+    Analyze an upload. DELETE /jobs/{id}, TTL reaping and JOB_DEADLINE_S cancel it; the job's
+    cancel token is the context's current one, so its stages' subprocesses are killed too.
+    """
+    token = JOBS[job_id]["cancel"]
+    CURRENT.set(token)  # this task's context, copied into its threads and subtasks
+    TRACE.set(JOBS[job_id]["trace"])
+    remaining = max(0.0, token.deadline - time.monotonic())
+    try:
+        with span("analysis", reuse=reuse):
+            await asyncio.wait_for(_analyze_job(job_id, wav_path, reuse), timeout=remaining)
+    except asyncio.TimeoutError:
+        token.cancel("deadline exceeded")
+        if job_id in JOBS:
+            _set_job(job_id, status="error", error=f"analysis exceeded the {JOB_DEADLINE_S:.0f} s job deadline")
+
+
+async def _analyze_job(job_id: str, wav_path: Path, reuse: bool):
+    from dsp.stages import run_stages
+
+    # preview tier: rough chords on the Processing screen within a second or so
+    asyncio.create_task(_run_preview(job_id, wav_path))
+    try:
+        landmarks, duration = None, 0.0
+        if reuse:
+            t0 = time.perf_counter()
+            landmarks, duration, reused = await asyncio.to_thread(_fingerprint_lookup, job_id, wav_path)
+            JOBS[job_id].setdefault("stage_timings", {})["fingerprint"] = time.perf_counter() - t0
+            if reused is not None:
+                _finish_job(job_id, reused)
+                return
+
+        run = await run_stages(_job_stages(job_id, wav_path))
+        if "chords" not in run.results:
+            raise run.errors["chords"]
+        JOBS[job_id].setdefault("stage_timings", {}).update(run.timings)
+        result = _assemble_result(
+            run.results["chords"], run.results.get("note_highway"), run.winners.get("note_highway"),
+            (run.results.get("structure") or {}).get("sections"),
+        )
+        _finish_job(job_id, result)
     except Exception as e:
-        JOBS[job_id]["status"] = "error"
-        JOBS[job_id]["error"] = str(e)
+        _set_job(job_id, status="error", error=str(e))
+        return
+    try:
+        await asyncio.to_thread(_remember_analysis, job_id, result, landmarks, duration)
+    except Exception:
+        pass  # the job is done either way; it just won't be offered for reuse
+    j = JOBS.get(job_id)
+    if j is not None:
+        await asyncio.to_thread(_highway_tiers, job_id, j)
+
 
 @app.post("/upload", response_model=UploadResponse)
-async def upload(file: UploadFile = File(...)):
+async def upload(file: UploadFile = File(...), reuse: bool = True):
+    """Convert and analyze an upload. reuse=false always analyzes from scratch (no fingerprint lookup)."""
     job_id = str(uuid4())
-    JOBS[job_id] = {"status": "processing", "result": None, "error": None}
+    j = JOBS[job_id] = _new_job()
+    j["uploading"] = True  # nobody can poll before this returns; _reap_abandoned_jobs skips it
+    CURRENT.set(j["cancel"])  # DELETE during conversion kills ffmpeg
+    TRACE.set(j["trace"])
 
     try:
-        wav_path = await save_upload_and_convert_to_wav(file, UPLOAD_DIR, PROCESSED_DIR, job_id)
+        with span("upload", filename=file.filename):
+            wav_path = await save_upload_and_convert_to_wav(file, UPLOAD_DIR, PROCESSED_DIR, job_id)
         saved_filename = f"{job_id}_{file.filename}"
         raw_path = UPLOAD_DIR / saved_filename
+    except Cancelled as e:
+        if job_id in JOBS:  # past its deadline; a DELETE has removed it already
+            _set_job(job_id, status="error", error=str(e))
+        raise HTTPException(status_code=409, detail=f"job was cancelled: {e}")
     except Exception as e:
-        JOBS[job_id]["status"] = "error"
-        JOBS[job_id]["error"] = str(e)
+        if job_id in JOBS:
+            _set_job(job_id, status="error", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        j.pop("uploading", None)
+        j["last_seen"] = time.perf_counter()  # the TTL starts once the client has the job id
+    if job_id not in JOBS:
+        raise HTTPException(status_code=409, detail="job was cancelled")
 
-    asyncio.create_task(run_job(job_id, wav_path))
+    JOBS[job_id]["task"] = asyncio.create_task(run_job(job_id, wav_path, reuse))
     return {"job_id": job_id, "filename": saved_filename}
 
 
 @app.get("/jobs/{job_id}", response_model=JobStatus)
-def job(job_id: str):
+async def job(job_id: str, request: Request, version: Optional[int] = None, wait: float = 0.0):
+    """
+    Job status. Finished jobs are served from pre-serialized, pre-compressed bytes with a
+    strong ETag (If-None-Match -> 304). ?version=<last seen>&wait=<s> long-polls until the
+    job changes (at most LONG_POLL_MAX_S).
+    """
     j = JOBS.get(job_id)
     if not j:
         return {"job_id": job_id, "status": "error", "result": None, "error": "job not found"}
-    return {"job_id": job_id, "status": j["status"], "result": j["result"], "error": j["error"]}
+    j["last_seen"] = time.perf_counter()
+    if version is not None and wait > 0 and "body" not in j and j["version"] <= version:
+        try:
+            await asyncio.wait_for(j["changed"].wait(), timeout=min(wait, LONG_POLL_MAX_S))
+        except asyncio.TimeoutError:
+            pass
+
+    body = j.get("body")
+    if body is None:
+        return {
+            "job_id": job_id,
+            "status": j["status"],
+            "result": j["result"],
+            "error": j["error"],
+            "version": j["version"],
+            "stage": j.get("stage"),
+            "lesson": j.get("lesson_url"),
+        }
+
+    headers = {"ETag": j["etag"], "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if _etag_matches(request.headers.get("if-none-match"), j["etag"]):
+        return Response(status_code=304, headers=headers)
+    enc = _pick_encoding(request.headers.get("accept-encoding", ""), body)
+    if enc != "identity":
+        headers["Content-Encoding"] = enc
+    return Response(content=body[enc], media_type="application/json", headers=headers)
+
+
+@app.get("/jobs/{job_id}/trace")
+def job_trace(job_id: str):
+    """
+    The job's timeline so far (upload, ffmpeg, each librosa call, basic-pitch, fingering,
+    serialization, ...) in Chrome trace-event format, with thread ids and RSS per span.
+    Open it in chrome://tracing or ui.perfetto.dev.
+    """
+    j = JOBS.get(job_id)
+    if not j:
+        raise HTTPException(status_code=404, detail="job not found")
+    return JSONResponse(
+        j["trace"].chrome(),
+        headers={"Content-Disposition": f'attachment; filename="{job_id}.trace.json"'},
+    )
+
+
+def _discard_job(job_id: str, reason: str) -> None:
+    """
+    Drop a job from the store and stop its work: cancel token (kills its ffmpeg/basic-pitch
+    subprocesses, stops stages at their next checkpoint), the run_job task and its renders.
+    Long-polls still waiting on it return an error with `reason`.
+    """
+    j = JOBS.pop(job_id)
+    j["cancel"].cancel(reason)
+    for cache in (RENDITIONS, BACKINGS):
+        if cache is not None:
+            cache.drop_job(job_id)
+    task = j.get("task")
+    if task is not None and not task.done():
+        task.cancel()
+    if j["status"] == "processing":
+        j.update(status="error", error=reason)
+        j["changed"].set()
+
+
+def _remove_job_files(job_id: str) -> None:
+    import shutil
+
+    renders = (*(PROCESSED_DIR / "renditions").glob(f"{job_id}_*"), *(PROCESSED_DIR / "backing").glob(f"{job_id}_*"))
+    for path in (_artifacts_dir(job_id), _basic_pitch_dir(job_id), *renders):
+        shutil.rmtree(path, ignore_errors=True)
+    for path in (PROCESSED_DIR / f"{job_id}.wav", *UPLOAD_DIR.glob(f"{job_id}_*"), *_lessons_dir().glob(f"{job_id}_*")):
+        path.unlink(missing_ok=True)
+    _fingerprint_index().remove(job_id)
+
+
+@app.delete("/jobs/{job_id}")
+async def delete_job(job_id: str):
+    """Cancel a job if it is still running (subprocesses included) and delete it and its files."""
+    if job_id not in JOBS:
+        raise HTTPException(status_code=404, detail="job not found")
+    was = JOBS[job_id]["status"]
+    _discard_job(job_id, "cancelled by client")
+    await asyncio.to_thread(_remove_job_files, job_id)
+    return {"job_id": job_id, "status": "deleted", "was": was}
+
+
+async def _reap_abandoned_jobs() -> None:
+    """
+    Cancel and delete processing jobs nobody has polled for JOB_TTL_S (tab closed, re-upload).
+    Uploads still converting are left alone: their client has no job id to poll with yet.
+    """
+    while True:
+        await asyncio.sleep(REAP_INTERVAL_S)
+        now = time.perf_counter()
+        for job_id, j in list(JOBS.items()):
+            if j["status"] == "processing" and not j.get("uploading") and now - j["last_seen"] > JOB_TTL_S:
+                _discard_job(job_id, f"abandoned: not polled for {JOB_TTL_S:.0f} s")
+                try:
+                    await asyncio.to_thread(_remove_job_files, job_id)
+                except Exception:
+                    pass  # the work is stopped either way
+
+
+def _job_artifacts(job_id: str, j: dict) -> dict:
+    """Saved intermediate features for a job, loaded from disk once and kept on the job."""
+    if j.get("artifacts") is None:
+        from dsp.note_highway import find_basic_pitch_csv, load_notes
+
+        art_dir = _artifacts_dir(job_id)
+        art = {}
+        for name in ("chord_features", "onset_features"):
+            path = art_dir / f"{name}.npz"
+            if path.exists():
+                art[name] = load_features(path)
+        try:
+            art["basic_pitch_notes"] = load_notes(
+                find_basic_pitch_csv(_basic_pitch_dir(job_id), PROCESSED_DIR / f"{job_id}.wav")
+            )
+        except FileNotFoundError:
+            pass
+        j["artifacts"] = art
+    return j["artifacts"]
+
+
+def _reprocess_result(job_id: str, j: dict, params: dict) -> dict:
+    """Re-run only the cheap downstream stages over saved artifacts."""
+    from dsp.note_highway import notes_to_highway
+
+    def pick(*names):
+        return {k: params[k] for k in names if k in params}
+
+    art = _job_artifacts(job_id, j)
+    if "chord_features" not in art:
+        raise HTTPException(status_code=409, detail="no saved analysis for this job; upload again")
+    chords_result = chords_from_features(art["chord_features"], **pick("smooth_win", "min_dur"))
+
+    source = j["result"].get("note_source")
+    if source == "basic_pitch" and "basic_pitch_notes" in art:
+        note_highway = notes_to_highway(
+            art["basic_pitch_notes"], **pick("min_velocity", "frame_window_s", "max_fret", "max_notes")
+        )
+    elif source == "onset_notes" and "onset_features" in art:
+        note_result = notes_from_features(
+            art["onset_features"], **pick("strum_window_s", "arpeggio_span_s", "quantize_div")
+        )
+        note_highway = {"notes": note_result["notes"], "duration": note_result["duration"]}
+    else:
+        source = "chord_highway"
+        note_highway = chords_to_note_highway(
+            chords_result.get("chords", []),
+            duration_seconds=30.0,
+            bpm=chords_result.get("bpm"),
+            **pick("strums_per_beat"),
+        )
+    result = _assemble_result(chords_result, note_highway, source)
+    reused = j.get("reused_from")
+    if reused:
+        result = {**_shifted_result(result, reused["offset_s"]), "reused_from": j["result"].get("reused_from")}
+    result["sections"] = j["result"].get("sections")  # audio structure; no parameter changes it
+    return result
+
+
+@app.post("/jobs/{job_id}/reprocess", response_model=JobStatus)
+async def reprocess(job_id: str, params: ReprocessParams):
+    """
+    Re-run chord segmentation and note_highway post-processing with new parameters, reusing
+    the job's saved note events / chroma / onsets / beats instead of re-analyzing the audio.
+    """
+    j = JOBS.get(job_id)
+    if not j:
+        raise HTTPException(status_code=404, detail="job not found")
+    if j["status"] != "done" or not j["result"]:
+        raise HTTPException(status_code=409, detail=f"job is {j['status']}")
+    TRACE.set(j["trace"])
+    with span("reprocess", **params.model_dump(exclude_none=True)):
+        result = await asyncio.to_thread(_reprocess_result, job_id, j, params.model_dump(exclude_none=True))
+    _set_job(job_id, status="done", result=result)
+    _lesson_task(job_id)  # new content, new bundle URL
+    await asyncio.to_thread(_highway_tiers, job_id, j)
+    return {
+        "job_id": job_id,
+        "status": "done",
+        "result": result,
+        "error": None,
+        "version": j["version"],
+        "stage": j["stage"],
+    }
+
+
+def _lessons_dir() -> Path:
+    return PROCESSED_DIR / "lessons"
+
+
+def _beat_times(job_id: str, j: dict):
+    """Tracked beat times from the job's chord features, or None."""
+    features = _job_artifacts(job_id, j).get("chord_features")
+    if features is None:
+        return None
+    # a fingerprint-reused job has its source's beats; move them onto this copy's timeline
+    beats = features["beat_times"] - j.get("reused_from", {}).get("offset_s", 0.0)
+    return beats[beats >= 0]
+
+
+def _highway_tiers(job_id: str, j: dict) -> dict:
+    """easy/medium/hard note highways (dsp.difficulty), derived once per result."""
+    from dsp.difficulty import highway_tiers
+
+    if j.get("tiers") is None:
+        result = j["result"]
+        with span("difficulty tiers", cat="dsp"):
+            j["tiers"] = highway_tiers(result.get("note_highway"), _beat_times(job_id, j), result.get("bpm"))
+    return j["tiers"]
+
+
+def _build_lesson(job_id: str, j: dict, result: dict) -> dict:
+    from dsp.lesson_bundle import build_lesson
+
+    beats = _beat_times(job_id, j)
+    with span("lesson bundle", cat="serialize") as trace_info:
+        info = build_lesson(PROCESSED_DIR / f"{job_id}.wav", result, beats, _lessons_dir(), job_id)
+        trace_info["bytes"] = info["bytes"]
+    return info
+
+
+def _prune_lessons(job_id: str, keep: str) -> None:
+    """Delete the job's lesson bundles superseded by `keep` (a reprocess makes a new one)."""
+    for old in _lessons_dir().glob(f"{job_id}_*.lesson"):
+        if old.name != keep:
+            old.unlink(missing_ok=True)
+
+
+def _lesson_task(job_id: str) -> asyncio.Task:
+    """Build (once per result) the job's lesson bundle in the background; sets JobStatus.lesson."""
+    j = JOBS[job_id]
+    task = j.get("lesson_task")
+    if task is None:
+        result = j["result"]
+
+        async def _build():
+            try:
+                info = await asyncio.to_thread(_build_lesson, job_id, j, result)
+            except Exception:
+                if j.get("lesson_task") is task:
+                    j.pop("lesson_task")  # the next GET /jobs/{id}/lesson retries
+                raise
+            url = f"/lessons/{info['file']}"
+            if JOBS.get(job_id) is j and j["result"] is result:  # not reprocessed meanwhile
+                _set_job(job_id, lesson_url=url)
+                # only the current result's build may clean up: an older build finishing
+                # late must not delete the bundle lesson_url points at
+                await asyncio.to_thread(_prune_lessons, job_id, info["file"])
+            return url
+
+        task = j["lesson_task"] = asyncio.create_task(_build())
+    return task
+
+
+@app.get("/jobs/{job_id}/lesson")
+async def job_lesson(job_id: str):
+    """
+    Redirect to the job's lesson bundle (audio, note highway, chords, beats, peaks in one
+    immutable file; see dsp.lesson_bundle), building it first if needed.
+    JobStatus.lesson has the same URL once it is built.
+    """
+    j = JOBS.get(job_id)
+    if not j:
+        raise HTTPException(status_code=404, detail="job not found")
+    if j["status"] != "done" or not j["result"]:
+        raise HTTPException(status_code=409, detail=f"job is {j['status']}")
+    url = j.get("lesson_url")
+    if url is None:
+        try:
+            url = await asyncio.shield(_lesson_task(job_id))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"lesson bundle failed: {e}")
+    return RedirectResponse(url, status_code=307, headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/lessons/{name}")
+def lesson_file(name: str):
+    """A lesson bundle. Its name carries its content hash, so it is cached as immutable."""
+    import re
+
+    path = _lessons_dir() / name
+    if not re.fullmatch(r"[\w-]+_[0-9a-f]{32}\.lesson", name) or not path.exists():
+        raise HTTPException(status_code=404, detail="lesson not found")
+    return FileResponse(
+        path,
+        media_type="application/octet-stream",
+        headers={
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "ETag": '"' + name.rsplit("_", 1)[1].split(".")[0] + '"',
+        },
+    )
+
+
+def _time_index(job_id: str, kind: str, tier: str = "hard"):
+    """Time-sorted index of a finished job's notes (per difficulty tier) or chords, built on first query."""
+    from dsp.time_index import TimeIndex
+
+    j = JOBS.get(job_id)
+    if not j:
+        raise HTTPException(status_code=404, detail="job not found")
+    if j["status"] != "done" or not j["result"]:
+        raise HTTPException(status_code=409, detail=f"job is {j['status']}")
+    indexes = j.setdefault("time_index", {})
+    key = f"notes:{tier}" if kind == "notes" else kind
+    if key not in indexes:
+        result = j["result"]
+        if kind == "notes":
+            indexes[key] = TimeIndex(_highway_tiers(job_id, j)[tier]["notes"], "time", version=j["version"])
+        else:
+            indexes[key] = TimeIndex(result.get("chords"), "t0", end_key="t1", version=j["version"])
+    return indexes[key]
+
+
+def _time_query(index, t0: float, t1: Optional[float], cursor: Optional[str], limit: int) -> dict:
+    from dsp.time_index import StaleCursor
+
+    try:
+        return index.query(t0, t1, cursor, limit)
+    except StaleCursor as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/jobs/{job_id}/notes")
+def job_notes(
+    job_id: str, t0: float = 0.0, t1: Optional[float] = None, cursor: Optional[str] = None, limit: int = 500,
+    tier: str = "hard",
+):
+    """
+    note_highway notes starting in [t0, t1), paginated with `cursor` (see next_cursor).
+    ?tier=easy|medium thins the highway for beginners (dsp.difficulty); hard is the full one.
+    """
+    from dsp.difficulty import TIERS
+
+    if tier not in TIERS:
+        raise HTTPException(status_code=422, detail=f"tier must be one of {', '.join(TIERS)}")
+    return {"job_id": job_id, "tier": tier, **_time_query(_time_index(job_id, "notes", tier), t0, t1, cursor, limit)}
+
+
+@app.get("/jobs/{job_id}/chords")
+def job_chords(job_id: str, t0: float = 0.0, t1: Optional[float] = None, cursor: Optional[str] = None, limit: int = 500):
+    """Chord segments overlapping [t0, t1), paginated with `cursor` (see next_cursor)."""
+    return {"job_id": job_id, **_time_query(_time_index(job_id, "chords"), t0, t1, cursor, limit)}
+
+
+def _align_features(job_id: str, j: dict) -> dict:
+    """Full-song alignment features of the job's audio (dsp.alignment), computed on first compare and saved."""
+    from dsp.alignment import extract_align_features
+
+    if j.get("align_features") is None:
+        path = _artifacts_dir(job_id) / "align_features.npz"
+        if path.exists():
+            features = load_features(path)
+        else:
+            features = extract_align_features(PROCESSED_DIR / f"{job_id}.wav")
+            save_features(path, features)
+        j["align_features"] = features
+    return j["align_features"]
+
+
+@app.post("/jobs/{job_id}/compare")
+async def compare_take(job_id: str, file: UploadFile = File(...), tier: str = "hard"):
+    """
+    Align an uploaded practice take to the job's song and score it: per chord segment and per
+    note (of the ?tier= highway) timing in ms and pitch accuracy, plus a summary.
+    The take may be any part of the song, at any steady tempo.
+    """
+    from dsp.alignment import ALIGN_SR, MIN_TAKE_S, extract_align_features, score_take
+    from dsp.difficulty import TIERS
+
+    j = JOBS.get(job_id)
+    if not j:
+        raise HTTPException(status_code=404, detail="job not found")
+    if j["status"] != "done" or not j["result"]:
+        raise HTTPException(status_code=409, detail=f"job is {j['status']}")
+    if tier not in TIERS:
+        raise HTTPException(status_code=422, detail=f"tier must be one of {', '.join(TIERS)}")
+
+    started = time.perf_counter()
+    take_id = f"{job_id}_take_{uuid4().hex[:8]}"
+    try:
+        take_wav = await save_upload_and_convert_to_wav(file, UPLOAD_DIR, PROCESSED_DIR, take_id, target_sr=ALIGN_SR)
+        take, ref, tiers = await asyncio.gather(
+            asyncio.to_thread(extract_align_features, take_wav),
+            asyncio.to_thread(_align_features, job_id, j),
+            asyncio.to_thread(_highway_tiers, job_id, j),
+        )
+        if take["chroma"].shape[1] * take["hop_length"] / take["sr"] < MIN_TAKE_S:
+            raise HTTPException(status_code=400, detail=f"take is shorter than {MIN_TAKE_S:.0f} s")
+        scores = await asyncio.to_thread(score_take, take, ref, tiers[tier], j["result"].get("chords"))
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=f"could not read the take: {e}")
+    finally:
+        # takes are scored, not kept
+        for path in (PROCESSED_DIR / f"{take_id}.wav", *UPLOAD_DIR.glob(f"{take_id}_*")):
+            path.unlink(missing_ok=True)
+    return {"job_id": job_id, "tier": tier, **scores, "elapsed_s": time.perf_counter() - started}
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# tests import the backend the way main.py does: `from dsp... import ...`
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from dsp.alignment import align, dtw_band
+
+
+def features(chroma, onset_env, sr=22050, hop=512):
+    return {"chroma": chroma, "onset_env": onset_env, "onset_times": np.zeros(0), "sr": sr, "hop_length": hop}
+
+
+def song(n=1200, seed=0):
+    rng = np.random.default_rng(seed)
+    # a new random chord every 5 frames, so every stretch of the song is distinctive
+    chords = rng.random((12, n // 5 + 1)) ** 4
+    chroma = np.repeat(chords, 5, axis=1)[:, :n] + 0.01
+    env = np.zeros(n)
+    env[::5] = 1.0
+    return chroma, env
+
+
+def test_dtw_band_finds_the_subsequence():
+    rng = np.random.default_rng(1)
+    y = rng.random((200, 13))
+    y[:, :12] /= np.linalg.norm(y[:, :12], axis=1, keepdims=True)
+    x = y[60:110]
+    n = len(x)
+    path, cost = dtw_band(x, y, np.zeros(n, dtype=np.int64), np.full(n, len(y), dtype=np.int64))
+    assert path[0].tolist() == [0, 60]          # free start
+    assert path[-1].tolist() == [n - 1, 109]    # free end
+    assert np.all(path[:, 1] - path[:, 0] == 60)
+    assert cost == pytest.approx(0.0, abs=1e-9)
+
+
+def test_dtw_band_respects_the_band():
+    y = np.ones((50, 13))
+    x = np.ones((10, 13))
+    lo = np.arange(10, dtype=np.int64) + 5
+    hi = lo + 3
+    path, _ = dtw_band(x, y, lo, hi)
+    assert np.all((path[:, 1] >= lo[path[:, 0]]) & (path[:, 1] < hi[path[:, 0]]))
+
+
+def test_align_recovers_offset_and_tempo():
+    chroma, env = song()
+    ref = features(chroma, env)
+    # the take plays frames 300..900 at half speed
+    idx = np.repeat(np.arange(300, 900), 2)
+    take = features(chroma[:, idx], env[idx])
+    out = align(take, ref)
+    hop_s = 512 / 22050
+    assert out["rate"] == pytest.approx(2.0, rel=0.05)
+    # take time 0 is song time 300 frames in
+    assert -out["offset"] / out["rate"] == pytest.approx(300 * hop_s, abs=0.1)
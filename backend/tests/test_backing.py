@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from dsp.backing import (
+    GAIN, LOW_MIDI, RING_S, STRUM_SPREAD_S, UP_STRUM_STRINGS, _gate, backing_events,
+)
+from dsp.voicings import OPEN_MIDI, voicing_for_label
+
+BEATS = np.arange(8) * 0.5  # two bars at 120 bpm
+
+
+def events(chords, beats=BEATS, rate=1.0, semitones=0):
+    return backing_events(chords, beats, 120.0, 4.0, rate, semitones)
+
+
+def strum_rows(label):
+    """Bank rows of a down-strum of label's voicing, low string first."""
+    shape = voicing_for_label(label)
+    return [OPEN_MIDI[s] + f - LOW_MIDI for s, f in enumerate(shape) if f >= 0]
+
+
+def test_gate_rings_until_the_next_event_on_its_channel():
+    t = np.array([0.0, 0.5, 0.2, 3.0, 0.3])
+    channel = np.array([0, 0, 1, 0, 1])
+    assert _gate(t, channel, ring=1.5).tolist() == pytest.approx([0.5, 1.5, 0.1, 1.5, 1.5])
+    assert _gate(np.zeros(0), np.zeros(0), ring=1.5).shape == (0,)
+
+
+def test_click_accents_each_bar():
+    click = events([{"t0": 0.0, "t1": 4.0, "label": "C"}])["click"]
+    assert click["t"].tolist() == BEATS.tolist()
+    assert click["row"].tolist() == [0, 1, 1, 1, 0, 1, 1, 1]
+    assert click["gain"].tolist() == [GAIN["accent"]] + [GAIN["click"]] * 3 + [GAIN["accent"]] + [GAIN["click"]] * 3
+
+
+def test_bass_plays_root_and_fifth():
+    bass = events([{"t0": 0.0, "t1": 2.0, "label": "C"}, {"t0": 2.0, "t1": 4.0, "label": "N"}])["bass"]
+    c = (0 - LOW_MIDI) % 12  # C2
+    assert bass["t"].tolist() == [0.0, 0.5, 1.0, 1.5]  # nothing under "N"
+    assert bass["row"].tolist() == [c, c + 7, c, c + 7]
+    assert bass["length"].tolist() == pytest.approx([0.5, 0.5, 0.5, RING_S])
+
+
+def test_strums_use_the_chord_voicing():
+    pluck = events([{"t0": 0.0, "t1": 4.0, "label": "D"}])["pluck"]
+    rows = strum_rows("D")
+
+    down = pluck["t"] < STRUM_SPREAD_S * len(rows)  # the first down-strum
+    assert pluck["row"][down].tolist() == rows
+    assert np.diff(pluck["t"][down]) == pytest.approx([STRUM_SPREAD_S] * (len(rows) - 1))
+    assert set(pluck["gain"][down].tolist()) == {GAIN["strum"]}
+
+    up = (pluck["t"] >= 0.25) & (pluck["t"] < 0.5)  # the up-strum between the first two beats
+    assert pluck["row"][up].tolist() == rows[::-1][:UP_STRUM_STRINGS]
+    assert set(pluck["gain"][up].tolist()) == {GAIN["up"]}
+
+
+def test_rate_and_semitones_move_the_events():
+    base = events([{"t0": 0.0, "t1": 4.0, "label": "C"}])
+    moved = events([{"t0": 0.0, "t1": 4.0, "label": "C"}], rate=2.0, semitones=2)
+    assert moved["click"]["t"].tolist() == (base["click"]["t"] / 2).tolist()
+    assert moved["bass"]["row"][0] == base["bass"]["row"][0] + 2  # D2
+    rows = strum_rows("D")
+    assert moved["pluck"]["row"][:len(rows)].tolist() == rows
@@ -0,0 +1,79 @@
+import time
+
+import numpy as np
+import pytest
+
+from dsp import note_highway
+from dsp.cancel import run_cancellable
+from dsp.note_highway import run_basic_pitch_segmented, segment_bounds, stitch_segment
+
+
+def note(start, end, midi=60, velocity=80):
+    return {"start": start, "end": end, "midi": midi, "velocity": velocity}
+
+
+@pytest.mark.parametrize("duration", [1.0, 30.0, 59.0, 61.0, 200.0, 605.5])
+def test_segment_bounds_cover_the_audio_with_overlap(duration):
+    bounds = segment_bounds(duration, segment_s=60.0, overlap_s=4.0)
+    assert bounds[0][0] == 0.0
+    assert bounds[-1][1] == pytest.approx(duration)
+    for (a0, a1), (b0, b1) in zip(bounds, bounds[1:]):
+        assert a1 - b0 == pytest.approx(4.0)  # neighbours share exactly the overlap
+        assert b1 > a1
+    assert all(t1 - t0 <= 60.0 for t0, t1 in bounds)
+
+
+def test_segment_bounds_short_audio_is_one_segment():
+    assert segment_bounds(10.0, segment_s=60.0, overlap_s=4.0) == [(0.0, 10.0)]
+
+
+def test_stitch_keeps_each_overlap_note_once():
+    # overlap [56, 60), seam at 58: both segments heard the notes at 57 and 59
+    left = [note(50.0, 51.0), note(57.0, 57.5, 62), note(59.0, 59.4, 64)]
+    right = [note(57.0, 57.5, 62), note(59.0, 59.4, 64), note(61.0, 62.0, 65)]
+    out = stitch_segment(left, right, left_end=60.0, seam=58.0)
+    assert sorted((n["start"], n["midi"]) for n in out) == [(50.0, 60), (57.0, 62), (59.0, 64), (61.0, 65)]
+
+
+def test_stitch_extends_a_note_cut_off_by_the_segment_edge():
+    # held through the left segment's end; the right segment sees it sounding from its start
+    left = [note(55.0, 60.0, 52, velocity=70)]
+    right = [note(56.0, 63.0, 52, velocity=90)]
+    out = stitch_segment(left, right, left_end=60.0, seam=58.0)
+    assert len(out) == 1
+    assert out[0]["start"] == 55.0 and out[0]["end"] == 63.0 and out[0]["velocity"] == 90
+
+
+def test_stitch_merges_an_onset_jittered_across_the_seam():
+    # left put the onset just before the seam, right just after: one note
+    left = [note(57.99, 58.5, 67)]
+    right = [note(58.01, 58.6, 67)]
+    out = stitch_segment(left, right, left_end=60.0, seam=58.0)
+    assert len(out) == 1
+    assert out[0]["start"] == 57.99 and out[0]["end"] == 58.6
+
+
+def test_stitch_drops_left_notes_after_the_seam_and_keeps_distinct_pitches():
+    left = [note(59.0, 59.5, 60)]          # after the seam: the right side owns it
+    right = [note(59.02, 59.5, 60), note(59.02, 59.5, 64)]
+    out = stitch_segment(left, right, left_end=60.0, seam=58.0)
+    assert sorted((n["start"], n["midi"]) for n in out) == [(59.02, 60), (59.02, 64)]
+
+
+def test_failed_segment_cancels_its_siblings(tmp_path, monkeypatch):
+    import soundfile as sf
+
+    audio = tmp_path / "song.wav"
+    sf.write(str(audio), np.zeros(8 * 8000, dtype=np.float32), 8000)
+
+    def fake_basic_pitch(out_dir, seg_path):
+        if seg_path.stem.endswith("002"):
+            raise RuntimeError("basic-pitch crashed")
+        run_cancellable(["sleep", "10"])  # killed once the failure cancels the siblings
+        raise AssertionError("sibling segment was not cancelled")
+
+    monkeypatch.setattr(note_highway, "run_basic_pitch", fake_basic_pitch)
+    t = time.monotonic()
+    with pytest.raises(RuntimeError, match="basic-pitch crashed"):
+        run_basic_pitch_segmented(tmp_path, audio, segment_s=2.0, overlap_s=0.5, workers=8)
+    assert time.monotonic() - t < 5.0
@@ -0,0 +1,103 @@
+from dsp.practice_scoring import HIT_WINDOW_S, MISS_AFTER_S, HighwayIndex, PracticeScorer
+
+
+def test_highway_index_sorts_and_windows_inclusively():
+    nh = {"duration": 10.0, "notes": [
+        {"time": 2.0, "string": 0, "fret": 3},
+        {"time": 1.0, "string": 5, "fret": 0},
+        {"time": 2.0, "string": 1, "fret": 2},
+        {"time": 4.0, "string": 2, "fret": 0},
+    ]}
+    idx = HighwayIndex(nh)
+    assert len(idx) == 4
+    assert idx.times.tolist() == [1.0, 2.0, 2.0, 4.0]
+    assert idx.midi.tolist() == [64, 43, 47, 50]  # open e, G on low E, B on A, open D
+    assert idx.window(2.0, 2.0) == (1, 3)
+    assert idx.window(1.5, 3.9) == (1, 3)
+    assert idx.window(4.5, 9.0) == (4, 4)
+    assert idx.duration == 10.0
+
+
+def test_highway_index_empty():
+    idx = HighwayIndex(None)
+    assert len(idx) == 0
+    assert idx.window(0.0, 5.0) == (0, 0)
+    assert idx.duration == 0.0
+
+
+def _scorer(*notes):
+    """Scorer over notes given as (time, string, fret)."""
+    return PracticeScorer(HighwayIndex({"notes": [
+        {"time": t, "string": s, "fret": f} for t, s, f in notes
+    ]}))
+
+
+def _onset(midi):
+    return {"onset": True, "pitch_hz": 440.0 * 2.0 ** ((midi - 69) / 12.0)}
+
+
+def test_onset_in_window_hits_the_note():
+    sc = _scorer((1.0, 0, 3))  # G2, midi 43
+    out = sc.on_event(_onset(43), 1.05)
+    assert [e["type"] for e in out] == ["hit"]
+    assert out[0]["note_index"] == 0
+    assert abs(out[0]["timing_error_ms"] - 50.0) < 1e-6
+    assert abs(out[0]["pitch_error_cents"]) < 1e-6
+    assert sc.score()["hits"] == 1
+
+
+def test_onset_outside_window_or_wrong_fret_is_extra():
+    sc = _scorer((1.0, 0, 3))
+    assert [e["type"] for e in sc.on_event(_onset(43), 1.0 + HIT_WINDOW_S + 0.01)] == ["extra"]
+    assert [e["type"] for e in sc.on_event(_onset(45), 1.0)] == ["extra"]  # fret 5, not 3
+    assert sc.score()["extras"] == 2 and sc.score()["hits"] == 0
+
+
+def test_octave_off_pitch_still_hits():
+    sc = _scorer((1.0, 0, 3))
+    assert [e["type"] for e in sc.on_event(_onset(55), 1.0)] == ["hit"]
+
+
+def test_one_onset_plays_the_whole_strum():
+    sc = _scorer((1.0, 0, 3), (1.0, 1, 2), (1.0, 2, 0))
+    out = sc.on_event(_onset(43), 1.0)
+    assert out[0]["notes"] == [0, 1, 2]
+    assert sc.score()["hits"] == 3
+
+
+def test_closest_unplayed_note_is_matched():
+    sc = _scorer((1.0, 0, 3), (1.1, 0, 3))
+    assert sc._match(1.08, 43.0) == 1
+    sc.on_event(_onset(43), 1.08)
+    assert sc._match(1.08, 43.0) == 0  # 1 is played now
+    assert sc._match(1.08, 50.0) is None
+
+
+def test_unplayed_notes_are_swept_as_misses():
+    sc = _scorer((1.0, 0, 3), (2.0, 0, 5))
+    out = sc.on_event({"onset": False}, 1.0 + MISS_AFTER_S + 0.01)
+    assert [(e["type"], e["note_index"]) for e in out] == [("miss", 0)]
+    # a missed note can no longer be hit
+    assert [e["type"] for e in sc.on_event(_onset(43), 1.1)] == ["extra"]
+    assert sc.score()["misses"] == 1 and sc.score()["progress"] == 0.5
+
+
+def test_seek_forward_skips_without_penalty():
+    sc = _scorer((1.0, 0, 3), (2.0, 0, 5), (6.0, 0, 3))
+    sc.seek(5.0)
+    out = sc.on_event({"onset": False}, 5.5)
+    assert out == []
+    assert sc.score()["misses"] == 0
+
+
+def test_seek_back_lets_notes_be_played_again():
+    sc = _scorer((1.0, 0, 3), (2.0, 0, 5), (3.0, 0, 3))
+    sc.on_event(_onset(43), 1.0)  # hits note 0
+    sc.on_event({"onset": False}, 3.0 + MISS_AFTER_S + 0.01)  # misses notes 1 and 2
+    assert sc.score()["misses"] == 2
+    sc.seek(1.5)
+    assert sc.score()["progress"] == 1 / 3
+    assert [e["type"] for e in sc.on_event(_onset(45), 2.0)] == ["hit"]
+    out = sc.on_event({"onset": False}, 3.0 + MISS_AFTER_S + 0.01)
+    assert [(e["type"], e["note_index"]) for e in out] == [("miss", 2)]
+    assert [e["type"] for e in sc.on_event(_onset(43), 1.0)] == ["extra"]  # before the seek: still played
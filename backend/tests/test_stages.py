@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+from dsp.cancel import CURRENT
+from dsp.stages import Stage, run_stages
+
+
+def run(stages):
+    return asyncio.run(run_stages(stages))
+
+
+def test_dependency_results_are_passed_by_name():
+    result = run([Stage("a", lambda: 2), Stage("b", lambda a: a * 3, deps=("a",))])
+    assert result.results == {"a": 2, "b": 6}
+    assert not result.errors
+
+
+def test_timed_out_stage_fails_its_dependents():
+    def slow():
+        time.sleep(0.5)
+
+    result = run([Stage("a", slow, timeout=0.05), Stage("b", lambda a: a, deps=("a",))])
+    assert isinstance(result.errors["a"], asyncio.TimeoutError)
+    assert "dependency failed: a" in str(result.errors["b"])
+
+
+def test_timed_out_stage_token_is_cancelled():
+    seen = {}
+
+    def slow():
+        token = CURRENT.get()
+        time.sleep(0.2)
+        seen["cancelled"] = token.cancelled
+
+    run([Stage("a", slow, timeout=0.05)])
+    time.sleep(0.25)  # the worker thread outlives the await
+    assert seen["cancelled"]
+
+
+def test_group_uses_best_success_and_falls_back():
+    def fails():
+        raise RuntimeError("no basic-pitch")
+
+    result = run([
+        Stage("best", fails, group="g", priority=0),
+        Stage("fallback", lambda: "onsets", group="g", priority=1),
+    ])
+    assert result.results["g"] == "onsets"
+    assert result.winners["g"] == "fallback"
+
+
+def test_group_winner_cancels_worse_candidates():
+    def slow():
+        time.sleep(0.5)
+        return "late"
+
+    result = run([
+        Stage("best", lambda: "fast", group="g", priority=0),
+        Stage("worse", slow, group="g", priority=1),
+    ])
+    assert result.results["g"] == "fast"
+    assert "worse" in result.cancelled
+
+
+def test_deadline_starts_when_the_stage_launches():
+    # b's 0.3 s budget must not be spent while it waits 0.25 s for a
+    def a():
+        time.sleep(0.25)
+
+    def b(a):
+        time.sleep(0.1)
+        return CURRENT.get().cancelled
+
+    result = run([Stage("a", a), Stage("b", b, deps=("a",), timeout=0.3)])
+    assert result.results["b"] is False
+
+
+def test_optional_dependency_failure_still_runs_the_stage():
+    def boom():
+        raise ValueError("no structure")
+
+    def slow():
+        time.sleep(0.5)
+
+    for failing in (Stage("s", boom), Stage("s", slow, timeout=0.05)):
+        result = run([failing, Stage("b", lambda s: ("ran", s), optional=("s",))])
+        assert result.results["b"] == ("ran", None)
+        assert "s" in result.errors
+
+
+def test_optional_dependency_result_is_passed():
+    result = run([Stage("s", lambda: {"k": 1}), Stage("b", lambda s: s, optional=("s",))])
+    assert result.results["b"] == {"k": 1}
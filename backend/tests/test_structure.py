@@ -0,0 +1,36 @@
+import pytest
+
+from dsp.structure import _plan_spans, copy_repeats
+
+
+def covered(copies, spans, duration):
+    edges = sorted([(a, b) for a, b in spans] + [(a, b) for a, b, _ in copies])
+    assert edges[0][0] == 0.0 and edges[-1][1] == duration
+    return all(b0 == pytest.approx(a1) for (_, a1), (b0, _) in zip(edges, edges[1:]))
+
+
+def test_spans_are_what_the_copies_leave():
+    copies = [[20.0, 40.0, 20.0]]
+    assert _plan_spans(copies, 60.0) == [[0.0, 20.0], [40.0, 60.0]]
+
+
+def test_sliver_between_copies_goes_with_a_neighbouring_copy():
+    copies = [[10.0, 20.0, 10.0], [20.5, 30.0, 20.0]]
+    spans = _plan_spans(copies, 40.0)
+    assert spans == [[0.0, 10.0], [30.0, 40.0]]
+    # [20, 20.5) now copies from [0, 0.5), which is transcribed
+    assert copies[1] == [20.0, 30.0, 20.0]
+    assert covered(copies, spans, 40.0)
+
+
+def test_sliver_with_no_transcribed_source_is_transcribed():
+    copies = [[0.4, 10.0, 5.0]]  # nothing before the song's start to copy from
+    spans = _plan_spans(copies, 20.0)
+    assert spans == [[0.0, 0.4], [10.0, 20.0]]
+    assert covered(copies, spans, 20.0)
+
+
+def test_copy_repeats_moves_source_notes_onto_the_repeat():
+    notes = [{"start": 1.0, "end": 1.5, "midi": 60}, {"start": 12.0, "end": 12.5, "midi": 62}]
+    out = copy_repeats(notes, [[20.0, 30.0, 20.0]])
+    assert [(n["start"], n["midi"]) for n in out] == [(1.0, 60), (12.0, 62), (21.0, 60)]
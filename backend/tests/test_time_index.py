@@ -0,0 +1,28 @@
+import pytest
+
+from dsp.time_index import StaleCursor, TimeIndex
+
+
+def test_pages_chain_through_the_window():
+    idx = TimeIndex([{"time": t} for t in (5, 1, 3, 2, 4)], version=7)
+    first = idx.query(2.0, 5.0, limit=2)
+    assert [n["time"] for n in first["items"]] == [2, 3]
+    assert first["total"] == 3
+    second = idx.query(2.0, 5.0, cursor=first["next_cursor"], limit=2)
+    assert [n["time"] for n in second["items"]] == [4]
+    assert second["next_cursor"] is None
+
+
+def test_segments_still_sounding_at_t0_are_included():
+    idx = TimeIndex([{"t0": 0, "t1": 2}, {"t0": 2, "t1": 4}, {"t0": 4, "t1": 6}], "t0", end_key="t1")
+    assert [c["t0"] for c in idx.query(3.0, 4.5)["items"]] == [2, 4]
+
+
+def test_cursor_from_a_rebuilt_index_is_rejected():
+    old = TimeIndex([{"time": t} for t in range(10)], version=1)
+    cursor = old.query(0.0, None, limit=3)["next_cursor"]
+    new = TimeIndex([{"time": t} for t in range(10)], version=2)
+    with pytest.raises(StaleCursor):
+        new.query(0.0, None, cursor=cursor)
+    with pytest.raises(ValueError):
+        new.query(0.0, None, cursor="3")
@@ -0,0 +1,50 @@
+import pytest
+
+from dsp.voicings import (
+    CHORD_SHAPES, NOTE_NAMES, OPEN_MIDI, QUALITIES, VOICINGS, label_for_mask, parse_label, pitch_class_mask,
+    shape_for_mask, voicing_for_label,
+)
+
+
+def shape_pcs(shape):
+    return {(OPEN_MIDI[s] + f) % 12 for s, f in enumerate(shape) if f >= 0}
+
+
+def chord_pcs(label):
+    root, quality = parse_label(label)
+    return {(root + iv) % 12 for iv in QUALITIES[quality]}
+
+
+def test_every_voicing_plays_exactly_its_chord():
+    assert len(VOICINGS) == 12 * len(QUALITIES)
+    for label, voicings in VOICINGS.items():
+        assert voicings, label
+        for v in voicings:
+            assert shape_pcs(v["shape"]) == chord_pcs(label), (label, v)
+
+
+def test_hand_written_shapes_win():
+    for label, shape in CHORD_SHAPES.items():
+        if shape_pcs(shape) == chord_pcs(label):
+            assert voicing_for_label(label) == shape
+
+
+@pytest.mark.parametrize("label", [n + q for q in QUALITIES for n in NOTE_NAMES])
+def test_mask_table_maps_each_triad_to_itself(label):
+    mask = pitch_class_mask(chord_pcs(label))
+    assert label_for_mask(mask) == label
+    assert shape_pcs(shape_for_mask(mask)) == chord_pcs(label)
+
+
+def test_mask_table_partial_chords():
+    # root + fifth is in both C and Cm: majors win the tie; a lone pitch class picks a chord rooted on it
+    assert label_for_mask(pitch_class_mask([0, 7])) == "C"
+    assert label_for_mask(pitch_class_mask([9])) == "A"
+    assert label_for_mask(0) is None
+    assert label_for_mask(pitch_class_mask([0, 1, 2])) is None  # in no triad
+
+
+def test_flats_and_long_quality_names():
+    assert parse_label("Dbm") == parse_label("C#m") == (1, "m")
+    assert parse_label("Amin") == (9, "m")
+    assert parse_label("H") is None
@@ -6,6 +6,7 @@ import LiveDetectedNotes, { useLiveGuitar } from '../components/LiveDetectedNote
 import ChordDiagram, { CHORD_DATA } from '../components/ChordDiagram';
 import { MOCK_SONG } from '../data/mockSongData';
 import { PRACTICE_SONG } from '../data/practiceVisualizerSong';
+import { loadLesson } from '../utils/lessonBundle';
 
 export default function Practice() {
   const navigate = useNavigate();
@@ -13,16 +14,45 @@ export default function Practice() {
   const [visualizerMode, setVisualizerMode] = useState('notes'); // 'notes' | 'chords'
   const { notes, isConnected, error, connect, disconnect } = useLiveGuitar();
 
-  // Use songData from Results (uploaded song) or fallback to mock
-  const songDataFromUpload = location.state?.songData;
-  const audioUrl = location.state?.audioUrl;
+  // Uploaded song: one lesson bundle (audio + notes) when Results passes lessonUrl,
+  // else songData + the processed WAV; fallback to mock
+  const lessonUrl = location.state?.lessonUrl;
+  const [lesson, setLesson] = useState(null);
+  const [lessonFailed, setLessonFailed] = useState(false);
+  const [lessonAudioUrl, setLessonAudioUrl] = useState(null);
+  const songDataFromUpload = lesson?.songData ?? location.state?.songData;
+  const audioUrl = lessonUrl && !lessonFailed ? lessonAudioUrl : location.state?.audioUrl;
   const NOTES_SONG = songDataFromUpload ?? PRACTICE_SONG;
+
+  useEffect(() => {
+    if (!lessonUrl) return;
+    const ctrl = new AbortController();
+    let objectUrl = null;
+    loadLesson(lessonUrl, { signal: ctrl.signal })
+      .then((l) => {
+        objectUrl = URL.createObjectURL(l.audioBlob);
+        setLesson(l);
+        setLessonAudioUrl(objectUrl);
+      })
+      .catch((e) => {
+        if (e.name !== 'AbortError') setLessonFailed(true);
+      });
+    return () => {
+      ctrl.abort();
+      if (objectUrl) URL.revokeObjectURL(objectUrl);
+    };
+  }, [lessonUrl]);
   const [currentTime, setCurrentTime] = useState(0);
   const [isPlaying, setIsPlaying] = useState(false);
   const [playbackSpeed, setPlaybackSpeed] = useState(1);
   const audioRef = useRef(null);
   const intervalRef = useRef(null);
   const lastTickRef = useRef(0);
+  // Section loop (uploaded songs): repeat one detected verse / chorus / ... until turned off
+  const songSections = lesson?.songSections ?? [];
+  const [loopSection, setLoopSection] = useState(null);
+  const loopRef = useRef(null);
+  loopRef.current = loopSection;
 
   const SPEEDS = [0.25, 0.5, 0.75, 1];
   const SONG = visualizerMode === 'notes' ? NOTES_SONG : MOCK_SONG;
@@ -37,7 +67,11 @@ export default function Practice() {
   useEffect(() => {
     if (!useAudio || !audioRef.current) return;
     const audio = audioRef.current;
-    const onTimeUpdate = () => setCurrentTime(audio.currentTime * 1000);
+    const onTimeUpdate = () => {
+      const loop = loopRef.current;
+      if (loop && audio.currentTime >= loop.t1) audio.currentTime = loop.t0;
+      setCurrentTime(audio.currentTime * 1000);
+    };
     const onPlay = () => setIsPlaying(true);
     const onPause = () => setIsPlaying(false);
     const onEnded = () => setIsPlaying(false);
@@ -147,6 +181,18 @@ export default function Practice() {
     }
   };
 
+  const handleLoopSection = (section) => {
+    if (loopSection === section) {
+      setLoopSection(null);
+      return;
+    }
+    setLoopSection(section);
+    if (audioRef.current) {
+      audioRef.current.currentTime = section.t0;
+      audioRef.current.play().then(() => setIsPlaying(true)).catch(() => {});
+    }
+  };
+
   // Unique chords from song (from location.state or MOCK_SONG), filtered to those in chord library
   const songChords = useMemo(() => {
     const chords = location.state?.chords ?? MOCK_SONG.chords.map((c) => c.chord);
@@ -309,6 +355,27 @@ export default function Practice() {
             </button>
           </div>
 
+          {/* Section loop */}
+          {useAudio && songSections.length > 1 && (
+            <div className="flex flex-wrap gap-2 justify-center items-center mt-6">
+              <span className="font-body text-sm font-semibold text-amber-900">Loop:</span>
+              {songSections.map((section) => (
+                <button
+                  key={section.t0}
+                  onClick={() => handleLoopSection(section)}
+                  className={`px-3 py-2 rounded-xl font-display font-semibold text-sm transition practice-btn ${
+                    loopSection === section
+                      ? 'bg-amber-400 text-amber-950 practice-btn-active'
+                      : 'bg-amber-100 text-amber-900 hover:bg-amber-200 border border-amber-800/30'
+                  }`}
+                >
+                  {section.label}
+                  {section.group && section.instance > 1 ? ` ${section.instance}` : ''}
+                </button>
+              ))}
+            </div>
+          )}
+
           {/* Seek Position */}
           <div className="text-center mt-6">
             <p className="font-body text-sm text-amber-900 mb-2">Seek Position</p>
@@ -17,6 +17,7 @@ export default function Processing() {
   const fileName = location.state?.fileName || 'your song';
   const [step, setStep] = React.useState(0);
   const [error, setError] = React.useState(null);
+  const [roughChords, setRoughChords] = React.useState([]);
 
   useEffect(() => {
     const t = setInterval(() => {
@@ -44,6 +45,10 @@ export default function Processing() {
           setError(data.error || 'Processing failed');
           return;
         }
+        if (data.stage === 'preview' && data.result?.chords) {
+          // provisional chords from the fast preview pass; replaced when the full analysis lands
+          setRoughChords(data.result.chords.map((c) => c.label).slice(0, 8));
+        }
       } catch (e) {
         if (!cancelled) setError(e.message || 'Could not reach backend');
         return;
@@ -64,6 +69,11 @@ export default function Processing() {
         <p className={`font-body text-lg ${error ? 'text-red-600' : 'text-gray-600 animate-pulse'}`}>
           {error || MESSAGES[step]}
         </p>
+        {!error && roughChords.length > 0 && (
+          <p className="font-body text-sm text-gray-500 mt-2">
+            Rough chords so far: {roughChords.join(' · ')}
+          </p>
+        )}
         <div className="mt-8 w-64 h-2 bg-lesson-border rounded-full overflow-hidden">
           <div
             className="h-full bg-bob-green rounded-full transition-all duration-500"
@@ -16,6 +16,8 @@ export default function Results() {
   const audioUrl = jobId
     ? `${API_BASE}/processed/${jobId}.wav`
     : null;
+  // Practice loads audio + notes as one cacheable lesson bundle (redirects to its immutable URL)
+  const lessonUrl = jobId ? `${API_BASE}/jobs/${jobId}/lesson` : null;
 
   const chordLabels = result?.chords?.map((c) => (typeof c === 'string' ? c : c?.label ?? c)).filter(Boolean) ?? [];
   const chords = chordLabels.length ? [...new Set(chordLabels)] : FALLBACK_CHORDS;
@@ -63,7 +65,7 @@ export default function Results() {
         <div className="mt-8 flex flex-col sm:flex-row gap-4">
           {songData && (
             <button
-              onClick={() => navigate('/practice', { state: { songData, chords, audioUrl } })}
+              onClick={() => navigate('/practice', { state: { songData, chords, audioUrl, lessonUrl } })}
               className="btn-bob-green flex-1"
             >
             Practice Note Highway
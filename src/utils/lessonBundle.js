@@ -0,0 +1,56 @@
+/**
+ * Reader for lesson bundles (backend/dsp/lesson_bundle.py): one immutable file with the
+ * song's audio, note highway, chords, beat grid and waveform peaks.
+ *
+ * Layout: "GBLESSON" | u32 LE header length | header JSON | data. header.sections maps each
+ * section to { offset, length, dtype, shape } from the start of the data area; sections are
+ * 8-aligned, so columns are typed-array views straight into the download (little-endian,
+ * like every platform browsers run on).
+ */
+const TYPED = { float32: Float32Array, uint8: Uint8Array, uint16: Uint16Array, int8: Int8Array };
+
+export function parseLesson(buf) {
+  const magic = new TextDecoder().decode(new Uint8Array(buf, 0, 8));
+  if (magic !== 'GBLESSON') throw new Error('Not a lesson bundle');
+  const headerLen = new DataView(buf).getUint32(8, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buf, 12, headerLen)));
+  const base = 12 + headerLen;
+
+  const column = (name) => {
+    const s = header.sections[name];
+    const Typed = TYPED[s.dtype];
+    return new Typed(buf, base + s.offset, s.length / Typed.BYTES_PER_ELEMENT);
+  };
+
+  const time = column('notes.time');
+  const duration = column('notes.duration');
+  const string = column('notes.string');
+  const fret = column('notes.fret');
+  const notes = Array.from(time, (t, i) => ({ time: t, string: string[i], fret: fret[i], duration: duration[i] }));
+
+  const t0 = column('chords.t0');
+  const t1 = column('chords.t1');
+  const label = column('chords.label');
+  const chords = Array.from(t0, (t, i) => ({ t0: t, t1: t1[i], label: header.chord_labels[label[i]] }));
+
+  const audio = header.sections.audio;
+  const audioBlob = new Blob([new Uint8Array(buf, base + audio.offset, audio.length)], { type: audio.mime });
+
+  const songDuration = header.note_duration ?? header.duration;
+  return {
+    header,
+    songData: { duration: songDuration, durationMs: songDuration * 1000, notes },
+    chords,
+    songSections: header.song_sections ?? [], // [{ t0, t1, label, group, instance }]
+    beats: column('beats'),
+    peaks: column('peaks'), // [min0, max0, min1, max1, ...] int8, header.peaks_per_s per second
+    audioBlob,
+  };
+}
+
+/** Fetch and parse a lesson; `url` may be GET /jobs/{id}/lesson, which redirects to the bundle. */
+export async function loadLesson(url, { signal } = {}) {
+  const res = await fetch(url, { signal });
+  if (!res.ok) throw new Error(`Lesson request failed (${res.status})`);
+  return parseLesson(await res.arrayBuffer());
+}